@@ -1,9 +1,9 @@
 import openai
 import google.generativeai as genai
+import requests
 import os
 import logging
 import json
-import requests
 from datetime import datetime
 import webbrowser
 import subprocess
@@ -12,6 +12,17 @@ import asyncio
 from pyowm import OWM
 from pyowm.utils import config
 from pyowm.utils import timestamps
+from ai.intent_router import build_default_router, tokenize
+from ai.response_cache import ResponseCache, is_history_dependent
+from ai.conversation_store import ConversationStore, DEFAULT_SESSION_ID
+from ai.provider_orchestrator import ProviderOrchestrator
+from ai.web_search import SearchPipeline
+from ai.prompt_builder import PromptBuilder, make_token_counter
+from ai.rate_limiter import RateLimitScheduler, RateLimited, PRIORITY_TEXT, PRIORITY_BATCH
+from utils.http_client import get_http_client
+from utils.cache import RefreshingCache
+from utils.metrics import ENGINE_LATENCY, FALLBACKS, ERRORS
+from utils.tracing import traced
 
 class AIAssistant:
     def __init__(self):
@@ -20,23 +31,116 @@ class AIAssistant:
         # OpenAI Configuration
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
         self.openai_model = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+        self.openai_timeout = float(os.getenv('OPENAI_TIMEOUT', 20))
+        self.openai_api_base = os.getenv('OPENAI_API_BASE')
+        self.max_response_tokens = 500
         
         # Google Gemini Configuration
         self.google_api_key = os.getenv('GOOGLE_API_KEY')
+        self.gemini_model_name = os.getenv('GEMINI_MODEL', 'gemini-pro')
+        self.gemini_timeout = float(os.getenv('GEMINI_TIMEOUT', 20))
+        self.gemini_api_endpoint = os.getenv('GEMINI_API_ENDPOINT')
         
         # Google Search Configuration
         self.google_search_api_key = os.getenv('GOOGLE_SEARCH_API_KEY')
         self.search_engine_id = os.getenv('SEARCH_ENGINE_ID')
+        self.search_url = os.getenv('GOOGLE_SEARCH_URL', 'https://www.googleapis.com/customsearch/v1')
         
         # Weather Configuration
         self.weather_api_key = os.getenv('OPENWEATHER_API_KEY')
+        self.weather_proxy = os.getenv('OPENWEATHER_PROXY')
+        self.weather_use_ssl = os.getenv('OPENWEATHER_USE_SSL', 'True').lower() == 'true'
+        self.weather_cache = RefreshingCache(
+            ttl=float(os.getenv('WEATHER_CACHE_TTL', 600)),
+            stale_ttl=float(os.getenv('WEATHER_CACHE_STALE_TTL', 1800)),
+            max_entries=int(os.getenv('WEATHER_CACHE_MAX_ENTRIES', 500)),
+            name='weather'
+        )
+        
+        # Pooled keep-alive client for outbound HTTP calls
+        self.http = get_http_client()
+        
+        # Cached search pipeline with optional result-page enrichment
+        self.search_enrich = os.getenv('WEB_SEARCH_ENRICH', 'False').lower() == 'true'
+        self.search_pipeline = SearchPipeline(
+            self.http,
+            self.google_search_api_key,
+            self.search_engine_id,
+            self.search_url,
+            cache_ttl=float(os.getenv('WEB_SEARCH_CACHE_TTL', 900)),
+            cache_max_entries=int(os.getenv('WEB_SEARCH_CACHE_MAX_ENTRIES', 500)),
+            enrich_pages=int(os.getenv('WEB_SEARCH_ENRICH_PAGES', 3)),
+            enrich_workers=int(os.getenv('WEB_SEARCH_ENRICH_WORKERS', 4)),
+            enrich_budget=float(os.getenv('WEB_SEARCH_ENRICH_BUDGET_MS', 1500)) / 1000,
+            max_page_bytes=int(os.getenv('WEB_SEARCH_MAX_PAGE_BYTES', 512 * 1024))
+        )
         
         # Initialize APIs
         self._initialize_apis()
         
-        # Initialize conversation history
-        self.conversation_history = []
-        self.max_history = 10
+        # Provider quota scheduling: queue calls by priority instead of hitting 429s
+        self.rate_scheduler = RateLimitScheduler(queue_timeout=float(os.getenv('RATE_LIMIT_QUEUE_TIMEOUT', 10)))
+        self.rate_scheduler.add_provider(
+            'openai',
+            requests_per_minute=int(os.getenv('OPENAI_RPM', 500)),
+            tokens_per_minute=int(os.getenv('OPENAI_TPM', 60000))
+        )
+        self.rate_scheduler.add_provider(
+            'gemini',
+            requests_per_minute=int(os.getenv('GEMINI_RPM', 60)),
+            tokens_per_minute=int(os.getenv('GEMINI_TPM', 32000))
+        )
+        if self.openai_api_key:
+            self._track_openai_quota()
+        
+        # Hedged provider calls: start the next provider if the current one is slow
+        hedge_delay_ms = os.getenv('PROVIDER_HEDGE_DELAY_MS', '1500')
+        self.provider_orchestrator = ProviderOrchestrator(
+            hedge_delay=None if hedge_delay_ms.lower() == 'off' else float(hedge_delay_ms) / 1000,
+            max_workers=int(os.getenv('PROVIDER_MAX_WORKERS', 16)),
+            background_workers=int(os.getenv('PROVIDER_BATCH_WORKERS', 16)),
+            failure_threshold=int(os.getenv('PROVIDER_FAILURE_THRESHOLD', 5)),
+            reset_timeout=float(os.getenv('PROVIDER_RESET_TIMEOUT', 30))
+        )
+        if self.openai_api_key:
+            self.provider_orchestrator.add_provider('openai', self._get_openai_response, self.openai_timeout)
+        if self.gemini_model:
+            self.provider_orchestrator.add_provider('gemini', self._get_gemini_response, self.gemini_timeout)
+        
+        # Compile the special command router once at startup
+        self.intent_router = build_default_router()
+        self._intent_handlers = {
+            'time': lambda text: self._get_time(),
+            'date': lambda text: self._get_date(),
+            'weather': self._get_weather,
+            'open_application': self._open_application,
+            'web_search': self._web_search,
+            'joke': lambda text: self._tell_joke(),
+            'system_info': lambda text: self._get_system_info(),
+        }
+        
+        # Token counts are computed once per turn, when it is stored
+        self.count_tokens = make_token_counter(self.openai_model)
+        
+        # Initialize per-session conversation history
+        self.max_history = int(os.getenv('SESSION_MAX_HISTORY', 10))
+        self.conversation_store = ConversationStore(
+            max_turns=self.max_history,
+            token_budget=int(os.getenv('SESSION_TOKEN_BUDGET', 2000)),
+            idle_timeout=float(os.getenv('SESSION_IDLE_TIMEOUT', 1800)),
+            max_sessions=int(os.getenv('SESSION_MAX_SESSIONS', 1000)),
+            max_total_tokens=int(os.getenv('SESSION_MAX_TOTAL_TOKENS', 2000000)),
+            token_counter=self.count_tokens
+        )
+        
+        # Response cache for repeated questions
+        self.response_cache_enabled = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+        self.cache_history_turns = int(os.getenv('RESPONSE_CACHE_HISTORY_TURNS', 0))
+        self.response_cache = ResponseCache(
+            ttl=float(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+            max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000)),
+            max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 5 * 1024 * 1024))
+        )
         
         # System prompt for Jarvis personality
         self.system_prompt = """You are Jarvis, an intelligent AI assistant inspired by Iron Man's AI. You are helpful, witty, and efficient. You can:
@@ -64,6 +168,13 @@ Current capabilities:
 
 Remember: You're here to help and make the user's life easier!"""
         
+        # Prompt assembly within a token budget; the system prompt is encoded once here
+        self.prompt_builder = PromptBuilder(
+            self.system_prompt,
+            token_budget=int(os.getenv('PROMPT_TOKEN_BUDGET', 3000)),
+            token_counter=self.count_tokens
+        )
+        
         self.logger.info("AI Assistant initialized with enhanced capabilities")
     
     def _initialize_apis(self):
@@ -71,14 +182,24 @@ Remember: You're here to help and make the user's life easier!"""
         # OpenAI
         if self.openai_api_key:
             openai.api_key = self.openai_api_key
+            if self.openai_api_base:
+                openai.api_base = self.openai_api_base
             self.logger.info("OpenAI API configured successfully")
         else:
             self.logger.warning("OpenAI API key not found")
         
         # Google Gemini
         if self.google_api_key:
-            genai.configure(api_key=self.google_api_key)
-            self.gemini_model = genai.GenerativeModel('gemini-pro')
+            if self.gemini_api_endpoint:
+                # Custom endpoints (proxies, local stand-ins) are reached over REST
+                genai.configure(
+                    api_key=self.google_api_key,
+                    transport='rest',
+                    client_options={"api_endpoint": self.gemini_api_endpoint}
+                )
+            else:
+                genai.configure(api_key=self.google_api_key)
+            self.gemini_model = genai.GenerativeModel(self.gemini_model_name)
             self.logger.info("Google Gemini API configured successfully")
         else:
             self.logger.warning("Google Gemini API key not found")
@@ -87,7 +208,11 @@ Remember: You're here to help and make the user's life easier!"""
         # Weather API
         if self.weather_api_key:
             try:
-                self.owm = OWM(self.weather_api_key)
+                owm_config = config.get_default_config()
+                owm_config['connection']['use_ssl'] = self.weather_use_ssl
+                if self.weather_proxy:
+                    owm_config['proxies'] = {'http': self.weather_proxy, 'https': self.weather_proxy}
+                self.owm = OWM(self.weather_api_key, owm_config)
                 self.weather_mgr = self.owm.weather_manager()
                 self.logger.info("OpenWeather API configured successfully")
             except Exception as e:
@@ -97,7 +222,8 @@ Remember: You're here to help and make the user's life easier!"""
             self.logger.warning("OpenWeather API key not found")
             self.weather_mgr = None
     
-    def get_response(self, user_input, context=None):
+    @traced('ai.get_response')
+    def get_response(self, user_input, context=None, use_cache=True, session_id=DEFAULT_SESSION_ID, priority=PRIORITY_TEXT):
         """
         Get AI response for user input using multiple AI engines
         """
@@ -107,103 +233,248 @@ Remember: You're here to help and make the user's life easier!"""
             if special_response:
                 return special_response
             
-            # Try OpenAI first, then Gemini as fallback
-            response = None
-            
-            if self.openai_api_key:
-                response = self._get_openai_response(user_input, context)
+            # Serve repeated questions from the response cache
+            provider, model = self._get_primary_provider()
+            cache_key = self._get_cache_key(user_input, context, provider, model, session_id) if use_cache else None
+            if cache_key:
+                cached_response = self.response_cache.get(cache_key)
+                if cached_response:
+                    self._update_conversation_history(user_input, cached_response, session_id)
+                    return cached_response
             
-            if not response and self.gemini_model:
-                response = self._get_gemini_response(user_input, context)
+            # OpenAI first, hedged with Gemini if OpenAI is slow or failing
+            # Batch calls get their own provider threads and queue behind voice and text for quota
+            responding_provider, response = self.provider_orchestrator.call(
+                user_input, context, session_id, priority, background=priority >= PRIORITY_BATCH
+            )
             
             if not response:
+                FALLBACKS.inc(stage='llm', engine='offline')
                 response = self._get_fallback_response(user_input)
+            elif cache_key and responding_provider == provider:
+                self.response_cache.set(cache_key, response)
             
             # Update conversation history
-            self._update_conversation_history(user_input, response)
+            self._update_conversation_history(user_input, response, session_id)
             
             return response
         
         except Exception as e:
             self.logger.error(f"Error getting AI response: {e}")
+            ERRORS.inc(stage='llm', engine='assistant')
             return "I apologize, but I'm experiencing some technical difficulties. Please try again."
     
-    def _handle_special_commands(self, user_input):
+    @traced('ai.stream_response')
+    def stream_response(self, user_input, context=None, use_cache=True, session_id=DEFAULT_SESSION_ID, priority=PRIORITY_TEXT):
         """
-        Handle special commands and system operations
+        Get AI response for user input as a stream of text chunks
         """
-        input_lower = user_input.lower()
-        
-        # Time and date
-        if any(word in input_lower for word in ['time', 'what time']):
-            return self._get_time()
-        
-        # Date
-        if any(word in input_lower for word in ['date', 'what date', 'today']):
-            return self._get_date()
+        try:
+            # Special commands and cached answers arrive as a single chunk
+            special_response = self._handle_special_commands(user_input)
+            if special_response:
+                yield special_response
+                return
+            
+            provider, model = self._get_primary_provider()
+            cache_key = self._get_cache_key(user_input, context, provider, model, session_id) if use_cache else None
+            if cache_key:
+                cached_response = self.response_cache.get(cache_key)
+                if cached_response:
+                    self._update_conversation_history(user_input, cached_response, session_id)
+                    yield cached_response
+                    return
+            
+            # Try OpenAI first, then Gemini if OpenAI produced nothing
+            chunks = []
+            responding_provider = None
+            completed = False
+            
+            streams = []
+            if self.openai_api_key:
+                streams.append(('openai', self._stream_openai_response))
+            if self.gemini_model:
+                streams.append(('gemini', self._stream_gemini_response))
+            
+            for name, stream in streams:
+                if chunks or not self.provider_orchestrator.is_available(name):
+                    continue
+                responding_provider = name
+                try:
+                    for chunk in stream(user_input, context, session_id, priority):
+                        chunks.append(chunk)
+                        yield chunk
+                    completed = True
+                    self.provider_orchestrator.record_result(name, bool(chunks))
+                except RateLimited:
+                    self.provider_orchestrator.record_result(name, None)
+                except Exception:
+                    self.provider_orchestrator.record_result(name, False)
+                    completed = False
+            
+            response = ''.join(chunks).strip()
+            if not response:
+                FALLBACKS.inc(stage='llm', engine='offline')
+                response = self._get_fallback_response(user_input)
+                yield response
+            elif not completed:
+                # What was streamed stays with the client, but a cut-off answer is neither
+                # cached nor remembered as the assistant's turn
+                self.logger.warning(f"{responding_provider} stream ended early after {len(chunks)} chunks")
+                return
+            elif cache_key and responding_provider == provider:
+                self.response_cache.set(cache_key, response)
+            
+            self._update_conversation_history(user_input, response, session_id)
         
-        # Weather
-        if any(word in input_lower for word in ['weather', 'temperature', 'forecast']):
-            return self._get_weather(input_lower)
+        except Exception as e:
+            self.logger.error(f"Error streaming AI response: {e}")
+            ERRORS.inc(stage='llm', engine='assistant')
+            yield "I apologize, but I'm experiencing some technical difficulties. Please try again."
+    
+    def _get_primary_provider(self):
+        """
+        Get the (provider, model) pair that answers when everything is healthy
+        """
+        if self.openai_api_key:
+            return 'openai', self.openai_model
+        if self.gemini_model:
+            return 'gemini', self.gemini_model_name
+        return None, None
+    
+    def _is_cacheable(self, user_input, context, provider, session_id):
+        """
+        Check whether a turn may be answered from the response cache
+        """
+        if not self.response_cache_enabled or not provider:
+            return False
         
-        # Open applications
-        if 'open' in input_lower:
-            return self._open_application(input_lower)
+        # Context-bearing and follow-up turns depend on more than the text itself
+        if context:
+            return False
+        if self.conversation_store.has_history(session_id) and is_history_dependent(user_input):
+            return False
         
-        # Web search
-        if any(word in input_lower for word in ['search', 'google', 'find', 'look up']):
-            return self._web_search(input_lower)
+        return True
+    
+    def _get_cache_key(self, user_input, context, provider, model, session_id):
+        """
+        Build the response cache key for a turn, or None if it is not cacheable
+        """
+        if not self._is_cacheable(user_input, context, provider, session_id):
+            return None
         
-        # Jokes
-        if any(word in input_lower for word in ['joke', 'funny', 'humor']):
-            return self._tell_joke()
+        history = self.conversation_store.get_history(session_id, self.cache_history_turns) if self.cache_history_turns else None
+        return self.response_cache.make_key(user_input, provider, model, history)
+    
+    def get_provider_stats(self):
+        """
+        Get provider hedging, circuit breaker and rate limit statistics
+        """
+        stats = self.provider_orchestrator.get_stats()
+        stats["rate_limits"] = self.rate_scheduler.get_stats()
+        return stats
+    
+    def get_cache_stats(self):
+        """
+        Get response cache statistics
+        """
+        stats = self.response_cache.get_stats()
+        stats["enabled"] = self.response_cache_enabled
+        return stats
+    
+    @traced('ai.special_commands')
+    def _handle_special_commands(self, user_input):
+        """
+        Handle special commands and system operations
+        """
+        match = self.intent_router.route(user_input)
+        if not match:
+            return None
         
-        # System information
-        if any(word in input_lower for word in ['system', 'computer', 'specs']):
-            return self._get_system_info()
+        handler = self._intent_handlers.get(match.intent)
+        if not handler:
+            return None
         
-        return None
+        self.logger.debug(f"Routed input to intent '{match.intent}' (score {match.score}, keywords {match.keywords})")
+        return handler(user_input.lower())
     
-    def _prepare_messages(self, user_input, context=None):
+    def _prepare_messages(self, user_input, context=None, session_id=DEFAULT_SESSION_ID):
         """
         Prepare messages for OpenAI API
         """
-        messages = [{"role": "system", "content": self.system_prompt}]
-        
-        # Add conversation history
-        for entry in self.conversation_history[-self.max_history:]:
-            messages.append({"role": "user", "content": entry["user"]})
-            messages.append({"role": "assistant", "content": entry["assistant"]})
-        
-        # Add context if provided
-        if context:
-            messages.append({"role": "system", "content": f"Context: {context}"})
-        
-        # Add current user input
-        messages.append({"role": "user", "content": user_input})
-        
-        return messages
+        return self._prepare_prompt(user_input, context, session_id).messages
+    
+    @traced('ai.prepare_prompt')
+    def _prepare_prompt(self, user_input, context=None, session_id=DEFAULT_SESSION_ID):
+        """
+        Prepare the prompt and its token count
+        """
+        # Recent history is kept only as far as it fits the prompt token budget
+        history = self.conversation_store.get_history(session_id, self.max_history)
+        return self.prompt_builder.build(user_input, history, context)
+    
+    def _track_openai_quota(self):
+        """
+        Feed the x-ratelimit-* headers of every OpenAI response, not just 429s, into the rate limit scheduler
+        """
+        session = requests.Session()
+        session.hooks['response'].append(
+            lambda response, *args, **kwargs: self.rate_scheduler.record_headers('openai', response.headers)
+        )
+        openai.requestssession = session
+    
+    @traced('llm.rate_limit_wait')
+    def _acquire_provider(self, provider, prompt, priority):
+        """
+        Wait for quota to call a provider; returns the estimated token cost or raises RateLimited
+        """
+        estimated_tokens = prompt.tokens + self.max_response_tokens
+        if not self.rate_scheduler.acquire(provider, estimated_tokens, priority):
+            raise RateLimited(f"No {provider} quota within the queue timeout")
+        return estimated_tokens
+    
+    def _record_provider_error(self, provider, error):
+        """
+        Feed 429 responses back into the rate limit scheduler; raises RateLimited for them so
+        the caller does not count quota exhaustion as a provider failure
+        """
+        if isinstance(error, RateLimited):
+            raise error
+        if type(error).__name__ in ('RateLimitError', 'ResourceExhausted', 'TooManyRequests') or getattr(error, 'http_status', None) == 429:
+            self.rate_scheduler.record_rate_limited(provider, getattr(error, 'headers', None))
+            raise RateLimited(f"{provider} returned 429") from error
     
-    def _get_openai_response(self, user_input, context=None):
+    @traced('llm.openai')
+    @ENGINE_LATENCY.timed(stage='llm', engine='openai')
+    def _get_openai_response(self, user_input, context=None, session_id=DEFAULT_SESSION_ID, priority=PRIORITY_TEXT):
         """
         Get response from OpenAI API
         """
         try:
-            messages = self._prepare_messages(user_input, context)
+            prompt = self._prepare_prompt(user_input, context, session_id)
+            estimated_tokens = self._acquire_provider('openai', prompt, priority)
+            
             response = openai.ChatCompletion.create(
                 model=self.openai_model,
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7
+                messages=prompt.messages,
+                max_tokens=self.max_response_tokens,
+                temperature=0.7,
+                request_timeout=self.openai_timeout
             )
             
+            self.rate_scheduler.record_usage('openai', estimated_tokens, response.usage.total_tokens)
             return response.choices[0].message.content.strip()
         
         except Exception as e:
+            self._record_provider_error('openai', e)
             self.logger.error(f"OpenAI API error: {e}")
+            ERRORS.inc(stage='llm', engine='openai')
             return None
     
-    def _get_gemini_response(self, user_input, context=None):
+    @traced('llm.gemini')
+    @ENGINE_LATENCY.timed(stage='llm', engine='gemini')
+    def _get_gemini_response(self, user_input, context=None, session_id=DEFAULT_SESSION_ID, priority=PRIORITY_TEXT):
         """
         Get response from Google Gemini API
         """
@@ -211,17 +482,84 @@ Remember: You're here to help and make the user's life easier!"""
             if not self.gemini_model:
                 return None
             
-            prompt = f"{self.system_prompt}\n\nUser: {user_input}"
-            if context:
-                prompt += f"\nContext: {context}"
+            prompt = self._prepare_prompt(user_input, context, session_id)
+            estimated_tokens = self._acquire_provider('gemini', prompt, priority)
+            
+            response = self.gemini_model.generate_content(
+                self.prompt_builder.to_text(prompt.messages),
+                request_options={"timeout": self.gemini_timeout}
+            )
             
-            response = self.gemini_model.generate_content(prompt)
+            usage = getattr(response, 'usage_metadata', None)
+            self.rate_scheduler.record_usage('gemini', estimated_tokens, getattr(usage, 'total_token_count', None))
             return response.text.strip()
         
         except Exception as e:
+            self._record_provider_error('gemini', e)
             self.logger.error(f"Google Gemini API error: {e}")
+            ERRORS.inc(stage='llm', engine='gemini')
             return None
     
+    @traced('llm.openai_stream')
+    @ENGINE_LATENCY.timed(stage='llm', engine='openai_stream')
+    def _stream_openai_response(self, user_input, context=None, session_id=DEFAULT_SESSION_ID, priority=PRIORITY_TEXT):
+        """
+        Stream response chunks from OpenAI API; raises if the stream fails part-way
+        """
+        try:
+            prompt = self._prepare_prompt(user_input, context, session_id)
+            self._acquire_provider('openai', prompt, priority)
+            
+            response = openai.ChatCompletion.create(
+                model=self.openai_model,
+                messages=prompt.messages,
+                max_tokens=self.max_response_tokens,
+                temperature=0.7,
+                stream=True,
+                request_timeout=self.openai_timeout
+            )
+            
+            for chunk in response:
+                content = chunk.choices[0].delta.get('content')
+                if content:
+                    yield content
+        
+        except Exception as e:
+            self._record_provider_error('openai', e)
+            self.logger.error(f"OpenAI API streaming error: {e}")
+            ERRORS.inc(stage='llm', engine='openai')
+            # Callers must know the stream ended early; partial chunks are not an answer
+            raise
+    
+    @traced('llm.gemini_stream')
+    @ENGINE_LATENCY.timed(stage='llm', engine='gemini_stream')
+    def _stream_gemini_response(self, user_input, context=None, session_id=DEFAULT_SESSION_ID, priority=PRIORITY_TEXT):
+        """
+        Stream response chunks from Google Gemini API; raises if the stream fails part-way
+        """
+        try:
+            if not self.gemini_model:
+                return
+            
+            prompt = self._prepare_prompt(user_input, context, session_id)
+            self._acquire_provider('gemini', prompt, priority)
+            
+            response = self.gemini_model.generate_content(
+                self.prompt_builder.to_text(prompt.messages),
+                stream=True,
+                request_options={"timeout": self.gemini_timeout}
+            )
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        
+        except Exception as e:
+            self._record_provider_error('gemini', e)
+            self.logger.error(f"Google Gemini API streaming error: {e}")
+            ERRORS.inc(stage='llm', engine='gemini')
+            # Callers must know the stream ended early; partial chunks are not an answer
+            raise
+    
     def _get_fallback_response(self, user_input):
         """
         Fallback response when AI APIs are not available
@@ -243,19 +581,15 @@ Remember: You're here to help and make the user's life easier!"""
         
         return "I understand you said: " + user_input + ". I'm currently in offline mode, but I can still help with basic tasks. Try asking about the time, date, or for a joke!"
     
-    def _update_conversation_history(self, user_input, assistant_response):
+    def _update_conversation_history(self, user_input, assistant_response, session_id=DEFAULT_SESSION_ID):
         """
         Update conversation history
         """
-        self.conversation_history.append({
-            "user": user_input,
-            "assistant": assistant_response,
-            "timestamp": datetime.now().isoformat()
-        })
+        # session_id None marks a stateless turn (batch items, search summaries)
+        if session_id is None:
+            return
         
-        # Keep only recent history
-        if len(self.conversation_history) > self.max_history:
-            self.conversation_history = self.conversation_history[-self.max_history:]
+        self.conversation_store.append(session_id, user_input, assistant_response)
     
     def _get_time(self):
         """
@@ -273,6 +607,7 @@ Remember: You're here to help and make the user's life easier!"""
         date_str = now.strftime("%A, %B %d, %Y")
         return f"Today is {date_str}."
     
+    @traced('tool.weather')
     def _get_weather(self, user_input):
         """
         Get weather information using OpenWeather API
@@ -286,14 +621,15 @@ Remember: You're here to help and make the user's life easier!"""
             if not location:
                 return "Please specify a location. For example: 'What's the weather in New York?' or 'Weather in London'"
             
-            # Get weather data
-            observation = self.weather_mgr.weather_at_place(location)
-            weather = observation.weather
+            # Get weather data; identical lookups share one cached upstream request. The normalized
+            # form is only the cache key: OpenWeather needs the original, e.g. "London,GB"
+            location_key = self._normalize_location(location)
+            weather = self.weather_cache.get(location_key, lambda: self._fetch_weather(location))
             
             # Format weather information
-            temp = weather.temperature('celsius')
-            humidity = weather.humidity
-            description = weather.detailed_status
+            temp = weather['temperature']
+            humidity = weather['humidity']
+            description = weather['description']
             
             weather_info = f"Weather in {location}:\n"
             weather_info += f"• Temperature: {temp['temp']:.1f}°C (feels like {temp['feels_like']:.1f}°C)\n"
@@ -307,6 +643,24 @@ Remember: You're here to help and make the user's life easier!"""
             self.logger.error(f"Error getting weather: {e}")
             return "I'm sorry, I couldn't retrieve the weather information. Please try again with a different location."
     
+    def _fetch_weather(self, location):
+        """
+        Fetch current weather for a location from OpenWeather
+        """
+        observation = self.weather_mgr.weather_at_place(location)
+        weather = observation.weather
+        return {
+            "temperature": weather.temperature('celsius'),
+            "humidity": weather.humidity,
+            "description": weather.detailed_status,
+        }
+    
+    def _normalize_location(self, location):
+        """
+        Normalize a location so "New York" and "new york?" share a cache entry
+        """
+        return ' '.join(tokenize(location))
+    
     def _extract_location_from_input(self, user_input):
         """
         Extract location from user input
@@ -355,6 +709,7 @@ Remember: You're here to help and make the user's life easier!"""
             self.logger.error(f"Error opening application: {e}")
             return "I'm sorry, I couldn't open that application. Please try again."
     
+    @traced('tool.web_search')
     def _web_search(self, user_input):
         """
         Perform web search using Google Search API
@@ -376,24 +731,22 @@ Remember: You're here to help and make the user's life easier!"""
             if not query:
                 return "What would you like me to search for?"
             
-            # Perform Google Search API request
-            url = "https://www.googleapis.com/customsearch/v1"
-            params = {
-                'key': self.google_search_api_key,
-                'cx': self.search_engine_id,
-                'q': query,
-                'num': 5
-            }
-            
-            response = requests.get(url, params=params)
-            data = response.json()
+            # Perform Google Search API request (cached per normalized query)
+            items = self.search_pipeline.search(query)
             
-            if 'items' in data and data['items']:
+            if items:
                 results = []
-                for item in data['items'][:3]:  # Top 3 results
+                for item in items[:3]:  # Top 3 results
                     results.append(f"• {item['title']}: {item['link']}")
                 
                 search_results = f"Search results for '{query}':\n" + '\n'.join(results)
+                
+                # Answer from the result pages when enrichment is enabled
+                if self.search_enrich:
+                    answer = self._answer_from_search(query, items)
+                    if answer:
+                        return f"{answer}\n\nSources:\n" + '\n'.join(results)
+                
                 return search_results
             else:
                 return f"I couldn't find any results for '{query}'. Try a different search term."
@@ -402,6 +755,18 @@ Remember: You're here to help and make the user's life easier!"""
             self.logger.error(f"Error performing web search: {e}")
             return self._fallback_web_search(user_input)
     
+    def _answer_from_search(self, query, items):
+        """
+        Ask the LLM to answer a query using the enriched search result bundle
+        """
+        bundle = self.search_pipeline.enrich(items)
+        if not bundle:
+            return None
+        
+        # No session: the answer must come from the search results, not another user's history
+        _, answer = self.provider_orchestrator.call(query, f"Web search results:\n{bundle}", None, PRIORITY_TEXT)
+        return answer
+    
     def _fallback_web_search(self, user_input):
         """
         Fallback web search using regular Google
@@ -474,15 +839,21 @@ Remember: You're here to help and make the user's life easier!"""
             self.logger.error(f"Error getting system info: {e}")
             return "I'm sorry, I couldn't retrieve the system information."
     
-    def clear_conversation_history(self):
+    def clear_conversation_history(self, session_id=DEFAULT_SESSION_ID):
         """
         Clear conversation history
         """
-        self.conversation_history = []
+        self.conversation_store.clear(session_id)
         return "Conversation history cleared."
     
-    def get_conversation_history(self):
+    def end_session(self, session_id):
+        """
+        Forget everything about a session, e.g. when its client disconnects
+        """
+        self.conversation_store.end_session(session_id)
+    
+    def get_conversation_history(self, session_id=DEFAULT_SESSION_ID):
         """
         Get conversation history
         """
-        return self.conversation_history 
\ No newline at end of file
+        return self.conversation_store.get_history(session_id)
\ No newline at end of file
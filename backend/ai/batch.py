@@ -0,0 +1,109 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from ai.rate_limiter import PRIORITY_BATCH
+from utils.tracing import bind_context
+
+
+class BatchRunner:
+    """
+    Runs many chat messages through the assistant with bounded concurrency.
+
+    All batches share one worker pool; each batch keeps at most its own
+    concurrency limit of messages in flight and results are yielded in
+    completion order, tagged with the caller's request ids. Messages run at
+    batch priority: they wait behind voice and text for provider quota and
+    use the provider orchestrator's background pool, not its interactive one.
+    """
+
+    def __init__(self, assistant, max_workers=32, max_concurrency=8, max_items=1000):
+        self.logger = logging.getLogger(__name__)
+        self.assistant = assistant
+        self.max_workers = max(1, max_workers)
+        if max_concurrency > self.max_workers:
+            self.logger.warning(
+                f"Batch concurrency {max_concurrency} exceeds the {self.max_workers} batch workers; using {self.max_workers}"
+            )
+        self.max_concurrency = max(1, min(max_concurrency, self.max_workers))
+        self.max_items = max_items
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='chat-batch')
+
+    def parse_concurrency(self, value):
+        """
+        Normalize a requested concurrency (None, int or numeric string) to 1..max_concurrency; raises ValueError
+        """
+        if value is None:
+            return self.max_concurrency
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError("concurrency must be a positive integer")
+        if value > self.max_concurrency:
+            self.logger.warning(f"Requested batch concurrency {value} reduced to {self.max_concurrency}")
+            return self.max_concurrency
+        return value
+
+    def parse_items(self, messages):
+        """
+        Normalize a batch payload into [{id, message, session_id}]; raises ValueError
+        """
+        if not isinstance(messages, list) or not messages:
+            raise ValueError("messages must be a non-empty list")
+        if len(messages) > self.max_items:
+            raise ValueError(f"A batch may contain at most {self.max_items} messages")
+
+        items = []
+        for index, entry in enumerate(messages):
+            if isinstance(entry, str):
+                entry = {"message": entry}
+            if not isinstance(entry, dict) or not entry.get('message'):
+                raise ValueError(f"Message {index} has no text")
+            items.append({
+                "id": entry.get('id', index),
+                "message": entry['message'],
+                # Without a session id each message is answered statelessly
+                "session_id": entry.get('session_id'),
+            })
+        return items
+
+    def run(self, items, concurrency=None):
+        """
+        Yield one result dict per item, in completion order
+        """
+        concurrency = self.parse_concurrency(concurrency)
+        remaining = iter(items)
+        pending = {}
+
+        def submit_next():
+            item = next(remaining, None)
+            if item is not None:
+                pending[self._executor.submit(bind_context(self._run_item), item)] = item
+
+        for _ in range(concurrency):
+            submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                submit_next()
+                try:
+                    yield future.result()
+                except Exception as e:
+                    self.logger.error(f"Error in batch item {item['id']}: {e}")
+                    yield {"id": item["id"], "error": "Internal server error", "status": "error"}
+
+    def _run_item(self, item):
+        start = time.perf_counter()
+        response = self.assistant.get_response(
+            item["message"],
+            session_id=item["session_id"],
+            priority=PRIORITY_BATCH
+        )
+        return {
+            "id": item["id"],
+            "response": response,
+            "status": "success",
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
\ No newline at end of file
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+DEFAULT_SESSION_ID = 'default'
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token for English text)
+    """
+    return max(1, len(text) // 4)
+
+
+class ConversationSession:
+    """
+    Conversation turns of a single client, oldest first
+    """
+    __slots__ = ('turns', 'tokens', 'last_active')
+
+    def __init__(self, max_turns):
+        self.turns = deque(maxlen=max_turns)
+        self.tokens = 0
+        self.last_active = time.monotonic()
+
+
+class ConversationStore:
+    """
+    Per-session conversation history keyed by Socket.IO sid or HTTP session id.
+
+    Each session is a bounded deque trimmed to a token budget, so appends and
+    trims are O(1). Sessions idle for longer than idle_timeout are evicted,
+    and the least recently active sessions are dropped once the store holds
+    more than max_sessions sessions or max_total_tokens tokens.
+    """
+
+    def __init__(self, max_turns=10, token_budget=2000, idle_timeout=1800,
+                 max_sessions=1000, max_total_tokens=2000000, sweep_interval=60,
+                 token_counter=None):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.max_total_tokens = max_total_tokens
+        self.sweep_interval = sweep_interval
+        self.count_tokens = token_counter or estimate_tokens
+
+        # Ordered by last activity, least recent first
+        self._sessions = OrderedDict()
+        self._total_tokens = 0
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+    def append(self, session_id, user_input, assistant_response):
+        """
+        Record a turn for a session, trimming it to its turn and token budget
+        """
+        entry = {
+            "user": user_input,
+            "assistant": assistant_response,
+            "timestamp": datetime.now().isoformat(),
+            "tokens": self.count_tokens(user_input) + self.count_tokens(assistant_response),
+        }
+
+        with self._lock:
+            session = self._touch(session_id, create=True)
+
+            # A full deque drops its oldest turn on append
+            if len(session.turns) == session.turns.maxlen:
+                self._remove_tokens(session, session.turns[0]["tokens"])
+            session.turns.append(entry)
+            session.tokens += entry["tokens"]
+            self._total_tokens += entry["tokens"]
+
+            while session.tokens > self.token_budget and len(session.turns) > 1:
+                self._remove_tokens(session, session.turns.popleft()["tokens"])
+
+            self._enforce_limits(keep=session_id)
+
+    def get_history(self, session_id, limit=None):
+        """
+        Get a snapshot of a session's turns, optionally only the last limit turns
+        """
+        with self._lock:
+            session = self._touch(session_id, create=False)
+            if session is None:
+                return []
+            turns = list(session.turns)
+
+        if limit is not None:
+            turns = turns[-limit:] if limit > 0 else []
+        return turns
+
+    def has_history(self, session_id):
+        """
+        Check whether a session has any recorded turns
+        """
+        session = self._sessions.get(session_id)
+        return bool(session and session.turns)
+
+    def clear(self, session_id):
+        """
+        Forget a session's turns but keep the session
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._remove_tokens(session, session.tokens)
+                session.turns.clear()
+
+    def end_session(self, session_id):
+        """
+        Drop a session entirely, e.g. when its client disconnects
+        """
+        with self._lock:
+            self._drop(session_id)
+
+    def evict_idle(self):
+        """
+        Evict sessions idle for longer than idle_timeout; returns the number evicted
+        """
+        with self._lock:
+            return self._evict_idle(time.monotonic())
+
+    def get_stats(self):
+        """
+        Get session counts and memory usage
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "total_tokens": self._total_tokens,
+                "max_sessions": self.max_sessions,
+                "max_total_tokens": self.max_total_tokens,
+                "evicted_idle": self.evicted_idle,
+                "evicted_capacity": self.evicted_capacity,
+            }
+
+    def _touch(self, session_id, create):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._evict_idle(now)
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[session_id] = ConversationSession(self.max_turns)
+        else:
+            self._sessions.move_to_end(session_id)
+
+        session.last_active = now
+        return session
+
+    def _remove_tokens(self, session, tokens):
+        session.tokens -= tokens
+        self._total_tokens -= tokens
+
+    def _drop(self, session_id):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._total_tokens -= session.tokens
+
+    def _evict_idle(self, now):
+        self._last_sweep = now
+        cutoff = now - self.idle_timeout
+        evicted = 0
+
+        # Least recently active sessions come first, so stop at the first fresh one
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_active > cutoff:
+                break
+            self._drop(session_id)
+            evicted += 1
+
+        self.evicted_idle += evicted
+        return evicted
+
+    def _enforce_limits(self, keep):
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self._total_tokens > self.max_total_tokens
+        ):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break
+            self._drop(session_id)
+            self.evicted_capacity += 1
\ No newline at end of file
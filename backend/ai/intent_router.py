@@ -0,0 +1,157 @@
+import string
+import logging
+from collections import namedtuple
+
+# Result of routing an utterance to an intent
+IntentMatch = namedtuple('IntentMatch', ['intent', 'score', 'priority', 'keywords'])
+
+# Punctuation (except apostrophes, as in "what's") becomes whitespace
+_PUNCTUATION_TABLE = str.maketrans({char: ' ' for char in string.punctuation if char != "'"})
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens (punctuation is dropped)
+    """
+    return text.lower().translate(_PUNCTUATION_TABLE).split()
+
+
+class IntentRouter:
+    """
+    Word-boundary aware multi-keyword intent matcher.
+
+    Keywords (single words or multi-word phrases) are found with a plain
+    substring scan of the utterance tokens joined by spaces; padding both
+    sides with a space keeps "time" from matching "sometimes". The built-in
+    commands have a few dozen keywords, where a compiled keyword trie was
+    slower than the old first-match scan (benchmarks/bench_intent_router.py),
+    so the router keeps the scan and adds weights and priorities on top.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._keywords = []
+        self._intents = {}
+
+    def add_intent(self, name, keywords, priority=0, min_score=1.0):
+        """
+        Register an intent.
+
+        keywords is either a list of phrases (weight 1.0 each) or a dict of
+        phrase -> weight. An intent fires when the summed weight of its
+        distinct matched phrases reaches min_score.
+        """
+        if not isinstance(keywords, dict):
+            keywords = {keyword: 1.0 for keyword in keywords}
+
+        self._intents[name] = {"priority": priority, "min_score": min_score}
+
+        for phrase, weight in keywords.items():
+            tokens = tokenize(phrase)
+            if tokens:
+                self._keywords.append((f" {' '.join(tokens)} ", name, weight, phrase))
+
+        return self
+
+    def _score(self, text):
+        """
+        Scan text for every keyword and sum the weights per intent
+        """
+        padded = f" {' '.join(tokenize(text))} "
+        scores = {}
+        matched = {}
+
+        for needle, name, weight, phrase in self._keywords:
+            if needle not in padded:
+                continue
+            phrases = matched.setdefault(name, [])
+            if phrase not in phrases:
+                phrases.append(phrase)
+                scores[name] = scores.get(name, 0.0) + weight
+
+        return scores, matched
+
+    def match(self, text):
+        """
+        Return every intent that fires for text, best match first
+        """
+        scores, matched = self._score(text)
+
+        results = []
+        for name, score in scores.items():
+            intent = self._intents[name]
+            if score >= intent["min_score"]:
+                results.append(IntentMatch(name, score, intent["priority"], tuple(matched[name])))
+
+        # Highest score wins; priority breaks ties
+        results.sort(key=lambda m: (m.score, m.priority), reverse=True)
+        return results
+
+    def route(self, text):
+        """
+        Return the best IntentMatch for text, or None
+        """
+        scores, matched = self._score(text)
+
+        best = None
+        best_key = None
+        for name, score in scores.items():
+            intent = self._intents[name]
+            if score < intent["min_score"]:
+                continue
+            key = (score, intent["priority"])
+            if best_key is None or key > best_key:
+                best, best_key = name, key
+
+        if best is None:
+            return None
+        return IntentMatch(best, best_key[0], best_key[1], tuple(matched[best]))
+
+    def get_intents(self):
+        """
+        Get list of registered intent names
+        """
+        return list(self._intents)
+
+
+def build_default_router():
+    """
+    Build the router for Jarvis' built-in special commands.
+
+    Priorities follow the order the commands were historically checked in;
+    weak keywords weigh 0.5 so they only win when nothing stronger matches.
+    """
+    router = IntentRouter()
+
+    router.add_intent('time', {
+        'time': 1.0, 'what time': 1.5, 'clock': 0.5,
+    }, priority=70, min_score=0.5)
+
+    router.add_intent('date', {
+        'date': 1.0, 'what date': 1.5, "what's the date": 1.5,
+        'today': 0.5, 'what day': 1.0,
+    }, priority=60, min_score=0.5)
+
+    router.add_intent('weather', {
+        'weather': 1.0, 'temperature': 1.0, 'forecast': 1.0,
+        'raining': 0.5, 'rain': 0.5, 'sunny': 0.5,
+    }, priority=50, min_score=0.5)
+
+    router.add_intent('open_application', {
+        'open': 1.0, 'launch': 1.0,
+    }, priority=40, min_score=1.0)
+
+    router.add_intent('web_search', {
+        'search': 1.0, 'search for': 1.5, 'look up': 1.5,
+        'google': 0.5, 'find': 0.5,
+    }, priority=30, min_score=0.5)
+
+    router.add_intent('joke', {
+        'joke': 1.0, 'jokes': 1.0, 'funny': 0.5, 'humor': 0.5,
+    }, priority=20, min_score=0.5)
+
+    router.add_intent('system_info', {
+        'system': 1.0, 'system info': 1.5, 'specs': 1.0, 'computer': 0.5,
+    }, priority=10, min_score=0.5)
+
+    return router
\ No newline at end of file
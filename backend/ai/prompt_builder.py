@@ -0,0 +1,136 @@
+import logging
+import threading
+from collections import namedtuple
+
+from ai.conversation_store import estimate_tokens
+
+# tiktoken gives exact OpenAI token counts; without it we fall back to an estimate
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Assembled prompt and its size in tokens
+Prompt = namedtuple('Prompt', ['messages', 'tokens', 'history_turns'])
+
+# Tokens OpenAI's chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+ROLE_LABELS = {"user": "User", "assistant": "Jarvis"}
+
+
+def make_token_counter(model=None):
+    """
+    Get a text -> token count function for a model
+    """
+    if tiktoken is None:
+        return estimate_tokens
+
+    try:
+        encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding('cl100k_base')
+    except KeyError:
+        encoding = tiktoken.get_encoding('cl100k_base')
+    return lambda text: len(encoding.encode(text))
+
+
+class PromptBuilder:
+    """
+    Assembles chat prompts within a token budget.
+
+    The system prompt is encoded once, history turns carry the token count
+    computed when they were stored, so building a prompt only sums cached
+    counts from the newest turn backwards until the budget is spent.
+    """
+
+    def __init__(self, system_prompt, token_budget=3000, token_counter=None):
+        self.logger = logging.getLogger(__name__)
+        self.count_tokens = token_counter or estimate_tokens
+        self.token_budget = token_budget
+        self.set_system_prompt(system_prompt)
+
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.total_prompt_tokens = 0
+        self.max_prompt_tokens = 0
+        self.trimmed_turns = 0
+
+    def set_system_prompt(self, system_prompt):
+        """
+        Replace the system prompt and cache its encoded size
+        """
+        self.system_prompt = system_prompt
+        self.system_tokens = self.count_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+
+    def turn_tokens(self, entry):
+        """
+        Token cost of a stored history turn (user + assistant message)
+        """
+        tokens = entry.get("tokens")
+        if tokens is None:
+            tokens = self.count_tokens(entry["user"]) + self.count_tokens(entry["assistant"])
+        return tokens + 2 * MESSAGE_OVERHEAD_TOKENS
+
+    def build(self, user_input, history=(), context=None):
+        """
+        Build the message list for a turn, keeping as much recent history as fits
+        """
+        tokens = self.system_tokens + self.count_tokens(user_input) + MESSAGE_OVERHEAD_TOKENS
+        context_message = None
+        if context:
+            context_message = {"role": "system", "content": f"Context: {context}"}
+            tokens += self.count_tokens(context_message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+        # Newest turns are the most relevant, so fill the budget from the end
+        remaining = self.token_budget - tokens
+        kept = 0
+        for entry in reversed(history):
+            cost = self.turn_tokens(entry)
+            if cost > remaining:
+                break
+            remaining -= cost
+            tokens += cost
+            kept += 1
+
+        messages = [{"role": "system", "content": self.system_prompt}]
+        for entry in history[len(history) - kept:]:
+            messages.append({"role": "user", "content": entry["user"]})
+            messages.append({"role": "assistant", "content": entry["assistant"]})
+        if context_message:
+            messages.append(context_message)
+        messages.append({"role": "user", "content": user_input})
+
+        with self._lock:
+            self.builds += 1
+            self.total_prompt_tokens += tokens
+            self.max_prompt_tokens = max(self.max_prompt_tokens, tokens)
+            self.trimmed_turns += len(history) - kept
+
+        return Prompt(messages, tokens, kept)
+
+    @staticmethod
+    def to_text(messages):
+        """
+        Flatten a message list into a single text prompt (for Gemini)
+        """
+        lines = []
+        for message in messages:
+            if message["role"] == "system":
+                lines.append(message["content"] + "\n")
+            else:
+                lines.append(f"{ROLE_LABELS[message['role']]}: {message['content']}")
+        return '\n'.join(lines)
+
+    def get_stats(self):
+        """
+        Get prompt size statistics
+        """
+        with self._lock:
+            return {
+                "builds": self.builds,
+                "average_prompt_tokens": self.total_prompt_tokens / self.builds if self.builds else 0.0,
+                "max_prompt_tokens": self.max_prompt_tokens,
+                "trimmed_turns": self.trimmed_turns,
+                "system_prompt_tokens": self.system_tokens,
+                "token_budget": self.token_budget,
+                "exact_token_counts": self.count_tokens is not estimate_tokens,
+            }
\ No newline at end of file
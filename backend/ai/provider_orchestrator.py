@@ -0,0 +1,238 @@
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from ai.rate_limiter import RateLimited
+from utils.tracing import bind_context
+
+
+class CircuitBreaker:
+    """
+    Skips a provider after repeated failures until a cool-down has passed.
+
+    closed: calls flow normally. open: calls are skipped. half-open: after
+    reset_timeout one trial call is let through; success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check whether a call may be made now
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return True
+
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half-open'
+                self._trial_in_flight = False
+
+            if self.state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """
+        Give back a half-open trial without a verdict (the call was never made)
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == 'half-open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class ProviderOrchestrator:
+    """
+    Hedged calls across LLM providers.
+
+    Providers are tried in registration order. If the current provider has
+    not answered within hedge_delay seconds, the next one is started too and
+    whichever returns a usable answer first wins; late answers are ignored.
+    Each provider has its own timeout and circuit breaker. Background calls
+    (batch traffic) run on their own pool, so they can never take the
+    threads interactive voice and text calls need.
+    """
+
+    def __init__(self, hedge_delay=1.5, max_workers=16, failure_threshold=5, reset_timeout=30, background_workers=16):
+        self.logger = logging.getLogger(__name__)
+        self.hedge_delay = hedge_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._providers = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-provider')
+        self._background_executor = ThreadPoolExecutor(
+            max_workers=background_workers, thread_name_prefix='llm-provider-background'
+        )
+
+        self.wins = {}
+        self.hedges = 0
+        self.timeouts = 0
+
+    def add_provider(self, name, func, timeout=20):
+        """
+        Register a provider; func(*args) returns a response string or None
+        """
+        self._providers.append({
+            "name": name,
+            "func": func,
+            "timeout": timeout,
+            "breaker": CircuitBreaker(self.failure_threshold, self.reset_timeout),
+        })
+        self.wins[name] = 0
+        return self
+
+    def is_available(self, name):
+        """
+        Check whether a provider is registered and its circuit breaker lets calls through
+        """
+        for provider in self._providers:
+            if provider["name"] == name:
+                return provider["breaker"].allow()
+        return False
+
+    def record_result(self, name, success):
+        """
+        Feed the outcome of a call made outside call() into the provider's breaker;
+        success=None means the call was not made (no quota) and counts neither way
+        """
+        for provider in self._providers:
+            if provider["name"] == name:
+                if success is None:
+                    provider["breaker"].release()
+                elif success:
+                    provider["breaker"].record_success()
+                else:
+                    provider["breaker"].record_failure()
+
+    def call(self, *args, background=False):
+        """
+        Get the first usable response; returns (provider_name, response) or (None, None)
+        """
+        executor = self._background_executor if background else self._executor
+        candidates = self._providers
+        pending = {}
+        next_index = 0
+        next_launch = time.monotonic()
+
+        while pending or next_index < len(candidates):
+            now = time.monotonic()
+
+            # Start the next provider when nothing is running or the hedge delay elapsed
+            if next_index < len(candidates) and (not pending or (self.hedge_delay is not None and now >= next_launch)):
+                provider = candidates[next_index]
+                next_index += 1
+                # Breakers are only consulted at launch so an unused half-open trial is never claimed
+                if not provider["breaker"].allow():
+                    continue
+                if pending:
+                    self.hedges += 1
+                    self.logger.info(f"Hedging LLM request to {provider['name']}")
+                # Provider spans nest under the caller's trace
+                future = executor.submit(bind_context(provider["func"]), *args)
+                pending[future] = (provider, now + provider["timeout"])
+                next_launch = now + (self.hedge_delay or 0)
+                continue
+
+            # Wait until a call finishes, the next hedge is due or a call times out
+            deadlines = [deadline for _, deadline in pending.values()]
+            if next_index < len(candidates) and self.hedge_delay is not None:
+                deadlines.append(next_launch)
+            done, _ = wait(pending, timeout=max(0.0, min(deadlines) - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider, _ = pending.pop(future)
+                try:
+                    response = future.result()
+                except RateLimited:
+                    # Out of quota says nothing about the provider's health
+                    provider["breaker"].release()
+                    continue
+                except Exception as e:
+                    self.logger.error(f"{provider['name']} provider error: {e}")
+                    response = None
+
+                if response:
+                    provider["breaker"].record_success()
+                    self.wins[provider["name"]] += 1
+                    # Losers keep running in the pool; their answers are discarded but their
+                    # outcomes still reach the breakers, so a losing half-open trial is released
+                    for loser, (loser_provider, _) in pending.items():
+                        loser.add_done_callback(functools.partial(self._record_abandoned, loser_provider))
+                    return provider["name"], response
+
+                provider["breaker"].record_failure()
+
+            now = time.monotonic()
+            for future, (provider, deadline) in list(pending.items()):
+                if now >= deadline:
+                    del pending[future]
+                    future.cancel()
+                    provider["breaker"].record_failure()
+                    self.timeouts += 1
+                    self.logger.warning(f"{provider['name']} provider timed out after {provider['timeout']}s")
+
+        return None, None
+
+    def _record_abandoned(self, provider, future):
+        """
+        Feed the outcome of a call nobody waits for any more into its breaker
+        """
+        if future.cancelled():
+            provider["breaker"].record_failure()
+            return
+        try:
+            response = future.result()
+        except RateLimited:
+            provider["breaker"].release()
+            return
+        except Exception:
+            response = None
+        if response:
+            provider["breaker"].record_success()
+        else:
+            provider["breaker"].record_failure()
+
+    def get_stats(self):
+        """
+        Get per-provider breaker state and hedging counters
+        """
+        return {
+            "providers": {
+                p["name"]: {
+                    "state": p["breaker"].state,
+                    "failures": p["breaker"].failures,
+                    "wins": self.wins[p["name"]],
+                    "timeout": p["timeout"],
+                } for p in self._providers
+            },
+            "hedge_delay": self.hedge_delay,
+            "hedges": self.hedges,
+            "timeouts": self.timeouts,
+        }
\ No newline at end of file
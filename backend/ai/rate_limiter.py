@@ -0,0 +1,250 @@
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+
+# Request priorities, lower runs first
+PRIORITY_VOICE = 0
+PRIORITY_TEXT = 1
+PRIORITY_BATCH = 2
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value):
+    """
+    Parse rate-limit reset values such as '20ms', '1.5s', '6m0s' or '30' into seconds
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class RateLimited(Exception):
+    """
+    A provider call was not made (or was refused with a 429) for lack of quota
+    """
+
+
+def _parse_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at rate tokens per second
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount, now):
+        """
+        Seconds until amount tokens are available (0 if available now)
+        """
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """
+        Return (positive) or charge (negative) tokens after the real cost is known
+        """
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+    def limit(self, amount, now):
+        """
+        Cap the available tokens at what the provider says is left
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, amount)
+
+
+class _ProviderLimits:
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self.queue = []
+
+        self.granted = 0
+        self.timed_out = 0
+        self.throttled = 0
+
+
+class RateLimitScheduler:
+    """
+    Admission control for LLM provider calls.
+
+    Each provider has token buckets for requests and estimated tokens per
+    minute. Callers queue per provider in priority order (voice before text
+    before batch) and are admitted as soon as the buckets allow, instead of
+    firing calls that would come back as 429s. Real usage and 429 responses
+    feed back into the buckets.
+    """
+
+    def __init__(self, queue_timeout=10.0):
+        self.logger = logging.getLogger(__name__)
+        self.queue_timeout = queue_timeout
+        self._providers = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+
+    def add_provider(self, name, requests_per_minute=0, tokens_per_minute=0):
+        """
+        Register limits for a provider; 0 disables that limit
+        """
+        self._providers[name] = _ProviderLimits(requests_per_minute, tokens_per_minute)
+        return self
+
+    def acquire(self, provider, estimated_tokens=0, priority=PRIORITY_TEXT, timeout=None):
+        """
+        Wait for capacity to call provider; returns False if the wait timed out
+        """
+        limits = self._providers.get(provider)
+        if limits is None:
+            return True
+
+        timeout = self.queue_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        ticket = (priority, next(self._sequence))
+
+        with self._condition:
+            heapq.heappush(limits.queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait_time = self._wait_time(limits, estimated_tokens, now)
+
+                    # Only the head of the queue may take capacity
+                    if limits.queue[0] == ticket and wait_time == 0:
+                        if limits.requests:
+                            limits.requests.consume(1)
+                        if limits.tokens:
+                            limits.tokens.consume(estimated_tokens)
+                        limits.granted += 1
+                        return True
+
+                    if now >= deadline:
+                        limits.timed_out += 1
+                        self.logger.warning(f"Rate limit queue timeout for {provider} (priority {priority})")
+                        return False
+
+                    self._condition.wait(min(deadline - now, wait_time or deadline - now))
+            finally:
+                limits.queue.remove(ticket)
+                heapq.heapify(limits.queue)
+                self._condition.notify_all()
+
+    def _wait_time(self, limits, estimated_tokens, now):
+        wait_time = max(0.0, limits.paused_until - now)
+        if limits.requests:
+            wait_time = max(wait_time, limits.requests.wait_time(1, now))
+        if limits.tokens:
+            wait_time = max(wait_time, limits.tokens.wait_time(estimated_tokens, now))
+        return wait_time
+
+    def record_usage(self, provider, estimated_tokens, actual_tokens):
+        """
+        Reconcile the token bucket with the real token usage of a call
+        """
+        limits = self._providers.get(provider)
+        if limits is None or not limits.tokens or actual_tokens is None:
+            return
+        with self._condition:
+            limits.tokens.adjust(estimated_tokens - actual_tokens)
+            self._condition.notify_all()
+
+    def record_rate_limited(self, provider, headers=None):
+        """
+        Back off after a 429: pause the provider until its quota resets
+        """
+        limits = self._providers.get(provider)
+        if limits is None:
+            return
+
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        delay = parse_duration(headers.get('retry-after'))
+        if delay is None:
+            # Reset headers say when the bucket is full again; the first to reset frees capacity
+            resets = [parse_duration(headers.get(name)) for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')]
+            delay = min([d for d in resets if d is not None] or [1.0])
+
+        with self._condition:
+            limits.throttled += 1
+            limits.paused_until = max(limits.paused_until, time.monotonic() + delay)
+            if headers.get('x-ratelimit-remaining-requests') == '0' and limits.requests:
+                limits.requests.drain()
+            if headers.get('x-ratelimit-remaining-tokens') == '0' and limits.tokens:
+                limits.tokens.drain()
+        self.logger.warning(f"{provider} rate limited, pausing for {delay:.2f}s")
+
+    def record_headers(self, provider, headers):
+        """
+        Sync the buckets with the x-ratelimit-remaining-* quota reported on any response
+        """
+        limits = self._providers.get(provider)
+        if limits is None or not headers:
+            return
+
+        headers = {key.lower(): value for key, value in headers.items()}
+        with self._condition:
+            now = time.monotonic()
+            for name, bucket in (('requests', limits.requests), ('tokens', limits.tokens)):
+                remaining = _parse_number(headers.get(f'x-ratelimit-remaining-{name}'))
+                if bucket is None or remaining is None:
+                    continue
+                bucket.limit(remaining, now)
+                if remaining <= 0:
+                    reset = parse_duration(headers.get(f'x-ratelimit-reset-{name}'))
+                    if reset:
+                        limits.paused_until = max(limits.paused_until, now + reset)
+            self._condition.notify_all()
+
+    def get_stats(self):
+        """
+        Get per-provider queue depth and admission counters
+        """
+        with self._condition:
+            now = time.monotonic()
+            return {
+                name: {
+                    "queued": len(limits.queue),
+                    "granted": limits.granted,
+                    "timed_out": limits.timed_out,
+                    "throttled": limits.throttled,
+                    "paused_for": max(0.0, limits.paused_until - now),
+                    "requests_available": limits.requests.tokens if limits.requests else None,
+                    "tokens_available": limits.tokens.tokens if limits.tokens else None,
+                } for name, limits in self._providers.items()
+            }
\ No newline at end of file
@@ -0,0 +1,146 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from ai.intent_router import tokenize
+
+# Words that make a turn depend on earlier turns ("tell me more about it")
+FOLLOW_UP_WORDS = frozenset([
+    'it', 'its', "it's", 'that', 'this', 'those', 'these', 'them', 'they',
+    'he', 'she', 'him', 'her', 'again', 'more', 'previous', 'above', 'else',
+    'another', 'same', 'continue',
+])
+
+
+def normalize_text(text):
+    """
+    Normalize user text so trivially different phrasings share a cache entry
+    """
+    return ' '.join(tokenize(text))
+
+
+def is_history_dependent(text):
+    """
+    Check whether a turn refers back to earlier turns of the conversation
+    """
+    return any(token in FOLLOW_UP_WORDS for token in tokenize(text))
+
+
+def hash_history(history):
+    """
+    Stable digest of conversation history entries
+    """
+    digest = hashlib.sha1()
+    for entry in history:
+        digest.update(entry["user"].encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update(entry["assistant"].encode('utf-8'))
+        digest.update(b'\x01')
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache for LLM responses with TTL expiry.
+
+    Bounded both by entry count and by an estimate of the memory held by
+    cached keys and values; the least recently used entries go first.
+    """
+
+    def __init__(self, ttl=3600, max_entries=1000, max_bytes=5 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(user_input, provider, model, history=None):
+        """
+        Build a cache key from normalized text, provider, model and history
+        """
+        history_hash = hash_history(history) if history else ''
+        return (normalize_text(user_input), provider, model, history_hash)
+
+    @staticmethod
+    def _entry_size(key, value):
+        return sum(sys.getsizeof(part) for part in key) + sys.getsizeof(value)
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Store value under key, evicting least recently used entries as needed
+        """
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every cached entry
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        """
+        Get cache counters and current size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
\ No newline at end of file
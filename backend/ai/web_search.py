@@ -0,0 +1,171 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from bs4 import BeautifulSoup
+
+from ai.intent_router import tokenize
+from utils.cache import RefreshingCache
+from utils.tracing import bind_context, traced
+
+# Elements that never hold a page's main text
+NOISE_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'svg', 'iframe']
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def extract_main_text(html, max_chars=800):
+    """
+    Extract the readable main text of an HTML page
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+
+    root = soup.find('article') or soup.find('main') or soup.body or soup
+    text = _WHITESPACE.sub(' ', root.get_text(' ', strip=True)).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(' ', 1)[0] + '...'
+    return text
+
+
+class SearchPipeline:
+    """
+    Cached Google Custom Search with optional result-page enrichment.
+
+    Search responses are cached per normalized query. Enrichment fetches the
+    top result pages concurrently on a bounded worker pool, extracts their
+    main text and returns whatever finished within the latency budget as a
+    compact snippet bundle suitable for passing to the LLM as context. Pages
+    are streamed and cut off at max_page_bytes or the budget's deadline,
+    whichever comes first.
+    """
+
+    def __init__(self, http, api_key, engine_id, search_url, cache_ttl=900,
+                 cache_max_entries=500, enrich_pages=3, enrich_workers=4,
+                 enrich_budget=1.5, snippet_chars=800, max_page_bytes=512 * 1024):
+        self.logger = logging.getLogger(__name__)
+        self.http = http
+        self.api_key = api_key
+        self.engine_id = engine_id
+        self.search_url = search_url
+        self.enrich_pages = enrich_pages
+        self.enrich_budget = enrich_budget
+        self.snippet_chars = snippet_chars
+        self.max_page_bytes = max_page_bytes
+
+        self.search_cache = RefreshingCache(ttl=cache_ttl, max_entries=cache_max_entries, name='search')
+        self.page_cache = RefreshingCache(ttl=cache_ttl, max_entries=cache_max_entries, name='search-page')
+        self._executor = ThreadPoolExecutor(max_workers=enrich_workers, thread_name_prefix='search-enrich')
+
+        # Guards the counters, which enrichment workers and request threads update concurrently
+        self._lock = threading.Lock()
+        self.pages_fetched = 0
+        self.pages_over_budget = 0
+
+    @traced('search.query')
+    def search(self, query, num=5):
+        """
+        Get search result items ({title, link, snippet}) for a query
+        """
+        key = (' '.join(tokenize(query)), num)
+        return self.search_cache.get(key, lambda: self._fetch_results(query, num))
+
+    def _fetch_results(self, query, num):
+        params = {
+            'key': self.api_key,
+            'cx': self.engine_id,
+            'q': query,
+            'num': num
+        }
+
+        response = self.http.get(self.search_url, params=params)
+        response.raise_for_status()
+        data = response.json()
+
+        return [
+            {
+                "title": item.get('title', ''),
+                "link": item.get('link', ''),
+                "snippet": item.get('snippet', ''),
+            }
+            for item in data.get('items') or []
+        ]
+
+    def enrich(self, items):
+        """
+        Build a snippet bundle from the top result pages within the latency budget
+        """
+        items = [item for item in items[:self.enrich_pages] if item["link"]]
+        if not items:
+            return ""
+
+        deadline = time.monotonic() + self.enrich_budget
+        futures = [self._executor.submit(bind_context(self._page_text), item["link"], deadline) for item in items]
+        wait(futures, timeout=self.enrich_budget)
+
+        sections = []
+        for item, future in zip(items, futures):
+            text = ''
+            if future.done() and not future.exception():
+                text = future.result()
+            else:
+                # Slow pages are dropped, never waited for
+                future.cancel()
+                with self._lock:
+                    self.pages_over_budget += 1
+
+            # The search API snippet stands in for pages we could not read in time
+            text = text or item["snippet"]
+            if text:
+                sections.append(f"[{len(sections) + 1}] {item['title']} ({item['link']})\n{text}")
+
+        return '\n\n'.join(sections)
+
+    @traced('search.fetch_page')
+    def _page_text(self, url, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return ''
+        try:
+            return self.page_cache.get(url, lambda: self._fetch_page_text(url, deadline))
+        except Exception as e:
+            # Network failures are not cached, so the page is retried next time
+            self.logger.debug(f"Could not enrich search result {url}: {e}")
+            return ''
+
+    def _fetch_page_text(self, url, deadline):
+        # httpx timeouts apply per read, so a slow or endless page is cut off here instead
+        timeout = max(0.0, deadline - time.monotonic())
+        with self.http.client.stream('GET', url, timeout=timeout, follow_redirects=True) as response:
+            with self._lock:
+                self.pages_fetched += 1
+            if response.status_code != 200 or 'html' not in response.headers.get('content-type', ''):
+                return ''
+
+            body = bytearray()
+            for chunk in response.iter_bytes():
+                body += chunk
+                if len(body) >= self.max_page_bytes:
+                    del body[self.max_page_bytes:]
+                    break
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"{url} did not finish within the enrichment budget")
+            html = body.decode(response.encoding or 'utf-8', errors='replace')
+
+        return extract_main_text(html, self.snippet_chars)
+
+    def get_stats(self):
+        """
+        Get search cache and enrichment statistics
+        """
+        with self._lock:
+            pages_fetched, pages_over_budget = self.pages_fetched, self.pages_over_budget
+        return {
+            "search_cache": self.search_cache.get_stats(),
+            "page_cache": self.page_cache.get_stats(),
+            "pages_fetched": pages_fetched,
+            "pages_over_budget": pages_over_budget,
+        }
\ No newline at end of file
@@ -1,16 +1,26 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, session, g
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import os
+import json
+import uuid
+import functools
+import inspect
+import threading
 import logging
 from dotenv import load_dotenv
 
 # Import our modules
 from speech.wake_word import WakeWordDetector
-from speech.speech_to_text import SpeechToText
+from speech.speech_to_text import SpeechToText, PCM_MIMETYPES
 from speech.text_to_speech import TextToSpeech
+from speech.audio_decoder import AudioLimitError
 from ai.assistant import AIAssistant
+from ai.rate_limiter import PRIORITY_VOICE
+from ai.batch import BatchRunner
 from utils.logger import setup_logger
+from utils.metrics import REGISTRY, STAGE_LATENCY, ERRORS, IN_FLIGHT
+from utils.tracing import get_tracer, span
 
 # Load environment variables
 load_dotenv()
@@ -26,11 +36,101 @@ CORS(app)
 # Initialize SocketIO
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
+# Request tracing and sampled profiling
+tracer = get_tracer()
+
 # Initialize components
 wake_detector = WakeWordDetector()
 speech_to_text = SpeechToText()
 text_to_speech = TextToSpeech()
 ai_assistant = AIAssistant()
+batch_runner = BatchRunner(
+    ai_assistant,
+    max_workers=int(os.getenv('BATCH_MAX_WORKERS', 32)),
+    max_concurrency=int(os.getenv('BATCH_MAX_CONCURRENCY', 8)),
+    max_items=int(os.getenv('BATCH_MAX_ITEMS', 1000))
+)
+
+# Raw request bodies /api/speech-to-text decodes while they arrive; other audio types get 415
+STREAMED_AUDIO_TYPES = {'audio/wav', 'audio/x-wav', 'audio/wave', 'audio/pcm', 'audio/l16', 'application/octet-stream'}
+
+# Utterances being streamed in over audio_chunk, by Socket.IO sid
+audio_streams = {}
+audio_streams_lock = threading.Lock()
+
+def collect_assistant_metrics():
+    """Export the counters behind /api/stats in Prometheus form"""
+    response_cache = ai_assistant.get_cache_stats()
+    providers = ai_assistant.get_provider_stats()
+    conversations = ai_assistant.conversation_store.get_stats()
+    caches = {
+        "weather": ai_assistant.weather_cache.get_stats(),
+        "search": ai_assistant.search_pipeline.search_cache.get_stats(),
+        "search_page": ai_assistant.search_pipeline.page_cache.get_stats(),
+    }
+    breaker_states = {"closed": 0, "half-open": 1, "open": 2}
+    
+    return [
+        ("jarvis_response_cache_hits_total", "counter", "Response cache hits",
+         [({}, response_cache["hits"])]),
+        ("jarvis_response_cache_misses_total", "counter", "Response cache misses",
+         [({}, response_cache["misses"])]),
+        ("jarvis_response_cache_entries", "gauge", "Responses currently cached",
+         [({}, response_cache["entries"])]),
+        ("jarvis_cache_hits_total", "counter", "Refreshing cache hits, including stale hits",
+         [({"cache": name}, stats["hits"] + stats["stale_hits"]) for name, stats in caches.items()]),
+        ("jarvis_cache_misses_total", "counter", "Refreshing cache misses",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("jarvis_provider_wins_total", "counter", "Responses served per LLM provider",
+         [({"provider": name}, p["wins"]) for name, p in providers["providers"].items()]),
+        ("jarvis_provider_breaker_state", "gauge", "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+         [({"provider": name}, breaker_states.get(p["state"], 0)) for name, p in providers["providers"].items()]),
+        ("jarvis_provider_hedges_total", "counter", "Hedged LLM requests launched",
+         [({}, providers["hedges"])]),
+        ("jarvis_provider_timeouts_total", "counter", "LLM provider calls that timed out (a hedged request can count once per provider)",
+         [({}, providers["timeouts"])]),
+        ("jarvis_rate_limit_queue_depth", "gauge", "Calls waiting for provider rate limit capacity",
+         [({"provider": name}, limits["queued"]) for name, limits in providers["rate_limits"].items()]),
+        ("jarvis_rate_limited_total", "counter", "429 responses received per provider",
+         [({"provider": name}, limits["throttled"]) for name, limits in providers["rate_limits"].items()]),
+        ("jarvis_sessions", "gauge", "Active conversation sessions",
+         [({}, conversations["sessions"])]),
+        ("jarvis_session_tokens", "gauge", "Tokens held across all conversation sessions",
+         [({}, conversations["total_tokens"])]),
+    ]
+
+REGISTRY.add_collector(collect_assistant_metrics)
+
+def get_http_session_id(data=None):
+    """Resolve the conversation session for an HTTP request"""
+    # Explicit ids let API clients keep context without cookies
+    session_id = (data or {}).get('session_id') or request.headers.get('X-Session-ID')
+    if session_id:
+        return f"http:{session_id}"
+    
+    if 'session_id' not in session:
+        session['session_id'] = uuid.uuid4().hex
+    return f"http:{session['session_id']}"
+
+@app.before_request
+def start_request_trace():
+    """Open a trace for every HTTP request"""
+    g.trace = tracer.start_trace(
+        f"{request.method} {request.path}",
+        trace_id=request.headers.get('X-Trace-ID')
+    )
+
+@app.after_request
+def add_trace_header(response):
+    """Return the trace id so clients can quote it when reporting slow requests"""
+    if g.get('trace'):
+        response.headers['X-Trace-ID'] = g.trace[0].trace_id
+    return response
+
+@app.teardown_request
+def end_request_trace(error=None):
+    """Close the request trace (after streamed bodies have been sent)"""
+    tracer.end_trace(g.pop('trace', None), error=error)
 
 @app.route('/')
 def home():
@@ -52,7 +152,8 @@ def chat():
             return jsonify({"error": "No message provided"}), 400
         
         # Get AI response
-        ai_response = ai_assistant.get_response(user_message)
+        with IN_FLIGHT.track(kind='chat'), STAGE_LATENCY.time(stage='llm'):
+            ai_response = ai_assistant.get_response(user_message, session_id=get_http_session_id(data))
         
         return jsonify({
             "response": ai_response,
@@ -61,17 +162,124 @@ def chat():
     
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
+        ERRORS.inc(stage='http', engine='chat')
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle text-based chat requests, streaming the response as it is generated"""
+    try:
+        data = request.get_json()
+        user_message = data.get('message', '')
+        
+        if not user_message:
+            return jsonify({"error": "No message provided"}), 400
+        
+        session_id = get_http_session_id(data)
+        
+        def generate():
+            # Measured until the last chunk is sent, not just until the response starts
+            with IN_FLIGHT.track(kind='chat'), STAGE_LATENCY.time(stage='llm'):
+                yield from ai_assistant.stream_response(user_message, session_id=session_id)
+        
+        # Chunked transfer: each text chunk is flushed as soon as the provider yields it
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/plain',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    except Exception as e:
+        logger.error(f"Error in chat stream endpoint: {str(e)}")
+        ERRORS.inc(stage='http', engine='chat_stream')
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """Handle many chat messages in one request, with bounded concurrency"""
+    try:
+        data = request.get_json() or {}
+        items = batch_runner.parse_items(data.get('messages'))
+        concurrency = batch_runner.parse_concurrency(data.get('concurrency'))
+        
+        with IN_FLIGHT.track(kind='chat_batch'):
+            results = list(batch_runner.run(items, concurrency))
+        
+        return jsonify({
+            "results": results,
+            "status": "success"
+        })
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in chat batch endpoint: {str(e)}")
+        ERRORS.inc(stage='http', engine='chat_batch')
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/api/chat/batch/stream', methods=['POST'])
+def chat_batch_stream():
+    """Handle many chat messages in one request, streaming NDJSON results as they complete"""
+    try:
+        data = request.get_json() or {}
+        items = batch_runner.parse_items(data.get('messages'))
+        concurrency = batch_runner.parse_concurrency(data.get('concurrency'))
+        
+        def generate():
+            with IN_FLIGHT.track(kind='chat_batch'):
+                for result in batch_runner.run(items, concurrency):
+                    yield json.dumps(result) + '\n'
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in chat batch stream endpoint: {str(e)}")
+        ERRORS.inc(stage='http', engine='chat_batch_stream')
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/api/stats', methods=['GET'])
+def assistant_stats():
+    """Report AI cache, session and provider statistics"""
+    return jsonify({
+        "response_cache": ai_assistant.get_cache_stats(),
+        "conversation_store": ai_assistant.conversation_store.get_stats(),
+        "providers": ai_assistant.get_provider_stats(),
+        "weather_cache": ai_assistant.weather_cache.get_stats(),
+        "web_search": ai_assistant.search_pipeline.get_stats(),
+        "prompt": ai_assistant.prompt_builder.get_stats(),
+        "tracing": tracer.get_stats(),
+        "whisper": speech_to_text.get_whisper_stats(),
+        "stt_engines": speech_to_text.get_engine_stats(),
+        "wake_word": wake_detector.get_stats(),
+        "status": "success"
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose pipeline metrics in Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/speech-to-text', methods=['POST'])
 def speech_to_text_endpoint():
-    """Handle speech-to-text conversion"""
+    """Handle speech-to-text conversion of a multipart 'audio' file or a raw audio body"""
     try:
+        if request.mimetype in STREAMED_AUDIO_TYPES:
+            return stream_speech_to_text()
+        if request.mimetype.startswith('audio/'):
+            return jsonify({"error": f"Unsupported audio type {request.mimetype}; send WAV or 16-bit PCM"}), 415
+        
         if 'audio' not in request.files:
             return jsonify({"error": "No audio file provided"}), 400
         
         audio_file = request.files['audio']
-        text = speech_to_text.convert_audio_to_text(audio_file)
+        with IN_FLIGHT.track(kind='speech_to_text'), STAGE_LATENCY.time(stage='stt'):
+            text = speech_to_text.convert_audio_to_text(audio_file)
         
         return jsonify({
             "text": text,
@@ -80,8 +288,42 @@ def speech_to_text_endpoint():
     
     except Exception as e:
         logger.error(f"Error in speech-to-text endpoint: {str(e)}")
+        ERRORS.inc(stage='http', engine='speech_to_text')
         return jsonify({"error": "Internal server error"}), 500
 
+def stream_speech_to_text():
+    """
+    Transcribe a raw WAV or 16-bit PCM request body (plain or chunked), decoding it while it is
+    still being received. Only audio/pcm and audio/L16 bodies are read as headerless PCM; their rate
+    and channels come from the content type, e.g. audio/pcm;rate=48000;channels=2, defaulting to
+    SAMPLE_RATE mono. Other audio types are refused
+    with 415 rather than decoded as PCM noise.
+    """
+    max_bytes = speech_to_text.upload_max_bytes
+    if max_bytes and request.content_length and request.content_length > max_bytes:
+        return jsonify({"error": f"Audio upload is larger than {max_bytes} bytes"}), 413
+    
+    params = request.mimetype_params
+    try:
+        with IN_FLIGHT.track(kind='speech_to_text'), STAGE_LATENCY.time(stage='stt_upload'):
+            text = speech_to_text.convert_upload_to_text(
+                request.stream,
+                sample_rate=params.get('rate'),
+                channels=params.get('channels', 1),
+                pcm=request.mimetype in PCM_MIMETYPES,
+                # audio/L16 is network byte order (RFC 2586)
+                big_endian=request.mimetype == 'audio/l16'
+            )
+    except AudioLimitError as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({
+        "text": text,
+        "status": "success"
+    })
+
 @app.route('/api/text-to-speech', methods=['POST'])
 def text_to_speech_endpoint():
     """Handle text-to-speech conversion"""
@@ -92,7 +334,8 @@ def text_to_speech_endpoint():
         if not text:
             return jsonify({"error": "No text provided"}), 400
         
-        audio_data = text_to_speech.convert_text_to_speech(text)
+        with IN_FLIGHT.track(kind='text_to_speech'), STAGE_LATENCY.time(stage='tts'):
+            audio_data = text_to_speech.convert_text_to_speech(text)
         
         return jsonify({
             "audio": audio_data,
@@ -101,20 +344,76 @@ def text_to_speech_endpoint():
     
     except Exception as e:
         logger.error(f"Error in text-to-speech endpoint: {str(e)}")
+        ERRORS.inc(stage='http', engine='text_to_speech')
         return jsonify({"error": "Internal server error"}), 500
 
+def traced_event(event):
+    """Run a Socket.IO handler inside a trace of its own, named after the event"""
+    def decorator(handler):
+        # Flask-SocketIO may pass more arguments (auth, reason) than a handler takes
+        parameters = inspect.signature(handler).parameters.values()
+        accepts = None if any(p.kind == p.VAR_POSITIONAL for p in parameters) else len(parameters)
+        
+        @functools.wraps(handler)
+        def wrapper(*args):
+            data = args[0] if args and isinstance(args[0], dict) else {}
+            with tracer.trace(f"socketio {event}", trace_id=data.get('trace_id'), sid=request.sid):
+                return handler(*args[:accepts])
+        return wrapper
+    return decorator
+
 @socketio.on('connect')
+@traced_event('connect')
 def handle_connect():
     """Handle client connection"""
     logger.info("Client connected")
     emit('status', {'message': 'Connected to Jarvis AI Assistant'})
 
 @socketio.on('disconnect')
+@traced_event('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     logger.info("Client disconnected")
+    ai_assistant.end_session(request.sid)
+    with audio_streams_lock:
+        audio_streams.pop(request.sid, None)
+
+def respond_to_voice(text, data):
+    """Answer a transcribed voice command, streaming partial text if the client asked for it"""
+    if text and data.get('stream'):
+        # Stream partial responses, then send the full text with audio
+        chunks = []
+        with STAGE_LATENCY.time(stage='llm'):
+            for chunk in ai_assistant.stream_response(text, session_id=request.sid, priority=PRIORITY_VOICE):
+                chunks.append(chunk)
+                emit('ai_response_partial', {'text': chunk})
+        
+        ai_response = ''.join(chunks).strip()
+        with STAGE_LATENCY.time(stage='tts'):
+            audio_response = text_to_speech.convert_text_to_speech(ai_response)
+        
+        emit('ai_response_done', {
+            'text': ai_response,
+            'audio': audio_response
+        })
+    elif text:
+        # Get AI response
+        with STAGE_LATENCY.time(stage='llm'):
+            ai_response = ai_assistant.get_response(text, session_id=request.sid, priority=PRIORITY_VOICE)
+        
+        # Convert response to speech
+        with STAGE_LATENCY.time(stage='tts'):
+            audio_response = text_to_speech.convert_text_to_speech(ai_response)
+        
+        emit('ai_response', {
+            'text': ai_response,
+            'audio': audio_response
+        })
+    else:
+        emit('error', {'message': 'Could not understand speech'})
 
 @socketio.on('voice_command')
+@traced_event('voice_command')
 def handle_voice_command(data):
     """Handle real-time voice commands via WebSocket"""
     try:
@@ -123,28 +422,84 @@ def handle_voice_command(data):
             emit('error', {'message': 'No audio data received'})
             return
         
-        # Convert speech to text
-        text = speech_to_text.convert_audio_data_to_text(audio_data)
-        
-        if text:
-            # Get AI response
-            ai_response = ai_assistant.get_response(text)
+        with IN_FLIGHT.track(kind='voice'), STAGE_LATENCY.time(stage='voice'):
+            # Convert speech to text
+            with STAGE_LATENCY.time(stage='stt'):
+                text = speech_to_text.convert_audio_data_to_text(audio_data)
             
-            # Convert response to speech
-            audio_response = text_to_speech.convert_text_to_speech(ai_response)
-            
-            emit('ai_response', {
-                'text': ai_response,
-                'audio': audio_response
-            })
-        else:
-            emit('error', {'message': 'Could not understand speech'})
+            respond_to_voice(text, data)
     
     except Exception as e:
         logger.error(f"Error handling voice command: {str(e)}")
+        ERRORS.inc(stage='voice', engine='socketio')
+        emit('error', {'message': 'Internal server error'})
+
+def finish_audio_stream(stream, data):
+    """Get the final transcript of a streamed utterance and answer it"""
+    with span('voice.audio_stream'), IN_FLIGHT.track(kind='voice'), STAGE_LATENCY.time(stage='voice'):
+        # Only the tail after the endpoint counts: the rest overlapped with speaking
+        with STAGE_LATENCY.time(stage='stt_stream'):
+            text = speech_to_text.convert_stream_to_text(stream)
+        
+        if text:
+            emit('final_transcript', {'text': text, 'duration': stream.duration})
+        respond_to_voice(text, data)
+
+@socketio.on('audio_chunk')
+@traced_event('audio_chunk')
+def handle_audio_chunk(data):
+    """Handle one chunk of a streamed utterance (16-bit mono PCM)"""
+    try:
+        audio_data = data.get('audio')
+        if not audio_data:
+            emit('error', {'message': 'No audio data received'})
+            return
+        
+        with audio_streams_lock:
+            stream = audio_streams.get(request.sid)
+            if stream is None:
+                stream = speech_to_text.open_stream(data.get('sample_rate'))
+                audio_streams[request.sid] = stream
+        
+        # Chunks after the endpoint are dropped until audio_end starts a new utterance
+        if stream.feed(audio_data, seq=data.get('seq')):
+            finish_audio_stream(stream, data)
+            return
+        
+        segment = stream.next_partial()
+        if segment:
+            text = stream.transcribe_partial(segment)
+            if text and not stream.closed:
+                emit('partial_transcript', {'text': text})
+    
+    except ValueError as e:
+        emit('error', {'message': str(e)})
+    except Exception as e:
+        logger.error(f"Error handling audio chunk: {str(e)}")
+        ERRORS.inc(stage='voice', engine='socketio')
+        emit('error', {'message': 'Internal server error'})
+
+@socketio.on('audio_end')
+@traced_event('audio_end')
+def handle_audio_end(data=None):
+    """Handle the end of a streamed utterance"""
+    try:
+        with audio_streams_lock:
+            stream = audio_streams.pop(request.sid, None)
+        
+        # Already answered if the endpoint was detected first
+        if stream is None or not stream.close():
+            return
+        
+        finish_audio_stream(stream, data or {})
+    
+    except Exception as e:
+        logger.error(f"Error handling audio end: {str(e)}")
+        ERRORS.inc(stage='voice', engine='socketio')
         emit('error', {'message': 'Internal server error'})
 
 @socketio.on('wake_word_detected')
+@traced_event('wake_word_detected')
 def handle_wake_word():
     """Handle wake word detection"""
     logger.info("Wake word detected")
@@ -0,0 +1 @@
+# Benchmarks for Jarvis AI Assistant backend components
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Throughput of the speech-to-text audio stage: in-memory decoding and the
+preprocessing pass (downmix, resample to 16 kHz, trim silence, normalize
+level) across the sample rates and channel layouts browsers send.
+
+Run from the backend directory:
+    python -m benchmarks.bench_audio_preprocess [--iterations 200]
+"""
+import argparse
+import io
+import wave
+
+import numpy as np
+
+from benchmarks.harness import run_benchmark, format_report
+from speech.audio_decoder import decode_audio
+from speech.speech_to_text import preprocess_samples
+
+LAYOUTS = [(16000, 1), (44100, 2), (48000, 2)]
+DURATIONS = [1.5, 4.0, 10.0]
+
+
+def make_capture(duration, sample_rate, channels, lead=0.5, tail=0.5, seed=0):
+    """
+    Build a 16-bit WAV like a browser capture: quiet noise, a voiced-ish tone burst, quiet noise
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    voice = 0.05 * np.sin(2 * np.pi * 180 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    samples = np.concatenate((
+        rng.normal(0, 0.0005, int(lead * sample_rate)),
+        voice + rng.normal(0, 0.0005, len(t)),
+        rng.normal(0, 0.0005, int(tail * sample_rate)),
+    ))
+    frames = np.repeat(samples[:, None], channels, axis=1)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((np.clip(frames, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def decode_and_preprocess(payload):
+    clip = decode_audio(payload)
+    return preprocess_samples(clip.samples, clip.sample_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    args = parser.parse_args()
+
+    results = []
+    audio_seconds = {}
+    reduction = {}
+    for sample_rate, channels in LAYOUTS:
+        layout = f"{sample_rate // 1000}k_{'stereo' if channels == 2 else 'mono'}"
+        payloads = [make_capture(duration, sample_rate, channels, seed=index)
+                    for index, duration in enumerate(DURATIONS)]
+        clips = [decode_audio(payload) for payload in payloads]
+        mean_seconds = sum(clip.duration for clip in clips) / len(clips)
+        # Bytes handed to the engines (16-bit PCM) against the upload
+        sent = sum(len(decode_and_preprocess(payload)) * 2 for payload in payloads)
+        reduction[layout] = 1 - sent / sum(len(payload) for payload in payloads)
+
+        benchmarks = [
+            (f"decode_{layout}", decode_audio, payloads),
+            (f"preprocess_{layout}", lambda clip: preprocess_samples(clip.samples, clip.sample_rate), clips),
+            (f"decode_preprocess_{layout}", decode_and_preprocess, payloads),
+        ]
+        for name, func, fixtures in benchmarks:
+            results.append(run_benchmark(name, func, fixtures, iterations=args.iterations, warmup=args.warmup))
+            audio_seconds[name] = mean_seconds
+
+    report, _ = format_report(results)
+    print(report)
+    print()
+    # Seconds of audio processed per wall-clock second
+    print(f"{'benchmark':<28} {'x realtime':>11}")
+    for result in results:
+        print(f"{result.name:<28} {result.ops_per_sec * audio_seconds[result.name]:>10,.0f}x")
+    print()
+    for layout, fraction in reduction.items():
+        print(f"{layout}: {fraction:.0%} smaller payload after preprocessing")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+In-process benchmarks for the assistant, speech-to-text and text-to-speech
+paths, with every external engine replaced by a deterministic local stub.
+
+Run from the backend directory:
+    python -m benchmarks.bench_components [--iterations 500] [--llm-latency-ms 0]
+    python -m benchmarks.bench_components --save-baseline    # record a baseline
+    python -m benchmarks.bench_components                    # compare against it
+
+Exits non-zero when a benchmark regresses past --tolerance against the baseline,
+and fails outright when anything logs an error: that means a stub no longer
+fits and a fallback branch would be measured instead.
+"""
+import argparse
+import logging
+import os
+import platform
+import sys
+from datetime import datetime
+
+from benchmarks.harness import run_benchmark, load_baseline, save_baseline, format_report
+from benchmarks.stubs import stub_environment, fail_on_errors, check_stubbed, make_wav
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+COMMAND_UTTERANCES = [
+    "what time is it",
+    "what's the date today",
+    "tell me a joke",
+    "what's the weather in London",
+    "weather in Tokyo",
+    "search for python decorators",
+    "look up black holes",
+    "show me my computer specs",
+]
+
+QUESTION_UTTERANCES = [
+    "explain quantum computing in simple terms",
+    "how do I make sourdough bread",
+    "summarize the history of the roman empire",
+    "what is a python decorator",
+    "give me three tips for better sleep",
+    "how does a jet engine work",
+    "recommend a good science fiction book",
+    "what causes the northern lights",
+]
+
+PROSE = ("Certainly. The forecast for today is mostly sunny with a light breeze, "
+         "and temperatures will peak in the early afternoon before clouds roll in.")
+
+
+def build_benchmarks(assistant, speech_to_text, text_to_speech):
+    """
+    Get (name, func, fixtures) for every benchmark
+    """
+    # A long-running session so prompt assembly has history to trim
+    for index in range(assistant.max_history):
+        assistant._update_conversation_history(
+            f"earlier question number {index} about {QUESTION_UTTERANCES[index % len(QUESTION_UTTERANCES)]}",
+            PROSE, 'bench-history'
+        )
+
+    session_ids = [f"bench-{index}" for index in range(32)]
+    uncached = [(text, session_ids[index % len(session_ids)]) for index, text in enumerate(QUESTION_UTTERANCES * 4)]
+    clips = [make_wav(duration, seed=seed) for seed, duration in enumerate((1.0, 2.0, 3.5))]
+    replies = [PROSE[:length] for length in (40, 90, len(PROSE))]
+
+    def tts(engine):
+        return lambda text: text_to_speech.convert_text_to_speech(text, engine=engine)
+
+    return [
+        ("special_commands", assistant._handle_special_commands, COMMAND_UTTERANCES),
+        ("prepare_messages", lambda text: assistant._prepare_messages(text, session_id='bench-history'), QUESTION_UTTERANCES),
+        ("get_response_uncached",
+         lambda item: assistant.get_response(item[0], use_cache=False, session_id=item[1]), uncached),
+        ("get_response_cached", lambda text: assistant.get_response(text, session_id=None), QUESTION_UTTERANCES),
+        ("get_response_commands", lambda text: assistant.get_response(text, session_id=None), COMMAND_UTTERANCES),
+        ("stt_convert_audio_data", speech_to_text.convert_audio_data_to_text, clips),
+        ("tts_pyttsx3", tts('pyttsx3'), replies),
+        ("tts_gtts", tts('gtts'), replies),
+        ("tts_elevenlabs", tts('elevenlabs'), replies),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--only', nargs='*', help='Run only the named benchmarks')
+    for engine in ('llm', 'search', 'weather', 'stt', 'tts'):
+        parser.add_argument(f'--{engine}-latency-ms', type=float, default=0.0,
+                            help=f'Simulated latency of each stubbed {engine} call')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Write this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative change before flagging')
+    args = parser.parse_args()
+
+    # Per-call log lines would dominate the measurements
+    logging.disable(logging.INFO)
+
+    latency_ms = {engine: getattr(args, f'{engine}_latency_ms') for engine in ('llm', 'search', 'weather', 'stt', 'tts')}
+
+    with stub_environment(latency_ms), fail_on_errors("Benchmark run"):
+        from ai.assistant import AIAssistant
+        from speech.speech_to_text import SpeechToText
+        from speech.text_to_speech import TextToSpeech
+
+        assistant, speech_to_text = AIAssistant(), SpeechToText()
+        check_stubbed(assistant, speech_to_text)
+        benchmarks = build_benchmarks(assistant, speech_to_text, TextToSpeech())
+        if args.only:
+            benchmarks = [bench for bench in benchmarks if bench[0] in args.only]
+
+        results = []
+        for name, func, fixtures in benchmarks:
+            results.append(run_benchmark(name, func, fixtures, iterations=args.iterations, warmup=args.warmup))
+            print(f"  finished {name}", file=sys.stderr)
+
+    print(f"Stub latency (ms): {latency_ms}")
+    baseline = {} if args.save_baseline else load_baseline(args.baseline)
+    report, regressions = format_report(results, baseline, args.tolerance)
+    print(report)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, metadata={
+            "created": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "iterations": args.iterations,
+            "latency_ms": latency_ms,
+        })
+        print(f"Baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for name, field, old, new in regressions:
+            print(f"  {name}.{field}: {old:.3f} -> {new:.3f}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Microbenchmark: weighted IntentRouter vs the legacy first-match keyword scan.
+
+Run from the backend directory:
+    python -m benchmarks.bench_intent_router [--utterances 5000] [--rounds 5]
+"""
+import argparse
+import random
+import time
+
+from ai.intent_router import build_default_router
+
+TEMPLATES = [
+    "what time is it",
+    "what's the weather in {city}",
+    "tell me a joke",
+    "open {app}",
+    "search for {topic}",
+    "look up {topic} on google",
+    "what's the date today",
+    "show me my computer specs",
+    "sometimes I wonder about {topic}",
+    "can you update me on {topic}",
+    "how are you doing",
+    "explain {topic} in simple terms",
+    "is it going to rain in {city} tomorrow",
+    "I need to find a good book about {topic}",
+]
+CITIES = ["London", "New York", "Tokyo", "Paris", "Berlin", "Mumbai"]
+APPS = ["chrome", "notepad", "calculator", "google"]
+TOPICS = ["quantum computing", "python decorators", "the roman empire", "black holes", "sourdough bread"]
+
+
+# Keyword table of the substring scan _handle_special_commands used before the router
+LEGACY_COMMANDS = [
+    ('time', ['time', 'what time']),
+    ('date', ['date', 'what date', 'today']),
+    ('weather', ['weather', 'temperature', 'forecast']),
+    ('open_application', ['open']),
+    ('web_search', ['search', 'google', 'find', 'look up']),
+    ('joke', ['joke', 'funny', 'humor']),
+    ('system_info', ['system', 'computer', 'specs']),
+]
+
+
+def legacy_scan(input_lower, commands=LEGACY_COMMANDS):
+    """
+    Linear substring scan, checked in fixed order
+    """
+    for intent, words in commands:
+        if any(word in input_lower for word in words):
+            return intent
+    return None
+
+
+def synthetic_keywords(count):
+    """
+    Deterministic filler keywords that never occur in the utterances
+    """
+    return [f"kw{index}x" for index in range(count)]
+
+
+def make_utterances(count, seed=42):
+    """
+    Build a deterministic utterance set
+    """
+    rng = random.Random(seed)
+    utterances = []
+    for _ in range(count):
+        template = rng.choice(TEMPLATES)
+        utterances.append(template.format(
+            city=rng.choice(CITIES),
+            app=rng.choice(APPS),
+            topic=rng.choice(TOPICS),
+        ))
+    return utterances
+
+
+def time_it(func, utterances, rounds):
+    """
+    Return the best ops/sec over several rounds
+    """
+    best = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for utterance in utterances:
+            func(utterance)
+        elapsed = time.perf_counter() - start
+        best = max(best, len(utterances) / elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--utterances', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--extra-keywords', type=int, nargs='*', default=[0, 50, 200, 1000],
+                        help='Sizes of synthetic keyword sets to add, showing how each approach scales')
+    args = parser.parse_args()
+
+    utterances = make_utterances(args.utterances)
+    router = build_default_router()
+
+    print(f"Utterances:       {len(utterances)} x {args.rounds} rounds")
+    for extra in args.extra_keywords:
+        commands = LEGACY_COMMANDS + [('extra', synthetic_keywords(extra))]
+        extra_router = build_default_router().add_intent('extra', synthetic_keywords(extra))
+
+        legacy_ops = time_it(lambda text: legacy_scan(text.lower(), commands), utterances, args.rounds)
+        router_ops = time_it(extra_router.route, utterances, args.rounds)
+        print(f"+{extra:<5} keywords:  legacy scan {legacy_ops:>10,.0f} ops/sec | "
+              f"intent router {router_ops:>10,.0f} ops/sec ({router_ops / legacy_ops:.2f}x)")
+
+    disagreements = 0
+    for utterance in utterances:
+        match = router.route(utterance)
+        if legacy_scan(utterance.lower()) != (match.intent if match else None):
+            disagreements += 1
+
+    print(f"Routing changes:  {disagreements} utterances routed differently (e.g. 'update' no longer means date)")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+False accepts, false rejects and CPU cost of the local wake word spotter.
+
+Every clip is scored once against the enrolled templates; accept/reject
+rates are then reported for a range of sensitivities. CPU is process time
+spent scoring per second of audio scored.
+
+Run from the backend directory:
+    python -m benchmarks.bench_wake_word [--wake-word "hey jarvis"]
+    python -m benchmarks.bench_wake_word --templates path/to/enrolled --fixtures path/to/clips
+
+--templates holds WAV recordings of just the wake word; --fixtures holds
+NAME.wav clips with NAME.txt transcripts, positive when the transcript
+contains the wake word. Without them, templates and clips are synthesized
+with pyttsx3 at different speaking rates; one synthetic voice flatters
+both rates, so use recordings for numbers that matter.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.harness import percentile
+from benchmarks.speech_fixtures import COMMAND_PHRASES, load_fixtures, normalize_words, synthesize_fixtures
+from speech.keyword_spotter import KeywordSpotter
+
+TEMPLATE_RATES = (150, 175, 200)
+CLIP_RATES = (140, 190, 230)
+SENSITIVITIES = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+WAKE_PHRASES = [
+    "{wake}",
+    "{wake} what time is it",
+    "{wake} tell me a joke",
+    "{wake} turn up the volume",
+]
+# Near misses that share sounds with "hey jarvis"
+CONFUSABLE_PHRASES = [
+    "hey travis",
+    "hey there",
+    "hey charlie",
+    "a jar of peas",
+    "harvest moon",
+    "jars of jam",
+]
+
+
+def synthesize(directory, wake_word):
+    """
+    Write synthetic templates and labelled clips; returns (templates dir, [fixture dirs])
+    """
+    templates = os.path.join(directory, 'templates')
+    for rate in TEMPLATE_RATES:
+        synthesize_fixtures(os.path.join(templates, str(rate)), [wake_word], rate=rate)
+
+    phrases = [phrase.format(wake=wake_word) for phrase in WAKE_PHRASES] + CONFUSABLE_PHRASES + COMMAND_PHRASES
+    clip_dirs = []
+    for rate in CLIP_RATES:
+        clip_dirs.append(os.path.join(directory, 'clips', str(rate)))
+        synthesize_fixtures(clip_dirs[-1], phrases, rate=rate)
+    return [os.path.join(templates, str(rate)) for rate in TEMPLATE_RATES], clip_dirs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wake-word', default='hey jarvis')
+    parser.add_argument('--templates', help='Directory of WAV recordings of the wake word')
+    parser.add_argument('--fixtures', help='Directory of NAME.wav clips with NAME.txt transcripts')
+    parser.add_argument('--rounds', type=int, default=3, help='Timed scoring passes over the clips')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    if bool(args.templates) != bool(args.fixtures):
+        parser.error("--templates and --fixtures go together")
+    if args.templates:
+        template_dirs, clip_dirs = [args.templates], [args.fixtures]
+    else:
+        template_dirs, clip_dirs = synthesize(tempfile.mkdtemp(prefix='jarvis-wake-'), args.wake_word)
+
+    spotter = KeywordSpotter(max_templates=100)
+    for directory in template_dirs:
+        spotter.load_templates(directory)
+    clips = [fixture for directory in clip_dirs for fixture in load_fixtures(directory)]
+    if not spotter.templates or not clips:
+        parser.error("No templates or clips found")
+
+    wake_words = normalize_words(args.wake_word)
+
+    def is_positive(reference):
+        words = normalize_words(reference)
+        return any(words[i:i + len(wake_words)] == wake_words for i in range(len(words)))
+
+    # Score each clip; the first pass also records the distances
+    distances = []
+    latencies = []
+    cpu_seconds = 0.0
+    for round_index in range(args.rounds):
+        for _, clip, reference in clips:
+            cpu_start, start = time.process_time(), time.perf_counter()
+            distance = spotter.score(clip.samples, clip.sample_rate)
+            latencies.append(time.perf_counter() - start)
+            cpu_seconds += time.process_time() - cpu_start
+            if not round_index:
+                distances.append((distance, is_positive(reference), clip.duration))
+
+    audio_seconds = sum(clip.duration for _, clip, _ in clips) * args.rounds
+    positives = [distance for distance, positive, _ in distances if positive]
+    negatives = [distance for distance, positive, _ in distances if not positive]
+    negative_hours = sum(duration for _, positive, duration in distances if not positive) / 3600
+    latencies.sort()
+
+    print(f"Wake word '{args.wake_word}': {len(spotter.templates)} templates, "
+          f"{len(positives)} positive and {len(negatives)} negative clips")
+    print(f"CPU {cpu_seconds / audio_seconds * 1000:.1f} ms per second of audio, "
+          f"p50 {percentile(latencies, 0.50) * 1000:.1f} ms, p95 {percentile(latencies, 0.95) * 1000:.1f} ms per clip")
+    print(f"{'sensitivity':>11} {'threshold':>9} {'false reject':>12} {'false accept':>12} {'FA/hour':>8}")
+    for sensitivity in SENSITIVITIES:
+        threshold = KeywordSpotter(sensitivity).threshold
+        rejects = sum(distance > threshold for distance in positives)
+        accepts = sum(distance <= threshold for distance in negatives)
+        print(f"{sensitivity:>11.2f} {threshold:>9.3f} "
+              f"{rejects / len(positives) if positives else 0.0:>12.1%} "
+              f"{accepts / len(negatives) if negatives else 0.0:>12.1%} "
+              f"{accepts / negative_hours if negative_hours else 0.0:>8.0f}")
+    print("False accepts are confirmed with cloud recognition when WAKE_WORD_CONFIRM is on; "
+          "false rejects are missed wake words.")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Latency and word error rate of Whisper's command-mode decode against the
+transcribe() path it replaces for short utterances.
+
+Needs the real Whisper weights. Run from the backend directory:
+    python -m benchmarks.bench_whisper_command [--model base] [--language en]
+    python -m benchmarks.bench_whisper_command --fixtures path/to/clips   # NAME.wav + NAME.txt
+
+Without --fixtures, command phrases are synthesized with pyttsx3.
+"""
+import argparse
+import logging
+import tempfile
+import time
+
+from benchmarks.harness import percentile
+from benchmarks.speech_fixtures import load_fixtures, synthesize_fixtures, word_error_rate
+
+
+def run_path(name, transcribe, fixtures, rounds):
+    """
+    Time transcribe(samples) over every fixture; returns a result dict
+    """
+    latencies = []
+    realtime_factors = []
+    pairs = []
+    for fixture_name, clip, reference in fixtures:
+        samples = clip.to_whisper_input()
+        text = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            output = transcribe(samples)
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            realtime_factors.append(elapsed / clip.duration)
+            text = output if text is None else text
+        pairs.append((reference, text))
+
+    latencies.sort()
+    return {
+        "path": name,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "rtf": sum(realtime_factors) / len(realtime_factors),
+        "wer": word_error_rate(pairs),
+        "pairs": pairs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='base', help='Whisper model size')
+    parser.add_argument('--language', default=None, help='Language pinned in command mode (default: detect)')
+    parser.add_argument('--fixtures', help='Directory of NAME.wav clips with NAME.txt references')
+    parser.add_argument('--rounds', type=int, default=3, help='Timed runs per fixture and path')
+    parser.add_argument('--verbose', action='store_true', help='Print every hypothesis')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    import whisper
+    from speech.whisper_model import decode_commands
+
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        fixtures = synthesize_fixtures(tempfile.mkdtemp(prefix='jarvis-fixtures-'))
+    if not fixtures:
+        parser.error("No fixtures found")
+
+    model = whisper.load_model(args.model)
+    fp16 = model.device.type != 'cpu'
+    paths = [
+        # What _whisper_recognition did before command mode
+        ("transcribe", lambda samples: model.transcribe(samples, fp16=fp16)["text"].strip()),
+        ("command", lambda samples: decode_commands(model, [samples], args.language)[0]),
+    ]
+
+    # Warm both paths so neither pays for kernel initialisation
+    for _, transcribe in paths:
+        transcribe(fixtures[0][1].to_whisper_input())
+
+    duration = sum(clip.duration for _, clip, _ in fixtures)
+    print(f"Whisper '{args.model}' on {model.device}, {len(fixtures)} fixtures ({duration:.1f}s of audio), "
+          f"{args.rounds} rounds, language={args.language or 'detect'}")
+    print(f"{'path':<12} {'p50 ms':>9} {'p95 ms':>9} {'RTF':>7} {'WER':>7}")
+
+    results = [run_path(name, transcribe, fixtures, args.rounds) for name, transcribe in paths]
+    for result in results:
+        print(f"{result['path']:<12} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+              f"{result['rtf']:>7.3f} {result['wer']:>7.1%}")
+
+    baseline, command = results
+    if command['p50_ms']:
+        print(f"Command mode p50 speedup: {baseline['p50_ms'] / command['p50_ms']:.2f}x, "
+              f"WER change: {(command['wer'] - baseline['wer']) * 100:+.1f} points")
+
+    if args.verbose:
+        for (reference, before), (_, after) in zip(baseline['pairs'], command['pairs']):
+            print(f"  ref: {reference}\n    transcribe: {before}\n    command:    {after}")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
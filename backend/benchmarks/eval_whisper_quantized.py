@@ -0,0 +1,172 @@
+"""
+Evaluate Whisper fp32 against dynamically quantized int8 inference on CPU:
+real-time factor, memory footprint and transcript accuracy.
+
+Each precision runs in its own subprocess so resident memory is measured
+cleanly. Needs the real Whisper weights. Run from the backend directory:
+    python -m benchmarks.eval_whisper_quantized [--model base] [--threads 4]
+    python -m benchmarks.eval_whisper_quantized --fixtures path/to/clips   # NAME.wav + NAME.txt
+
+Without --fixtures, command phrases are synthesized with pyttsx3.
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.harness import percentile
+from benchmarks.speech_fixtures import load_fixtures, synthesize_fixtures, word_error_rate
+
+PRECISIONS = ('fp32', 'int8')
+
+
+class ByteCounter:
+    """
+    Write-only file object that keeps nothing but the number of bytes written
+    """
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def evaluate(precision, args):
+    """
+    Load one precision and transcribe every fixture; returns a result dict
+    """
+    import psutil
+    import torch
+    from speech.whisper_model import load_whisper, transcribe_audio
+
+    process = psutil.Process()
+    fixtures = load_fixtures(args.fixtures)
+    rss_before = process.memory_info().rss
+
+    start = time.perf_counter()
+    if precision == 'fp32':
+        # Same CPU placement as int8 so only the precision differs
+        import whisper
+        if args.threads:
+            torch.set_num_threads(args.threads)
+        model = whisper.load_model(args.model, device='cpu')
+    else:
+        model = load_whisper(args.model, precision, args.threads)
+    load_seconds = time.perf_counter() - start
+
+    rss_loaded = process.memory_info().rss
+    # Serialized size without holding a second copy of the weights in memory
+    weights = ByteCounter()
+    torch.save(model.state_dict(), weights)
+
+    # Warm up so the first fixture does not pay for kernel initialisation
+    transcribe_audio(model, fixtures[0][1].to_whisper_input(), args.language, args.command_max_seconds)
+
+    latencies = []
+    hypotheses = []
+    peak_rss = rss_loaded
+    audio_seconds = 0.0
+    for _ in range(args.rounds):
+        hypotheses = []
+        for _, clip, _ in fixtures:
+            samples = clip.to_whisper_input()
+            start = time.perf_counter()
+            hypotheses.append(transcribe_audio(model, samples, args.language, args.command_max_seconds))
+            latencies.append(time.perf_counter() - start)
+            audio_seconds += clip.duration
+            peak_rss = max(peak_rss, process.memory_info().rss)
+
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "precision": precision,
+        "threads": torch.get_num_threads(),
+        "load_seconds": load_seconds,
+        "weights_mib": weights.size / 2 ** 20,
+        "model_rss_mib": (rss_loaded - rss_before) / 2 ** 20,
+        "peak_rss_mib": peak_rss / 2 ** 20,
+        "rtf": total / audio_seconds if audio_seconds else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "wer": word_error_rate([(reference, text) for (_, _, reference), text in zip(fixtures, hypotheses)]),
+        "hypotheses": hypotheses,
+    }
+
+
+def run_isolated(precision, args):
+    """
+    Run evaluate() for one precision in a fresh interpreter
+    """
+    command = [
+        sys.executable, '-m', 'benchmarks.eval_whisper_quantized', '--run-precision', precision,
+        '--model', args.model, '--fixtures', args.fixtures, '--rounds', str(args.rounds),
+        '--threads', str(args.threads), '--command-max-seconds', str(args.command_max_seconds),
+    ]
+    if args.language:
+        command += ['--language', args.language]
+    output = subprocess.run(command, check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='base', help='Whisper model size')
+    parser.add_argument('--fixtures', help='Directory of NAME.wav clips with NAME.txt references')
+    parser.add_argument('--rounds', type=int, default=2, help='Passes over the fixture set per precision')
+    parser.add_argument('--threads', type=int, default=0, help='Torch intra-op threads (0 = torch default)')
+    parser.add_argument('--language', default=None, help='Pinned language (default: detect)')
+    parser.add_argument('--command-max-seconds', type=float, default=8.0,
+                        help='Clips up to this long use the command-mode decode, as in SpeechToText')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--run-precision', choices=PRECISIONS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    if args.run_precision:
+        print(json.dumps(evaluate(args.run_precision, args)))
+        return
+
+    if not args.fixtures:
+        args.fixtures = tempfile.mkdtemp(prefix='jarvis-fixtures-')
+        synthesize_fixtures(args.fixtures)
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        parser.error("No fixtures found")
+
+    results = [run_isolated(precision, args) for precision in PRECISIONS]
+    fp32, int8 = results
+    # How far int8 drifts from fp32, independent of reference quality
+    agreement = word_error_rate(zip(fp32["hypotheses"], int8["hypotheses"]))
+
+    if args.json:
+        print(json.dumps({"results": results, "int8_vs_fp32_wer": agreement}, indent=2))
+        return
+
+    duration = sum(clip.duration for _, clip, _ in fixtures)
+    print(f"Whisper '{args.model}' on CPU, {len(fixtures)} fixtures ({duration:.1f}s of audio), {args.rounds} rounds")
+    print(f"{'precision':<10} {'threads':>7} {'load s':>7} {'weights MiB':>12} {'model RSS MiB':>14} "
+          f"{'peak RSS MiB':>13} {'RTF':>7} {'p50 ms':>9} {'p95 ms':>9} {'WER':>7}")
+    for result in results:
+        print(f"{result['precision']:<10} {result['threads']:>7} {result['load_seconds']:>7.2f} "
+              f"{result['weights_mib']:>12.1f} {result['model_rss_mib']:>14.1f} {result['peak_rss_mib']:>13.1f} "
+              f"{result['rtf']:>7.3f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['wer']:>7.1%}")
+
+    if int8["rtf"]:
+        print(f"int8 speedup: {fp32['rtf'] / int8['rtf']:.2f}x, "
+              f"WER change: {(int8['wer'] - fp32['wer']) * 100:+.1f} points, "
+              f"int8 vs fp32 transcript WER: {agreement:.1%}")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Timing, allocation and baseline helpers shared by the benchmarks.
+"""
+import gc
+import json
+import math
+import os
+import time
+import tracemalloc
+from collections import namedtuple
+
+BenchResult = namedtuple('BenchResult', [
+    'name', 'iterations', 'ops_per_sec', 'p50_ms', 'p95_ms', 'p99_ms',
+    'alloc_bytes_per_op', 'peak_kib'
+])
+
+# Metrics where a higher value is better; all others regress when they grow
+HIGHER_IS_BETTER = {'ops_per_sec'}
+COMPARED_FIELDS = ('ops_per_sec', 'p50_ms', 'p95_ms', 'p99_ms', 'alloc_bytes_per_op')
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_benchmark(name, func, fixtures, iterations=1000, warmup=50, alloc_iterations=None):
+    """
+    Call func(fixture) for each iteration, cycling through fixtures.
+
+    Latency is measured per call without tracemalloc (which slows allocation
+    heavily); allocations are measured in a separate, shorter pass.
+    """
+    fixtures = list(fixtures)
+    for index in range(warmup):
+        func(fixtures[index % len(fixtures)])
+
+    gc.collect()
+    latencies = []
+    start = time.perf_counter()
+    for index in range(iterations):
+        fixture = fixtures[index % len(fixtures)]
+        call_start = time.perf_counter()
+        func(fixture)
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    alloc_iterations = alloc_iterations or min(iterations, 200)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for index in range(alloc_iterations):
+            func(fixtures[index % len(fixtures)])
+        # tracemalloc only sees live memory: report net retained bytes per op plus the peak
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return BenchResult(
+        name=name,
+        iterations=iterations,
+        ops_per_sec=iterations / elapsed if elapsed else 0.0,
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p95_ms=percentile(latencies, 0.95) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        alloc_bytes_per_op=(after - before) / alloc_iterations,
+        peak_kib=(peak - before) / 1024,
+    )
+
+
+def load_baseline(path):
+    """
+    Load saved results keyed by benchmark name ({} if there is no baseline yet)
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(path, results, metadata=None):
+    """
+    Save results as the new baseline
+    """
+    with open(path, 'w') as f:
+        json.dump({
+            "metadata": metadata or {},
+            "results": {result.name: result._asdict() for result in results},
+        }, f, indent=2, sort_keys=True)
+
+
+def compare(result, baseline_entry, tolerance=0.10):
+    """
+    Get {field: (baseline, change_fraction, regressed)} for a result against its baseline
+    """
+    changes = {}
+    if not baseline_entry:
+        return changes
+
+    for field in COMPARED_FIELDS:
+        old = baseline_entry.get(field)
+        new = getattr(result, field)
+        if old is None:
+            continue
+        if old == 0:
+            change = 0.0 if new == 0 else float('inf')
+        else:
+            change = (new - old) / abs(old)
+        worse = change < -tolerance if field in HIGHER_IS_BETTER else change > tolerance
+        # Tiny absolute numbers (sub-100 byte allocation deltas) are noise
+        if field == 'alloc_bytes_per_op' and abs(new - old) < 100:
+            worse = False
+        changes[field] = (old, change, worse)
+    return changes
+
+
+def format_report(results, baseline=None, tolerance=0.10):
+    """
+    Render results (and deltas against the baseline) as a text table; returns (text, regressions)
+    """
+    baseline = baseline or {}
+    lines = [
+        f"{'benchmark':<28} {'ops/sec':>12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'alloc B/op':>11} {'peak KiB':>9}"
+    ]
+    regressions = []
+    for result in results:
+        lines.append(
+            f"{result.name:<28} {result.ops_per_sec:>12,.1f} {result.p50_ms:>9.3f} {result.p95_ms:>9.3f} "
+            f"{result.p99_ms:>9.3f} {result.alloc_bytes_per_op:>11,.0f} {result.peak_kib:>9,.1f}"
+        )
+        changes = compare(result, baseline.get(result.name), tolerance)
+        if changes:
+            deltas = []
+            for field, (old, change, worse) in changes.items():
+                marker = ' REGRESSION' if worse else ''
+                deltas.append(f"{field} {change:+.1%}{marker}")
+                if worse:
+                    regressions.append((result.name, field, old, getattr(result, field)))
+            lines.append(f"{'':<28} vs baseline: " + ', '.join(deltas))
+    return '\n'.join(lines), regressions
\ No newline at end of file
@@ -0,0 +1,376 @@
+"""
+Load test for the running backend: HTTP endpoints at a target rate plus
+concurrent Socket.IO voice clients, stepped up until the server saturates.
+
+By default it starts the mock upstreams and a real `python app.py` pointed
+at them, then runs each load step and tears both down. Run from the
+backend directory:
+    python -m benchmarks.loadtest --rates 5 10 20 40 --clients 2 4 8 16 --duration 20
+    python -m benchmarks.loadtest --target http://localhost:5000   # an app you started
+
+HTTP traffic is open-loop: requests are sent on a fixed schedule whether or
+not earlier ones finished, and latency is measured from the scheduled send
+time, so queueing inside the server shows up instead of being hidden.
+Socket.IO clients are closed-loop: each sends its next voice_command when
+the previous answer arrives.
+
+Google Speech Recognition has no endpoint override and is not mocked; on a
+machine without network access STT falls back to the local Whisper model.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import socketio
+
+from benchmarks.harness import percentile
+from benchmarks.mock_upstreams import MockUpstreams, add_upstream_arguments, upstream_options
+from benchmarks.stubs import make_wav
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHAT_MESSAGES = [
+    "explain quantum computing in simple terms",
+    "what's the weather in London",
+    "how does a jet engine work",
+    "search for python decorators",
+    "recommend a good science fiction book",
+    "weather in Tokyo",
+    "what causes the northern lights",
+    "tell me a joke",
+]
+
+TTS_TEXTS = [
+    "The weather in London is clear with a light breeze.",
+    "Here is a concise answer about that topic, sir. Certainly, here it is.",
+]
+
+HTTP_ENDPOINTS = ('chat', 'speech_to_text', 'text_to_speech')
+
+
+class Recorder:
+    """
+    Thread-safe latency and error samples per endpoint
+    """
+
+    def __init__(self):
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, latency, ok):
+        with self._lock:
+            self._samples.setdefault(endpoint, []).append((latency, ok))
+
+    def summary(self, duration):
+        """
+        Get per-endpoint throughput, error rate and latency percentiles
+        """
+        with self._lock:
+            samples = {endpoint: list(values) for endpoint, values in self._samples.items()}
+
+        summary = {}
+        for endpoint, values in sorted(samples.items()):
+            latencies = sorted(latency for latency, _ in values)
+            errors = sum(1 for _, ok in values if not ok)
+            summary[endpoint] = {
+                "requests": len(values),
+                "throughput": len(values) / duration if duration else 0.0,
+                "error_rate": errors / len(values) if values else 0.0,
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p90_ms": percentile(latencies, 0.90) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+            }
+        return summary
+
+
+def parse_mix(text):
+    """
+    Parse an endpoint mix such as 'chat=3,speech_to_text=1,text_to_speech=1'
+    """
+    mix = []
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in HTTP_ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}', expected one of {HTTP_ENDPOINTS}")
+        mix.extend([name] * int(weight or 1))
+    return mix
+
+
+def send_http(client, endpoint, index, wav):
+    """
+    Send one request to an HTTP endpoint; returns True on success
+    """
+    if endpoint == 'chat':
+        response = client.post('/api/chat', json={
+            "message": CHAT_MESSAGES[index % len(CHAT_MESSAGES)],
+            "session_id": f"load-{index % 50}",
+        })
+    elif endpoint == 'speech_to_text':
+        response = client.post('/api/speech-to-text', files={"audio": ("clip.wav", wav, "audio/wav")})
+    else:
+        response = client.post('/api/text-to-speech', json={"text": TTS_TEXTS[index % len(TTS_TEXTS)]})
+    return response.status_code == 200 and response.json().get('status') == 'success'
+
+
+def run_http_load(target, rate, duration, mix, wav, recorder, workers, timeout, stop):
+    """
+    Send requests open-loop at rate per second for duration seconds
+    """
+    if rate <= 0:
+        return
+
+    client = httpx.Client(base_url=target, timeout=timeout,
+                          limits=httpx.Limits(max_connections=workers, max_keepalive_connections=workers))
+
+    def fire(index, scheduled):
+        endpoint = mix[index % len(mix)]
+        try:
+            ok = send_http(client, endpoint, index, wav)
+        except Exception:
+            ok = False
+        recorder.add(endpoint, time.perf_counter() - scheduled, ok)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='load-http') as executor:
+        start = time.perf_counter()
+        total = int(rate * duration)
+        for index in range(total):
+            scheduled = start + index / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0 and stop.wait(delay):
+                break
+            executor.submit(fire, index, scheduled)
+    client.close()
+
+
+def run_socket_client(target, wav, deadline, recorder, timeout, stop):
+    """
+    Closed-loop Socket.IO client sending voice_command until the deadline
+    """
+    sio = socketio.Client(reconnection=False)
+    answered = threading.Event()
+    outcome = {}
+
+    @sio.on('ai_response')
+    def on_response(data):
+        outcome['ok'] = bool(data.get('text'))
+        answered.set()
+
+    @sio.on('error')
+    def on_error(data):
+        outcome['ok'] = False
+        answered.set()
+
+    try:
+        connect_start = time.perf_counter()
+        sio.connect(target, wait_timeout=timeout)
+        recorder.add('socketio_connect', time.perf_counter() - connect_start, True)
+    except Exception:
+        recorder.add('socketio_connect', timeout, False)
+        return
+
+    try:
+        while time.perf_counter() < deadline and not stop.is_set():
+            answered.clear()
+            outcome.clear()
+            start = time.perf_counter()
+            sio.emit('voice_command', {'audio': wav})
+            finished = answered.wait(timeout)
+            recorder.add('socketio_voice_command', time.perf_counter() - start, finished and outcome.get('ok', False))
+    finally:
+        sio.disconnect()
+
+
+def run_step(target, rate, clients, args, wav, mix):
+    """
+    Run one load step and summarize it
+    """
+    recorder = Recorder()
+    stop = threading.Event()
+    deadline = time.perf_counter() + args.duration
+
+    threads = [threading.Thread(
+        target=run_http_load,
+        args=(target, rate, args.duration, mix, wav, recorder, args.http_workers, args.timeout, stop),
+        name='load-http-scheduler'
+    )]
+    for client_id in range(clients):
+        threads.append(threading.Thread(
+            target=run_socket_client,
+            args=(target, wav, deadline, recorder, args.timeout, stop),
+            name=f'load-socket-{client_id}'
+        ))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+        raise
+    elapsed = time.perf_counter() - start
+
+    return {
+        "offered_rate": rate,
+        "socket_clients": clients,
+        "duration": elapsed,
+        "endpoints": recorder.summary(elapsed),
+    }
+
+
+def assess_step(step, args):
+    """
+    Get the reasons a step counts as saturated (empty if it kept up)
+    """
+    reasons = []
+    endpoints = step["endpoints"]
+    http = [endpoints[name] for name in HTTP_ENDPOINTS if name in endpoints]
+    completed = sum(stats["requests"] for stats in http)
+    offered = step["offered_rate"] * args.duration
+    if offered and completed < 0.9 * offered:
+        reasons.append(f"completed {completed} of {offered:.0f} offered HTTP requests")
+
+    for name, stats in endpoints.items():
+        if stats["error_rate"] > args.max_error_rate:
+            reasons.append(f"{name} error rate {stats['error_rate']:.1%}")
+        if name != 'socketio_connect' and stats["p95_ms"] > args.slo_ms:
+            reasons.append(f"{name} p95 {stats['p95_ms']:.0f}ms > {args.slo_ms:.0f}ms")
+    return reasons
+
+
+def print_step(step, reasons):
+    print(f"\n=== {step['offered_rate']:g} HTTP req/s, {step['socket_clients']} Socket.IO clients "
+          f"({step['duration']:.1f}s) ===")
+    print(f"{'endpoint':<24} {'requests':>8} {'rps':>7} {'errors':>7} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, stats in step["endpoints"].items():
+        print(f"{name:<24} {stats['requests']:>8} {stats['throughput']:>7.1f} {stats['error_rate']:>7.1%} "
+              f"{stats['p50_ms']:>8.0f} {stats['p90_ms']:>8.0f} {stats['p95_ms']:>8.0f} "
+              f"{stats['p99_ms']:>8.0f} {stats['max_ms']:>8.0f}")
+    print("saturated: " + "; ".join(reasons) if reasons else "healthy")
+
+
+def start_app(upstreams, port, extra_env):
+    """
+    Start app.py with its upstreams pointed at the mock server; returns (process, url)
+    """
+    env = dict(os.environ, **upstreams.app_env())
+    env.update({
+        'PORT': str(port),
+        'DEBUG': 'False',
+        # Provider quotas would cap throughput before the server does
+        'OPENAI_RPM': '0', 'OPENAI_TPM': '0', 'GEMINI_RPM': '0', 'GEMINI_TPM': '0',
+    })
+    env.update(extra_env)
+
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=BACKEND_DIR, env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app.py exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(url + '/', timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+
+    process.terminate()
+    raise RuntimeError("app.py did not become healthy within 120s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', help='URL of an already running backend (skips starting app.py and mocks)')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the app.py started by the load test')
+    parser.add_argument('--rates', type=float, nargs='+', default=[5, 10, 20, 40],
+                        help='Offered HTTP request rate (req/s) for each step')
+    parser.add_argument('--clients', type=int, nargs='+', default=[2],
+                        help='Concurrent Socket.IO clients for each step (one value applies to all)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per step')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('chat=3,speech_to_text=1,text_to_speech=1'),
+                        help='Weighted HTTP endpoint mix')
+    parser.add_argument('--audio', help='WAV file to send (default: a generated 2s clip)')
+    parser.add_argument('--http-workers', type=int, default=256, help='Max concurrent HTTP requests in flight')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    parser.add_argument('--slo-ms', type=float, default=3000.0, help='p95 latency above which a step is saturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='Error rate above which a step is saturated')
+    parser.add_argument('--keep-going', action='store_true', help='Run every step even after saturation')
+    parser.add_argument('--app-env', nargs='*', default=[], metavar='KEY=VALUE',
+                        help='Extra environment for the started app.py')
+    parser.add_argument('--json', help='Write the full results to this file')
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+
+    clients = args.clients * len(args.rates) if len(args.clients) == 1 else args.clients
+    if len(clients) != len(args.rates):
+        parser.error('--clients takes one value or one per --rates step')
+
+    if args.audio:
+        with open(args.audio, 'rb') as f:
+            wav = f.read()
+    else:
+        wav = make_wav(2.0)
+
+    upstreams = process = None
+    target = args.target
+    if not target:
+        latency_ms, error_rate = upstream_options(args)
+        upstreams = MockUpstreams(latency_ms=latency_ms, error_rate=error_rate).start()
+        extra_env = dict(item.split('=', 1) for item in args.app_env)
+        process, target = start_app(upstreams, args.port, extra_env)
+        print(f"Started app.py at {target} with mock upstreams at {upstreams.url}")
+
+    steps = []
+    saturation = None
+    try:
+        for rate, step_clients in zip(args.rates, clients):
+            step = run_step(target, rate, step_clients, args, wav, args.mix)
+            reasons = assess_step(step, args)
+            step["saturated"] = reasons
+            steps.append(step)
+            print_step(step, reasons)
+            if reasons and saturation is None:
+                saturation = step
+                if not args.keep_going:
+                    break
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if upstreams is not None:
+            print(f"\nMock upstream requests: {upstreams.requests}")
+            upstreams.stop()
+
+    healthy = [step for step in steps if not step["saturated"]]
+    print()
+    if saturation is None:
+        print(f"No saturation up to {steps[-1]['offered_rate']:g} req/s with {steps[-1]['socket_clients']} "
+              f"Socket.IO clients; raise --rates/--clients to find the limit")
+    else:
+        last_good = healthy[-1] if healthy else None
+        print(f"Saturation at {saturation['offered_rate']:g} req/s with {saturation['socket_clients']} Socket.IO clients")
+        if last_good:
+            print(f"Last healthy step: {last_good['offered_rate']:g} req/s with {last_good['socket_clients']} clients")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"steps": steps, "saturation": saturation and saturation["offered_rate"]}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,287 @@
+"""
+Local HTTP stand-ins for the backend's upstream APIs, for load testing.
+
+One threaded server answers the OpenAI chat completions API (plain and
+SSE streaming), the Gemini generateContent REST API, Google Custom
+Search, OpenWeather (reached as an HTTP proxy, since pyowm has a fixed
+host), ElevenLabs text-to-speech and arbitrary result pages. Replies are
+deterministic and each service has its own configurable latency and
+error rate, so app.py can be loaded without real keys or quotas.
+
+Run standalone from the backend directory:
+    python -m benchmarks.mock_upstreams --port 8900 --openai-latency-ms 400
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.stubs import stub_reply, stub_audio_bytes, stable_hash
+
+SERVICES = ('openai', 'gemini', 'search', 'weather', 'elevenlabs', 'page')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        # Proxied requests (OpenWeather) carry an absolute URL
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = b''
+        if method == 'POST':
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        path = url.path
+        if path.endswith('/chat/completions'):
+            service, handler = 'openai', self._openai
+        elif ':generateContent' in path or ':streamGenerateContent' in path:
+            service, handler = 'gemini', self._gemini
+        elif path.endswith('/customsearch/v1'):
+            service, handler = 'search', self._search
+        elif path.endswith('/data/2.5/weather'):
+            service, handler = 'weather', self._weather
+        elif '/text-to-speech/' in path:
+            service, handler = 'elevenlabs', self._elevenlabs
+        else:
+            service, handler = 'page', self._page
+
+        upstreams = self.server.upstreams
+        upstreams.record(service)
+        upstreams.wait(service)
+        if upstreams.should_fail(service):
+            self._send_json({"error": {"message": "Injected upstream failure"}}, status=503)
+            return
+        handler(path, query, json.loads(body) if body else {})
+
+    def _send(self, status, content_type, data):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, payload, status=200):
+        self._send(status, 'application/json', json.dumps(payload).encode('utf-8'))
+
+    def _send_sse(self, events):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        for event in events:
+            self.wfile.write(f"data: {event}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+    def _openai(self, path, query, payload):
+        prompt = ' '.join(message.get('content', '') for message in payload.get('messages', []))
+        reply = stub_reply(prompt)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(reply) // 4,
+                 "total_tokens": len(prompt) // 4 + len(reply) // 4}
+        base = {"id": f"chatcmpl-{stable_hash(prompt)}", "created": int(time.time()), "model": payload.get('model')}
+
+        if payload.get('stream'):
+            chunks = [
+                json.dumps(dict(base, object="chat.completion.chunk",
+                                choices=[{"index": 0, "delta": {"content": word + ' '}, "finish_reason": None}]))
+                for word in reply.split()
+            ]
+            self._send_sse(chunks + ['[DONE]'])
+            return
+
+        self._send_json(dict(base, object="chat.completion", usage=usage, choices=[
+            {"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}
+        ]))
+
+    def _gemini(self, path, query, payload):
+        prompt = ' '.join(
+            part.get('text', '')
+            for content in payload.get('contents', [])
+            for part in content.get('parts', [])
+        )
+        reply = stub_reply(prompt)
+
+        def response(text):
+            return {
+                "candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                                "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4,
+                                  "totalTokenCount": (len(prompt) + len(text)) // 4},
+            }
+
+        if ':streamGenerateContent' in path:
+            chunks = [response(word + ' ') for word in reply.split()]
+            if query.get('alt') == 'sse':
+                self._send_sse(json.dumps(chunk) for chunk in chunks)
+            else:
+                self._send_json(chunks)
+            return
+        self._send_json(response(reply))
+
+    def _search(self, path, query, payload):
+        text = query.get('q', '')
+        self._send_json({"items": [
+            {
+                "title": f"Result {index} for {text}",
+                "link": f"http://{self.headers.get('Host')}/pages/{stable_hash(text)}/{index}",
+                "snippet": f"Snippet {index} about {text}.",
+            } for index in range(int(query.get('num', 5)))
+        ]})
+
+    def _weather(self, path, query, payload):
+        location = query.get('q', 'London').split(',')[0]
+        seed = stable_hash(location.lower())
+        kelvin = 278.15 + seed % 25
+        now = int(time.time())
+        self._send_json({
+            "coord": {"lon": 0.0, "lat": 0.0},
+            "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+            "base": "stations",
+            "main": {"temp": kelvin, "feels_like": kelvin - 1.5, "temp_min": kelvin - 3, "temp_max": kelvin + 2,
+                     "pressure": 1012, "humidity": 40 + seed % 50},
+            "visibility": 10000,
+            "wind": {"speed": 3.1, "deg": 200},
+            "clouds": {"all": seed % 100},
+            "dt": now,
+            "sys": {"country": "GB", "sunrise": now - 20000, "sunset": now + 20000},
+            "timezone": 0,
+            "id": seed % 1000000,
+            "name": location.title(),
+            "cod": 200,
+        })
+
+    def _elevenlabs(self, path, query, payload):
+        self._send(200, 'audio/mpeg', stub_audio_bytes(payload.get('text', '')))
+
+    def _page(self, path, query, payload):
+        html = (f"<html><head><title>{path}</title></head><body><nav>menu</nav><article>"
+                f"<p>Deterministic page text for {path}. {stub_reply(path)}</p></article></body></html>")
+        self._send(200, 'text/html; charset=utf-8', html.encode('utf-8'))
+
+
+class MockUpstreams:
+    """
+    Threaded local server standing in for every upstream API
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=None, error_rate=None, seed=0):
+        self.latency_ms = {service: 0.0 for service in SERVICES}
+        self.latency_ms.update(latency_ms or {})
+        self.error_rate = {service: 0.0 for service in SERVICES}
+        self.error_rate.update(error_rate or {})
+        self.requests = {service: 0 for service in SERVICES}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.upstreams = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, service):
+        with self._lock:
+            self.requests[service] += 1
+
+    def wait(self, service):
+        delay = self.latency_ms.get(service, 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def should_fail(self, service):
+        rate = self.error_rate.get(service, 0.0)
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='mock-upstreams', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def app_env(self):
+        """
+        Environment variables pointing app.py at this server
+        """
+        return {
+            'OPENAI_API_KEY': 'loadtest',
+            'OPENAI_API_BASE': f"{self.url}/v1",
+            'GOOGLE_API_KEY': 'loadtest',
+            'GEMINI_API_ENDPOINT': self.url,
+            'GOOGLE_SEARCH_API_KEY': 'loadtest',
+            'SEARCH_ENGINE_ID': 'loadtest',
+            'GOOGLE_SEARCH_URL': f"{self.url}/customsearch/v1",
+            'OPENWEATHER_API_KEY': 'loadtest',
+            'OPENWEATHER_PROXY': self.url,
+            'OPENWEATHER_USE_SSL': 'False',
+            'ELEVENLABS_API_KEY': 'loadtest',
+            'ELEVENLABS_API_BASE': self.url,
+            'TTS_ENGINE': 'elevenlabs',
+        }
+
+
+def add_upstream_arguments(parser):
+    """
+    Add --<service>-latency-ms and --<service>-error-rate options
+    """
+    for service in SERVICES:
+        parser.add_argument(f'--{service}-latency-ms', type=float, default=0.0,
+                            help=f'Latency of each mocked {service} response')
+        parser.add_argument(f'--{service}-error-rate', type=float, default=0.0,
+                            help=f'Fraction of mocked {service} requests that fail with 503')
+
+
+def upstream_options(args):
+    """
+    Get (latency_ms, error_rate) dicts from parsed arguments
+    """
+    latency_ms = {service: getattr(args, f'{service}_latency_ms') for service in SERVICES}
+    error_rate = {service: getattr(args, f'{service}_error_rate') for service in SERVICES}
+    return latency_ms, error_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+
+    latency_ms, error_rate = upstream_options(args)
+    upstreams = MockUpstreams(args.host, args.port, latency_ms, error_rate).start()
+    print(f"Mock upstreams listening on {upstreams.url}")
+    print("Point the backend at them with:")
+    for key, value in upstreams.app_env().items():
+        print(f"  {key}={value}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        upstreams.stop()
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Labelled speech fixtures and word error rate for the speech benchmarks.
+
+A fixture directory holds NAME.wav clips, each with a NAME.txt reference
+transcript. Without one, fixtures can be synthesized offline with pyttsx3
+(padded with silence like a push-to-talk capture); synthetic speech flatters
+absolute WER, so use recorded fixtures for accuracy numbers that matter.
+"""
+import glob
+import os
+import re
+
+import numpy as np
+
+from speech.audio_decoder import decode_audio
+
+COMMAND_PHRASES = [
+    "what time is it",
+    "what's the weather in London",
+    "tell me a joke",
+    "open the calculator",
+    "search for python decorators",
+    "what's the date today",
+    "set a timer for five minutes",
+    "turn up the volume",
+    "look up black holes",
+    "how are you doing today",
+    "show me my computer specs",
+    "remind me to call mom tomorrow morning",
+]
+
+
+def normalize_words(text):
+    """
+    Lowercase words with punctuation (including apostrophes) removed
+    """
+    return re.sub(r"[^a-z0-9 ]+", ' ', text.lower().replace("'", '')).split()
+
+
+def word_errors(reference, hypothesis):
+    """
+    Get (word edit distance, reference word count)
+    """
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def word_error_rate(pairs):
+    """
+    Corpus WER over (reference, hypothesis) pairs
+    """
+    edits = words = 0
+    for reference, hypothesis in pairs:
+        pair_edits, pair_words = word_errors(reference, hypothesis)
+        edits += pair_edits
+        words += pair_words
+    return edits / words if words else 0.0
+
+
+def load_fixtures(directory):
+    """
+    Get [(name, AudioClip, reference)] for every NAME.wav with a NAME.txt
+    """
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+        reference_path = os.path.splitext(path)[0] + '.txt'
+        if not os.path.exists(reference_path):
+            continue
+        with open(reference_path, 'r', encoding='utf-8') as f:
+            reference = f.read().strip()
+        fixtures.append((os.path.basename(path), decode_audio(path), reference))
+    return fixtures
+
+
+def synthesize_fixtures(directory, phrases=COMMAND_PHRASES, lead_seconds=0.6, tail_seconds=0.8, seed=0, rate=None):
+    """
+    Write pyttsx3 renderings of phrases, padded with low noise, as a fixture directory;
+    rate is the speaking rate in words per minute (default: the voice's own)
+    """
+    import pyttsx3
+    import wave
+
+    os.makedirs(directory, exist_ok=True)
+    engine = pyttsx3.init()
+    if rate:
+        engine.setProperty('rate', rate)
+    raw_paths = []
+    for index, phrase in enumerate(phrases):
+        raw_path = os.path.join(directory, f"raw_{index:02d}.wav")
+        engine.save_to_file(phrase, raw_path)
+        raw_paths.append(raw_path)
+    engine.runAndWait()
+
+    rng = np.random.default_rng(seed)
+    for index, (phrase, raw_path) in enumerate(zip(phrases, raw_paths)):
+        clip = decode_audio(raw_path)
+        os.remove(raw_path)
+
+        def noise(seconds):
+            return rng.normal(0.0, 0.003, int(clip.sample_rate * seconds)).astype(np.float32)
+
+        samples = np.concatenate((noise(lead_seconds), clip.samples, noise(tail_seconds)))
+        name = os.path.join(directory, f"command_{index:02d}")
+        with wave.open(name + '.wav', 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(clip.sample_rate)
+            f.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+        with open(name + '.txt', 'w', encoding='utf-8') as f:
+            f.write(phrase + '\n')
+
+    return load_fixtures(directory)
\ No newline at end of file
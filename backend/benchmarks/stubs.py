@@ -0,0 +1,415 @@
+"""
+Deterministic local stand-ins for the external engines used by the backend.
+
+Every stub sleeps for a configurable latency and returns content derived
+only from its input, so benchmark runs are repeatable and never touch the
+network, a microphone or a speech model. stub_environment() swaps them in
+at the attribute level (module globals such as ai.assistant.openai), so the
+real request path of AIAssistant, SpeechToText and TextToSpeech still runs.
+"""
+import hashlib
+import io
+import logging
+import math
+import os
+import struct
+import time
+import wave
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+# Per-call latency of each stubbed engine, in milliseconds
+DEFAULT_LATENCY_MS = {
+    'llm': 0.0,
+    'search': 0.0,
+    'weather': 0.0,
+    'stt': 0.0,
+    'tts': 0.0,
+}
+
+STUB_ENV = {
+    'OPENAI_API_KEY': 'bench-openai',
+    'GOOGLE_API_KEY': 'bench-google',
+    'GOOGLE_SEARCH_API_KEY': 'bench-search',
+    'SEARCH_ENGINE_ID': 'bench-engine',
+    'OPENWEATHER_API_KEY': 'bench-weather',
+    'ELEVENLABS_API_KEY': 'bench-elevenlabs',
+    # Admission control would otherwise throttle tight benchmark loops
+    'OPENAI_RPM': '0',
+    'OPENAI_TPM': '0',
+    'GEMINI_RPM': '0',
+    'GEMINI_TPM': '0',
+    # The stub Whisper model is patched in-process (no worker processes) and mimics transcribe() only
+    'WHISPER_WORKERS': '0',
+    'WHISPER_COMMAND_MAX_SECONDS': '0',
+}
+
+
+def stable_hash(text):
+    """
+    Hash text to an int that is stable across runs (unlike hash())
+    """
+    return int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16)
+
+
+class StubLatency:
+    """
+    Sleeps for the configured latency of an engine
+    """
+
+    def __init__(self, latency_ms=None):
+        self.latency_ms = dict(DEFAULT_LATENCY_MS, **(latency_ms or {}))
+
+    def wait(self, engine):
+        delay = self.latency_ms.get(engine, 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+
+def stub_reply(prompt_text):
+    """
+    Deterministic assistant reply for a prompt
+    """
+    words = ['certainly', 'here', 'is', 'a', 'concise', 'answer', 'about', 'that', 'topic', 'sir']
+    length = 12 + stable_hash(prompt_text) % 24
+    return ' '.join(words[i % len(words)] for i in range(length)).capitalize() + '.'
+
+
+class StubChatCompletion:
+    """
+    Mimics openai.ChatCompletion.create (legacy API) with and without stream=True
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, model=None, messages=(), stream=False, **kwargs):
+        self.latency.wait('llm')
+        prompt_text = ' '.join(message['content'] for message in messages)
+        reply = stub_reply(prompt_text)
+        if stream:
+            return iter([
+                SimpleNamespace(choices=[SimpleNamespace(delta={'content': word + ' '})])
+                for word in reply.split()
+            ])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=reply))],
+            usage=SimpleNamespace(total_tokens=len(prompt_text) // 4 + len(reply) // 4)
+        )
+
+
+class StubGeminiModel:
+    """
+    Mimics google.generativeai.GenerativeModel.generate_content
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.latency.wait('llm')
+        reply = stub_reply(prompt)
+        usage = SimpleNamespace(total_token_count=len(prompt) // 4 + len(reply) // 4)
+        if stream:
+            return iter([SimpleNamespace(text=word + ' ') for word in reply.split()])
+        return SimpleNamespace(text=reply, usage_metadata=usage)
+
+
+class StubWeatherManager:
+    """
+    Mimics pyowm's weather manager
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def weather_at_place(self, location):
+        self.latency.wait('weather')
+        seed = stable_hash(location)
+        temp = 5 + seed % 25
+        weather = SimpleNamespace(
+            humidity=40 + seed % 50,
+            detailed_status=['clear sky', 'light rain', 'scattered clouds'][seed % 3],
+            temperature=lambda unit: {
+                'temp': float(temp), 'feels_like': temp - 1.5,
+                'temp_min': temp - 3.0, 'temp_max': temp + 2.0,
+            }
+        )
+        return SimpleNamespace(weather=weather)
+
+
+class StubResponse:
+    """
+    Minimal httpx.Response look-alike
+    """
+
+    def __init__(self, status_code=200, json_data=None, content=b'', headers=None):
+        self.status_code = status_code
+        self._json = json_data
+        self.content = content
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return self._json
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class StubHTTPClient:
+    """
+    Serves search results, result pages and ElevenLabs audio in place of HTTPClient
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def get(self, url, params=None, **kwargs):
+        self.latency.wait('search')
+        if params and 'q' in params:
+            query = params['q']
+            return StubResponse(json_data={'items': [
+                {
+                    'title': f"Result {index} for {query}",
+                    'link': f"https://example.invalid/{stable_hash(query)}/{index}",
+                    'snippet': f"Snippet {index} about {query}.",
+                } for index in range(params.get('num', 5))
+            ]})
+
+        page = f"<html><body><article><p>Page text for {url}.</p></article></body></html>"
+        return StubResponse(content=page.encode('utf-8'), headers={'content-type': 'text/html'})
+
+    def post(self, url, json=None, **kwargs):
+        self.latency.wait('tts')
+        return StubResponse(content=stub_audio_bytes(json.get('text', '') if json else ''))
+
+
+def make_recognize_google_stub(latency):
+    """
+    Build a replacement for speech_recognition.Recognizer.recognize_google
+    """
+    def recognize_google(recognizer, audio_data, *args, **kwargs):
+        latency.wait('stt')
+        return stub_transcript(audio_data.get_raw_data())
+
+    return recognize_google
+
+
+class StubMicrophone:
+    """
+    Stands in for speech_recognition.Microphone so no audio device is opened
+    """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class StubWhisperModel:
+    """
+    Mimics whisper's model.transcribe for paths and float32 arrays
+    """
+
+    # Callers read device.type like a torch.device
+    device = SimpleNamespace(type='cpu')
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def transcribe(self, audio, **kwargs):
+        self.latency.wait('stt')
+        if isinstance(audio, str):
+            with open(audio, 'rb') as f:
+                data = f.read()
+        else:
+            data = bytes(memoryview(audio).cast('B')[:4096])
+        return {"text": " " + stub_transcript(data)}
+
+
+class StubPyttsx3Engine:
+    """
+    Mimics a pyttsx3 engine writing synthesized audio to a file
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self._pending = []
+        self._properties = {'voices': [SimpleNamespace(id='stub-voice')]}
+
+    def setProperty(self, name, value):
+        self._properties[name] = value
+
+    def getProperty(self, name):
+        return self._properties.get(name)
+
+    def save_to_file(self, text, path):
+        self._pending.append((text, path))
+
+    def say(self, text):
+        pass
+
+    def runAndWait(self):
+        self.latency.wait('tts')
+        for text, path in self._pending:
+            with open(path, 'wb') as f:
+                f.write(stub_audio_bytes(text))
+        self._pending = []
+
+
+def make_gtts_stub(latency):
+    """
+    Build a gTTS class look-alike bound to latency
+    """
+    class StubGTTS:
+        def __init__(self, text, lang='en', slow=False):
+            self.text = text
+
+        def save(self, path):
+            latency.wait('tts')
+            with open(path, 'wb') as f:
+                f.write(stub_audio_bytes(self.text))
+
+    return StubGTTS
+
+
+def stub_transcript(data):
+    """
+    Deterministic transcript for a chunk of audio bytes
+    """
+    phrases = ['what time is it', 'tell me a joke', 'what is the weather in london',
+               'search for python decorators', 'explain black holes in simple terms']
+    return phrases[int(hashlib.md5(data[:4096]).hexdigest()[:8], 16) % len(phrases)]
+
+
+def stub_audio_bytes(text, bytes_per_char=600):
+    """
+    Deterministic fake encoded audio, sized like real speech for text
+    """
+    seed = hashlib.sha256(text.encode('utf-8')).digest()
+    size = max(1, len(text)) * bytes_per_char
+    return (seed * (size // len(seed) + 1))[:size]
+
+
+def make_wav(duration=1.0, sample_rate=16000, frequency=220.0, seed=0):
+    """
+    Build a deterministic 16-bit mono WAV clip (a tone with a little pseudo-noise)
+    """
+    frames = int(duration * sample_rate)
+    samples = []
+    state = seed or 1
+    for index in range(frames):
+        state = (1103515245 * state + 12345) & 0x7fffffff
+        noise = (state / 0x7fffffff - 0.5) * 0.05
+        value = 0.4 * math.sin(2 * math.pi * frequency * index / sample_rate) + noise
+        samples.append(int(max(-1.0, min(1.0, value)) * 32767))
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(struct.pack(f'<{frames}h', *samples))
+    return buffer.getvalue()
+
+
+class ErrorLog(logging.Handler):
+    """
+    Collects ERROR records logged anywhere in the process
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(f"{record.name}: {record.getMessage()}")
+
+
+@contextmanager
+def fail_on_errors(what):
+    """
+    Raise RuntimeError after the block if anything in it logged an error, e.g. a
+    stub that no longer matches the code it replaces, which would otherwise fall
+    back silently and get a different branch measured
+    """
+    handler = ErrorLog()
+    root = logging.getLogger()
+    root.addHandler(handler)
+    try:
+        yield handler
+    finally:
+        root.removeHandler(handler)
+    if handler.messages:
+        raise RuntimeError(f"{what} logged errors:\n  " + "\n  ".join(handler.messages))
+
+
+def check_stubbed(assistant, speech_to_text):
+    """
+    Raise RuntimeError if a component came up without an engine its benchmarks exercise
+    """
+    missing = [
+        name for name, configured in (
+            ("OpenAI", assistant.openai_api_key),
+            ("Gemini", assistant.gemini_model),
+            ("OpenWeather", assistant.weather_mgr),
+            # Whisper loads lazily, so only a load shows whether its stub is in place
+            ("Whisper", speech_to_text.whisper.get() is not None),
+        ) if not configured
+    ]
+    if missing:
+        raise RuntimeError(f"Stub environment incomplete, not configured: {', '.join(missing)}")
+
+
+@contextmanager
+def stub_environment(latency_ms=None):
+    """
+    Patch every external engine with a deterministic stub for the duration of the block
+    """
+    import speech_recognition as sr
+
+    latency = StubLatency(latency_ms)
+    http = StubHTTPClient(latency)
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(os.environ, STUB_ENV))
+
+        # AI providers, search and weather
+        stack.enter_context(mock.patch('ai.assistant.openai', SimpleNamespace(
+            api_key=None, ChatCompletion=StubChatCompletion(latency)
+        )))
+        stack.enter_context(mock.patch('ai.assistant.genai', SimpleNamespace(
+            configure=lambda **kwargs: None, GenerativeModel=lambda name: StubGeminiModel(latency)
+        )))
+        stack.enter_context(mock.patch('ai.assistant.OWM', lambda key, config=None: SimpleNamespace(
+            weather_manager=lambda: StubWeatherManager(latency)
+        )))
+        stack.enter_context(mock.patch('ai.assistant.get_http_client', lambda: http))
+
+        # Speech recognition: no microphone, no Google round trip, no Whisper weights
+        stack.enter_context(mock.patch.object(sr, 'Microphone', StubMicrophone))
+        stack.enter_context(mock.patch.object(sr.Recognizer, 'adjust_for_ambient_noise', lambda *args, **kwargs: None))
+        stack.enter_context(mock.patch.object(sr.Recognizer, 'recognize_google', make_recognize_google_stub(latency)))
+        # load_whisper is where whisper and torch get imported, so neither needs to be installed
+        stack.enter_context(mock.patch(
+            'speech.whisper_model.load_whisper', lambda *args, **kwargs: StubWhisperModel(latency)
+        ))
+
+        # Speech synthesis
+        stack.enter_context(mock.patch('speech.text_to_speech.pyttsx3', SimpleNamespace(
+            init=lambda *args, **kwargs: StubPyttsx3Engine(latency)
+        )))
+        stack.enter_context(mock.patch('speech.text_to_speech.gtts', SimpleNamespace(gTTS=make_gtts_stub(latency))))
+        stack.enter_context(mock.patch('speech.text_to_speech.get_http_client', lambda: http))
+
+        yield latency
\ No newline at end of file
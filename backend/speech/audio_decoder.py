@@ -0,0 +1,396 @@
+import struct
+import subprocess
+from io import BytesIO
+
+import numpy as np
+import speech_recognition as sr
+
+# Whisper works on 16 kHz mono float32 audio
+WHISPER_SAMPLE_RATE = 16000
+
+# WAVE_FORMAT_* codes from the fmt chunk
+_FORMAT_PCM = 1
+_FORMAT_FLOAT = 3
+_FORMAT_EXTENSIBLE = 0xFFFE
+
+_PCM_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+# Leading bytes of containers that must never be read as raw PCM: Matroska/WebM, Ogg, MP3 with ID3
+_CONTAINER_MAGIC = (b'\x1aE\xdf\xa3', b'OggS', b'ID3')
+
+
+class AudioClip:
+    """
+    Decoded mono audio shared by every recognition engine.
+
+    The samples are float32 in [-1, 1] at the clip's own sample rate. The
+    engine-specific views (16-bit PCM AudioData for Google, 16 kHz float32
+    for Whisper) are derived from them on first use and cached, so a clip
+    is decoded once however many engines see it.
+    """
+
+    def __init__(self, samples, sample_rate):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self._audio_data = None
+        self._whisper_samples = None
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate if self.sample_rate else 0.0
+
+    def to_audio_data(self):
+        """
+        Get the clip as 16-bit speech_recognition AudioData
+        """
+        if self._audio_data is None:
+            pcm = (np.clip(self.samples, -1.0, 1.0) * 32767).astype('<i2')
+            self._audio_data = sr.AudioData(pcm.tobytes(), self.sample_rate, 2)
+        return self._audio_data
+
+    def to_whisper_input(self):
+        """
+        Get the clip as 16 kHz float32 samples, the array Whisper takes directly
+        """
+        if self._whisper_samples is None:
+            self._whisper_samples = resample(self.samples, self.sample_rate, WHISPER_SAMPLE_RATE)
+        return self._whisper_samples
+
+    @classmethod
+    def from_audio_data(cls, audio_data):
+        """
+        Wrap speech_recognition AudioData (e.g. from the microphone)
+        """
+        pcm = audio_data.get_raw_data(convert_width=2)
+        return cls(pcm16_to_float32(pcm), audio_data.sample_rate)
+
+
+def pcm16_to_float32(data):
+    """
+    Convert little-endian 16-bit PCM bytes to float32 samples without copying the input
+    """
+    view = memoryview(data)
+    usable = len(view) - len(view) % 2
+    return np.frombuffer(view[:usable], dtype='<i2').astype(np.float32) / 32768.0
+
+
+def lowpass_kernel(cutoff, taps=63):
+    """
+    Hann-windowed sinc low-pass FIR; cutoff is a fraction of the sample rate
+    """
+    positions = np.arange(taps) - (taps - 1) / 2.0
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * positions) * np.hanning(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(samples, from_rate, to_rate):
+    """
+    Linear-interpolation resampling; when downsampling, content above the
+    new Nyquist frequency is filtered out first so it does not alias into
+    the speech band
+    """
+    if from_rate == to_rate or not len(samples):
+        return samples
+    if to_rate < from_rate:
+        samples = np.convolve(samples, lowpass_kernel(0.5 * to_rate / from_rate * 0.9), mode='same')
+    target_length = int(round(len(samples) * to_rate / from_rate))
+    positions = np.arange(target_length, dtype=np.float64) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def trim_silence(samples, sample_rate=WHISPER_SAMPLE_RATE, frame_ms=20, threshold_db=-35.0, floor_db=-55.0,
+                 pad_ms=100):
+    """
+    Cut leading and trailing silence with a frame energy gate.
+
+    A frame counts as sound when its energy is within threshold_db of the
+    loudest frame and above floor_db. Returns a view from pad_ms before the
+    first such frame to pad_ms after the last, or an empty array if there
+    is none.
+    """
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    count = len(samples) // frame_length
+    if not count:
+        return samples
+
+    frames = samples[:count * frame_length].reshape(count, frame_length)
+    energies = 10.0 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-10)
+    voiced = np.flatnonzero(energies > max(energies.max() + threshold_db, floor_db))
+    if not len(voiced):
+        return samples[:0]
+
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, voiced[0] * frame_length - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame_length + pad)
+    return samples[start:end]
+
+
+def _parse_wav_header(view):
+    """
+    Walk the RIFF chunks up to the start of the sample data; returns
+    (format, channels, sample_rate, bits, data_offset, data_size), or None
+    if view ends before the data chunk header does; raises ValueError for a
+    malformed header
+    """
+    if len(view) < 12 or bytes(view[0:4]) != b'RIFF' or bytes(view[8:12]) != b'WAVE':
+        raise ValueError("Not a WAV file")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from('<I', view, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            if chunk_size < 16:
+                raise ValueError(f"WAV fmt chunk is {chunk_size} bytes; expected at least 16")
+            if body + chunk_size > len(view):
+                return None
+            audio_format, channels, sample_rate = struct.unpack_from('<HHI', view, body)
+            bits = struct.unpack_from('<H', view, body + 14)[0]
+            if audio_format == _FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # The real format code is the first field of the sub-format GUID
+                audio_format = struct.unpack_from('<H', view, body + 24)[0]
+            fmt = (audio_format, channels, sample_rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            return fmt + (body, chunk_size)
+        offset = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+def _parse_wav(view):
+    """
+    Parse a RIFF/WAVE buffer; returns (format, channels, sample_rate, bits, data_view)
+    """
+    header = _parse_wav_header(view)
+    if header is None:
+        raise ValueError("WAV file has no data chunk")
+
+    audio_format, channels, sample_rate, bits, body, chunk_size = header
+    # Streaming writers leave the size as 0 or 0xFFFFFFFF; take what is there
+    end = len(view) if chunk_size in (0, 0xFFFFFFFF) else min(len(view), body + chunk_size)
+    return (audio_format, channels, sample_rate, bits, view[body:end])
+
+
+def _wav_samples(audio_format, channels, bits, data):
+    width = bits // 8
+    usable = len(data) - len(data) % (width * channels)
+    data = data[:usable]
+
+    if audio_format == _FORMAT_FLOAT and width in (4, 8):
+        samples = np.frombuffer(data, dtype='<f4' if width == 4 else '<f8').astype(np.float32, copy=False)
+    elif audio_format == _FORMAT_PCM and width in _PCM_DTYPES:
+        raw = np.frombuffer(data, dtype=np.dtype(_PCM_DTYPES[width]).newbyteorder('<'))
+        if width == 1:
+            samples = (raw.astype(np.float32) - 128.0) / 128.0
+        else:
+            samples = raw.astype(np.float32) / float(2 ** (bits - 1))
+    elif audio_format == _FORMAT_PCM and width == 3:
+        # 24-bit: widen each little-endian triplet to int32
+        triplets = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        raw = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+        raw = np.where(raw & 0x800000, raw - 0x1000000, raw)
+        samples = raw.astype(np.float32) / 8388608.0
+    else:
+        raise ValueError(f"Unsupported WAV encoding (format {audio_format}, {bits} bits)")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return samples
+
+
+def _is_container(header):
+    """
+    Check whether the first bytes of a buffer belong to a compressed container (WebM, Ogg, MP3, MP4/M4A)
+    """
+    return header.startswith(_CONTAINER_MAGIC) or header[4:8] == b'ftyp'
+
+
+def _ffmpeg_decode(data, sample_rate=WHISPER_SAMPLE_RATE):
+    """
+    Decode compressed audio through ffmpeg pipes into a 16 kHz mono AudioClip, as Whisper's own loader does
+    """
+    command = [
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-i', 'pipe:0',
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), 'pipe:1'
+    ]
+    try:
+        result = subprocess.run(command, input=bytes(data), capture_output=True)
+    except FileNotFoundError:
+        raise ValueError("Audio is not WAV, AIFF or FLAC, and ffmpeg is not installed to decode it")
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', errors='replace').strip().splitlines()
+        raise ValueError(f"Unrecognized audio format: {message[-1] if message else 'ffmpeg failed'}")
+    return AudioClip(pcm16_to_float32(result.stdout), sample_rate)
+
+
+def decode_audio(source, pcm_sample_rate=16000, pcm=False):
+    """
+    Decode audio held in memory into an AudioClip.
+
+    source may be bytes-like, a file-like object or a file path. WAV is
+    parsed directly from the buffer; AIFF and FLAC go through
+    speech_recognition's in-memory reader. Headerless bytes are taken as
+    raw 16-bit mono PCM at pcm_sample_rate only when the caller says so
+    with pcm; anything else (WebM, Ogg, MP3...) is decoded by ffmpeg and
+    raises ValueError if it cannot be.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            source = f.read()
+    elif hasattr(source, 'read'):
+        source = source.read()
+
+    view = memoryview(source)
+    header = bytes(view[:12])
+
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        audio_format, channels, sample_rate, bits, data = _parse_wav(view)
+        return AudioClip(_wav_samples(audio_format, channels, bits, data), sample_rate)
+
+    if header[:4] in (b'FORM', b'fLaC'):
+        with sr.AudioFile(BytesIO(source)) as audio_source:
+            audio_data = sr.Recognizer().record(audio_source)
+        return AudioClip.from_audio_data(audio_data)
+
+    if pcm and not _is_container(header):
+        return AudioClip(pcm16_to_float32(view), pcm_sample_rate)
+
+    return _ffmpeg_decode(view)
+
+
+class AudioLimitError(ValueError):
+    """
+    An upload went over its size or duration limit
+    """
+
+
+class IncrementalDecoder:
+    """
+    Decode a WAV or raw 16-bit PCM upload while its bytes are still arriving.
+
+    feed() converts each chunk to mono float32 as soon as whole frames are
+    available, so only the decoded samples and a partial frame are held,
+    never the upload itself, and decoding overlaps the transfer. The first
+    bytes decide the format as in decode_audio(): headerless bytes are raw
+    PCM only with pcm set, little-endian unless pcm_big_endian (audio/L16).
+    AIFF, FLAC and compressed formats cannot be decoded piecewise and are
+    buffered until finish(). Limits of 0 are off.
+    """
+
+    def __init__(self, pcm_sample_rate=16000, pcm_channels=1, max_bytes=0, max_seconds=0, pcm=False,
+                 pcm_big_endian=False):
+        self.pcm = pcm
+        self.pcm_sample_rate = pcm_sample_rate
+        self.pcm_channels = pcm_channels
+        self.pcm_big_endian = pcm_big_endian
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+
+        self.received = 0
+        self.frames = 0
+        self._pending = bytearray()
+        self._chunks = []
+        # (format, channels, sample_rate, bits) once the format is known
+        self._format = None
+        self._remaining = None
+        self._buffered = False
+        self._swap_bytes = False
+
+    @property
+    def sample_rate(self):
+        return self._format[2] if self._format else self.pcm_sample_rate
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate if self._format else 0.0
+
+    def feed(self, data):
+        """
+        Take the next chunk of the upload; raises AudioLimitError past a limit and ValueError on malformed audio
+        """
+        self.received += len(data)
+        if self.max_bytes and self.received > self.max_bytes:
+            raise AudioLimitError(f"Audio upload is larger than {self.max_bytes} bytes")
+
+        self._pending += data
+        if self._format is None and not self._buffered:
+            self._read_header()
+        if self._format is not None:
+            self._decode_pending()
+
+    def finish(self):
+        """
+        Decode whatever is left and get the whole upload as an AudioClip
+        """
+        if self._format is None and not self._buffered:
+            # Shorter than a header so far
+            self._read_header(final=True)
+
+        if self._buffered:
+            clip = decode_audio(bytes(self._pending), self.pcm_sample_rate, pcm=self.pcm)
+            self._pending = bytearray()
+            self._check_duration(clip.duration)
+            return clip
+
+        self._decode_pending()
+
+        samples = np.concatenate(self._chunks) if self._chunks else np.zeros(0, dtype=np.float32)
+        self._chunks = []
+        return AudioClip(samples, self.sample_rate)
+
+    def _read_header(self, final=False):
+        header = bytes(self._pending[:12])
+        if len(header) < 12 and not final:
+            return
+
+        if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+            with memoryview(self._pending) as view:
+                parsed = _parse_wav_header(view)
+            if parsed is None:
+                if final:
+                    raise ValueError("WAV file has no data chunk")
+                return
+            audio_format, channels, sample_rate, bits, body, chunk_size = parsed
+            if not channels or not sample_rate or bits < 8:
+                raise ValueError("Invalid WAV format chunk")
+            self._format = (audio_format, channels, sample_rate, bits)
+            # Streaming writers leave the size as 0 or 0xFFFFFFFF; read to the end
+            self._remaining = None if chunk_size in (0, 0xFFFFFFFF) else chunk_size
+            if self._remaining is not None:
+                self._check_duration(chunk_size / (channels * (bits // 8) * sample_rate))
+            del self._pending[:body]
+        elif header[:4] in (b'FORM', b'fLaC') or _is_container(header) or not self.pcm:
+            self._buffered = True
+        else:
+            self._format = (_FORMAT_PCM, self.pcm_channels, self.pcm_sample_rate, 16)
+            self._swap_bytes = self.pcm_big_endian
+
+    def _decode_pending(self):
+        audio_format, channels, _, bits = self._format
+        if self._remaining is not None:
+            # Anything after the data chunk (LIST, id3...) is not audio
+            del self._pending[self._remaining:]
+        frame_bytes = channels * (bits // 8)
+        usable = len(self._pending) - len(self._pending) % frame_bytes
+        if not usable:
+            return
+
+        # Copied out so the samples never alias the buffer being resized
+        data = bytes(self._pending[:usable])
+        del self._pending[:usable]
+        if self._swap_bytes:
+            data = np.frombuffer(data, dtype='>i2').astype('<i2').tobytes()
+        samples = _wav_samples(audio_format, channels, bits, data)
+        if self._remaining is not None:
+            self._remaining -= usable
+        self._chunks.append(samples)
+        self.frames += len(samples)
+        self._check_duration(self.duration)
+
+    def _check_duration(self, seconds):
+        if self.max_seconds and seconds > self.max_seconds:
+            raise AudioLimitError(f"Audio upload is longer than {self.max_seconds:g} seconds")
\ No newline at end of file
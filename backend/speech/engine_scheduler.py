@@ -0,0 +1,240 @@
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils.metrics import FALLBACKS, counter, gauge
+from utils.tracing import bind_context
+
+ENGINE_SELECTED = counter(
+    'jarvis_stt_engine_selected_total', 'STT engine tried first for a request', ('engine', 'mode')
+)
+RACE_WINS = counter('jarvis_stt_race_wins_total', 'Raced STT requests won by each engine', ('engine',))
+ROLLING_LATENCY = gauge(
+    'jarvis_stt_engine_rolling_latency_seconds', 'Mean latency of recent successful calls per STT engine', ('engine',)
+)
+SUCCESS_RATIO = gauge(
+    'jarvis_stt_engine_success_ratio', 'Share of recent calls per STT engine that did not fail (no-speech results excluded)',
+    ('engine',)
+)
+
+
+class EngineStats:
+    """
+    Rolling window of an engine's recent calls
+    """
+
+    def __init__(self, window=20, prior_latency=1.0):
+        self.prior_latency = prior_latency
+        self.calls = collections.deque(maxlen=window)
+        self.last_attempt = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def claim_probe(self, now, interval):
+        """
+        Claim the next probe of an unhealthy engine; only one caller gets it per interval
+        """
+        with self._lock:
+            if self.probe_in_flight or now - self.last_attempt < interval:
+                return False
+            self.probe_in_flight = True
+            self.last_attempt = now
+            return True
+
+    def release_probe(self):
+        """
+        Give back a claimed probe that was never run; the engine waits for the next interval
+        """
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record(self, latency, success, probe=False):
+        """
+        Record a call: success True (text), False (error or timeout) or None (no speech,
+        which says nothing about the engine). A probe that did not fail clears the history.
+        """
+        with self._lock:
+            if probe:
+                self.probe_in_flight = False
+                if success is not False:
+                    self.calls.clear()
+            if success is not None:
+                self.calls.append((latency, success))
+
+    @property
+    def success_rate(self):
+        with self._lock:
+            calls = list(self.calls)
+        return sum(1 for _, success in calls if success) / len(calls) if calls else 1.0
+
+    @property
+    def latency(self):
+        """
+        Mean latency of recent successes (failures are often fast and would flatter the engine)
+        """
+        with self._lock:
+            latencies = [latency for latency, success in self.calls if success]
+        return sum(latencies) / len(latencies) if latencies else self.prior_latency
+
+
+class EngineScheduler:
+    """
+    Picks the STT engine per request from observed latency and success.
+
+    Healthy engines (recent success rate at least min_success_rate) are
+    tried fastest first and the rest after them, so a failing engine stops
+    costing its full latency before the fallback runs. Once probe_interval
+    seconds have passed since an unhealthy engine was last tried, it is
+    tried first for one request, like a half-open circuit breaker; a probe
+    that does not fail clears its failure history. Only errors and timeouts
+    count as failures: an empty transcript just means no speech. Clips
+    no longer than race_max_seconds are sent to every healthy engine at
+    once and the first non-empty transcript wins; the others still finish
+    in the background and feed the statistics.
+    """
+
+    def __init__(self, window=20, min_success_rate=0.5, probe_interval=30.0, race_max_seconds=0.0, max_workers=8):
+        self.logger = logging.getLogger(__name__)
+        self.window = window
+        self.min_success_rate = min_success_rate
+        self.probe_interval = probe_interval
+        self.race_max_seconds = race_max_seconds
+
+        self._engines = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stt-engine')
+
+        self.races = 0
+        self.race_wins = {}
+
+    def add_engine(self, name, func, available=lambda: True, prior_latency=1.0):
+        """
+        Register an engine; func(audio) returns the transcript or "" for no speech and raises on
+        errors (registration order breaks ties)
+        """
+        self._engines.append({
+            "name": name,
+            "func": func,
+            "available": available,
+            "stats": EngineStats(self.window, prior_latency),
+        })
+        self.race_wins[name] = 0
+        return self
+
+    def _state(self, engine, now):
+        stats = engine["stats"]
+        if stats.success_rate >= self.min_success_rate:
+            return 'healthy'
+        if stats.probe_in_flight or now - stats.last_attempt < self.probe_interval:
+            return 'unhealthy'
+        return 'probe'
+
+    def _ranked(self, claim_probes=False):
+        """
+        Get (engine, state) for the available engines: due probes, then healthy ones fastest
+        first, then the rest. With claim_probes, a probe another request claimed first ranks
+        as unhealthy.
+        """
+        now = time.monotonic()
+        order = {'probe': 0, 'healthy': 1, 'unhealthy': 2}
+        ranked = []
+        for engine in self._engines:
+            if not engine["available"]():
+                continue
+            state = self._state(engine, now)
+            if state == 'probe' and claim_probes and not engine["stats"].claim_probe(now, self.probe_interval):
+                state = 'unhealthy'
+            ranked.append((engine, state))
+        return sorted(ranked, key=lambda item: (order[item[1]], item[0]["stats"].latency))
+
+    def rank(self):
+        """
+        Get the available engines in the order they would be tried now
+        """
+        return [engine for engine, _ in self._ranked()]
+
+    def _call(self, engine, audio, probing=False):
+        stats = engine["stats"]
+        stats.last_attempt = time.monotonic()
+        start = time.perf_counter()
+        try:
+            text = engine["func"](audio)
+            success = True if text else None
+        except Exception as e:
+            self.logger.error(f"{engine['name']} speech recognition error: {e}")
+            text = ""
+            success = False
+
+        if probing and success is not False:
+            self.logger.info(f"{engine['name']} speech recognition recovered")
+        stats.record(time.perf_counter() - start, success, probe=probing)
+        ROLLING_LATENCY.set(stats.latency, engine=engine["name"])
+        SUCCESS_RATIO.set(stats.success_rate, engine=engine["name"])
+        return text
+
+    def transcribe(self, audio, duration=None):
+        """
+        Get the first non-empty transcript, racing engines on short clips
+        """
+        ranked = self._ranked(claim_probes=True)
+        if not ranked:
+            return ""
+
+        healthy = [(engine, state) for engine, state in ranked if state != 'unhealthy']
+        if len(healthy) > 1 and duration is not None and duration <= self.race_max_seconds:
+            return self._race(healthy, audio)
+
+        ENGINE_SELECTED.inc(engine=ranked[0][0]["name"], mode='ranked')
+        for index, (engine, state) in enumerate(ranked):
+            if index:
+                FALLBACKS.inc(stage='stt', engine=engine["name"])
+            text = self._call(engine, audio, probing=state == 'probe')
+            if text:
+                for skipped, skipped_state in ranked[index + 1:]:
+                    if skipped_state == 'probe':
+                        skipped["stats"].release_probe()
+                return text
+        return ""
+
+    def _race(self, ranked, audio):
+        self.races += 1
+        ENGINE_SELECTED.inc(engine=ranked[0][0]["name"], mode='race')
+        # Engine spans nest under the caller's trace
+        pending = {
+            self._executor.submit(bind_context(self._call), engine, audio, state == 'probe'): engine
+            for engine, state in ranked
+        }
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                engine = pending.pop(future)
+                text = future.result()
+                if text:
+                    self.race_wins[engine["name"]] += 1
+                    RACE_WINS.inc(engine=engine["name"])
+                    # Losers keep running in the pool and still update their statistics
+                    return text
+        return ""
+
+    def get_stats(self):
+        """
+        Get the current ranking and each engine's rolling statistics
+        """
+        now = time.monotonic()
+        return {
+            "ranking": [engine["name"] for engine in self.rank()],
+            "engines": {
+                engine["name"]: {
+                    "available": engine["available"](),
+                    "state": self._state(engine, now),
+                    "latency": engine["stats"].latency,
+                    "success_rate": engine["stats"].success_rate,
+                    "calls": len(engine["stats"].calls),
+                    "race_wins": self.race_wins[engine["name"]],
+                } for engine in self._engines
+            },
+            "race_max_seconds": self.race_max_seconds,
+            "races": self.races,
+        }
\ No newline at end of file
@@ -0,0 +1,226 @@
+import functools
+import glob
+import os
+import threading
+import time
+import uuid
+import wave
+
+import numpy as np
+
+from speech.audio_decoder import decode_audio, resample, trim_silence, WHISPER_SAMPLE_RATE
+
+FRAME_MS = 25
+HOP_MS = 10
+N_MELS = 40
+N_MFCC = 13
+
+# Mean per-frame distance between normalized MFCCs that still counts as the keyword, at
+# sensitivity 0 and 1; unrelated frames are about 1.4 apart
+MIN_THRESHOLD = 0.5
+MAX_THRESHOLD = 1.1
+
+
+@functools.lru_cache(maxsize=4)
+def _mel_filterbank(sample_rate, n_fft, n_mels):
+    """
+    Triangular mel filters as an (n_mels, n_fft // 2 + 1) matrix
+    """
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    mel_points = np.linspace(to_mel(20.0), to_mel(sample_rate / 2.0), n_mels + 2)
+    hz_points = 700.0 * (10 ** (mel_points / 2595.0) - 1.0)
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+
+    lower, center, upper = hz_points[:-2, None], hz_points[1:-1, None], hz_points[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+@functools.lru_cache(maxsize=4)
+def _dct_matrix(n_mels, n_mfcc):
+    """
+    Orthonormal DCT-II rows 0..n_mfcc-1
+    """
+    k = np.arange(n_mfcc)[:, None]
+    n = np.arange(n_mels)[None, :]
+    matrix = np.sqrt(2.0 / n_mels) * np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels))
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+def mfcc_features(samples, sample_rate=WHISPER_SAMPLE_RATE, n_mfcc=N_MFCC, n_mels=N_MELS):
+    """
+    Get MFCCs (without c0) per 10 ms frame, mean and variance normalized over
+    the clip so level and microphone colouring cancel out; shape (frames, n_mfcc - 1)
+    """
+    frame_length = int(sample_rate * FRAME_MS / 1000)
+    hop = int(sample_rate * HOP_MS / 1000)
+    if len(samples) < frame_length:
+        return np.zeros((0, n_mfcc - 1), dtype=np.float32)
+
+    n_fft = 1 << (frame_length - 1).bit_length()
+    emphasized = np.append(samples[:1], samples[1:] - 0.97 * samples[:-1]).astype(np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(emphasized, frame_length)[::hop]
+    spectrum = np.fft.rfft(frames * np.hamming(frame_length).astype(np.float32), n_fft)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2) / n_fft
+
+    log_mel = np.log(np.maximum(power @ _mel_filterbank(sample_rate, n_fft, n_mels).T, 1e-10))
+    cepstra = (log_mel @ _dct_matrix(n_mels, n_mfcc).T)[:, 1:]
+    return ((cepstra - cepstra.mean(axis=0)) / (cepstra.std(axis=0) + 1e-8)).astype(np.float32)
+
+
+def subsequence_dtw(template, features):
+    """
+    Best alignment of the whole template against any stretch of features.
+
+    Each template frame advances the match by 0, 1 or 2 feature frames, so
+    the keyword may be spoken between half and twice the template's speed.
+    Returns (mean per-frame distance, start frame, end frame), or
+    (inf, 0, 0) when no stretch fits.
+    """
+    n, m = len(template), len(features)
+    if not n or m < (n + 1) // 2:
+        return float('inf'), 0, 0
+
+    # Pairwise frame distances: RMS difference per coefficient
+    squared = (np.square(template).sum(axis=1)[:, None] + np.square(features).sum(axis=1)[None, :]
+               - 2.0 * template @ features.T)
+    cost = np.sqrt(np.maximum(squared, 0.0) / template.shape[1])
+
+    columns = np.arange(m)
+    total = cost[0].copy()
+    start = columns.copy()
+    candidates = np.empty((3, m), dtype=total.dtype)
+    starts = np.empty((3, m), dtype=start.dtype)
+    for row in cost[1:]:
+        candidates.fill(np.inf)
+        candidates[0] = total
+        candidates[1, 1:] = total[:-1]
+        candidates[2, 2:] = total[:-2]
+        starts[0] = start
+        starts[1, 1:] = start[:-1]
+        starts[2, 2:] = start[:-2]
+        choice = candidates.argmin(axis=0)
+        total = candidates[choice, columns] + row
+        start = starts[choice, columns]
+
+    span = columns - start + 1
+    total = np.where((span >= (n + 1) // 2) & (span <= 2 * n), total, np.inf)
+    end = int(total.argmin())
+    return float(total[end] / n), int(start[end]), end
+
+
+class KeywordSpotter:
+    """
+    On-device keyword matching against enrolled recordings of the keyword.
+
+    Clips are trimmed, turned into MFCCs and aligned against every template
+    with subsequence DTW; the closest template decides. sensitivity runs
+    from 0 (only near-identical utterances match) to 1 (loose matches,
+    more false accepts).
+    """
+
+    def __init__(self, sensitivity=0.5, sample_rate=WHISPER_SAMPLE_RATE, max_templates=10):
+        self.sensitivity = min(1.0, max(0.0, sensitivity))
+        self.sample_rate = sample_rate
+        self.max_templates = max_templates
+        # [(name, features)]; replaced, never mutated, so detect() needs no lock
+        self.templates = []
+        self._lock = threading.Lock()
+
+        self.checks = 0
+        self.hits = 0
+
+    @property
+    def threshold(self):
+        return MIN_THRESHOLD + (MAX_THRESHOLD - MIN_THRESHOLD) * self.sensitivity
+
+    def features(self, samples, sample_rate):
+        """
+        Get MFCCs of the speech in a mono float32 clip, silence trimmed
+        """
+        samples = trim_silence(resample(samples, sample_rate, self.sample_rate), self.sample_rate)
+        return mfcc_features(samples, self.sample_rate)
+
+    def add_template(self, samples, sample_rate, name=None):
+        """
+        Enroll one recording of the keyword; the oldest template is dropped past max_templates
+        """
+        features = self.features(samples, sample_rate)
+        if len(features) < 10:
+            raise ValueError("Keyword template has no speech")
+
+        with self._lock:
+            templates = self.templates + [(name or f"template_{len(self.templates)}", features)]
+            self.templates = templates[-self.max_templates:]
+        return features
+
+    def clear_templates(self):
+        with self._lock:
+            self.templates = []
+
+    def load_templates(self, directory):
+        """
+        Enroll every WAV file in a directory; returns how many were loaded
+        """
+        loaded = 0
+        for path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+            clip = decode_audio(path)
+            try:
+                self.add_template(clip.samples, clip.sample_rate, name=os.path.basename(path))
+                loaded += 1
+            except ValueError:
+                continue
+        return loaded
+
+    def save_template(self, directory, samples, sample_rate):
+        """
+        Enroll a recording and keep it as a 16 kHz WAV in directory; returns the file path
+        """
+        samples = trim_silence(resample(samples, sample_rate, self.sample_rate), self.sample_rate)
+        os.makedirs(directory, exist_ok=True)
+        # Unique and in enrollment order, so load_templates() keeps the newest
+        now = time.time()
+        name = f"template_{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}_{int(now * 1000) % 1000:03d}_{uuid.uuid4().hex[:8]}.wav"
+        self.add_template(samples, self.sample_rate, name=name)
+
+        path = os.path.join(directory, name)
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+        return path
+
+    def score(self, samples, sample_rate):
+        """
+        Get the distance of a clip to its closest template (inf without templates or speech)
+        """
+        templates = self.templates
+        if not templates:
+            return float('inf')
+
+        features = self.features(samples, sample_rate)
+        return min(subsequence_dtw(template, features)[0] for _, template in templates)
+
+    def detect(self, samples, sample_rate):
+        """
+        Check a clip for the keyword; returns (hit, distance)
+        """
+        distance = self.score(samples, sample_rate)
+        hit = distance <= self.threshold
+        self.checks += 1
+        self.hits += hit
+        return hit, distance
+
+    def get_stats(self):
+        return {
+            "templates": len(self.templates),
+            "sensitivity": self.sensitivity,
+            "threshold": round(self.threshold, 3),
+            "checks": self.checks,
+            "hits": self.hits,
+        }
\ No newline at end of file
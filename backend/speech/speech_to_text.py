@@ -1,24 +1,107 @@
 import speech_recognition as sr
-import whisper
 import numpy as np
 import os
 import logging
-import tempfile
-from io import BytesIO
+from utils.metrics import ENGINE_LATENCY, ERRORS
+from utils.tracing import span, traced
+from speech.whisper_model import WhisperModel, transcribe_audio
+from speech.whisper_pool import WhisperPool
+from speech.engine_scheduler import EngineScheduler
+from speech.audio_decoder import AudioClip, IncrementalDecoder, decode_audio, resample, trim_silence, WHISPER_SAMPLE_RATE
+from speech.streaming import StreamingSession
+
+# Content types that mark an upload as headerless 16-bit PCM
+PCM_MIMETYPES = ('audio/pcm', 'audio/l16')
+
+ENGINE_NAMES = {'google': "Google Speech Recognition", 'whisper': "Whisper"}
+
+def preprocess_samples(samples, sample_rate, target_rate=WHISPER_SAMPLE_RATE, target_dbfs=-20.0, max_gain_db=20.0,
+                       trim=True):
+    """
+    Normalize mono float32 samples for recognition in a few whole-array passes:
+    resample to target_rate, strip leading/trailing silence, remove DC offset
+    and bring the RMS level to target_dbfs (gain capped at max_gain_db, peaks
+    kept below full scale). Returns the new samples, at target_rate.
+    """
+    samples = resample(samples, sample_rate, target_rate)
+    if trim:
+        samples = trim_silence(samples, target_rate)
+    if not len(samples):
+        return np.zeros(0, dtype=np.float32)
+    
+    samples = samples - samples.mean(dtype=np.float64)
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    peak = float(np.abs(samples).max())
+    if rms <= 1e-6:
+        return samples.astype(np.float32, copy=False)
+    
+    gain = min(10 ** (target_dbfs / 20.0) / rms, 10 ** (max_gain_db / 20.0), 0.99 / peak)
+    return (samples * gain).astype(np.float32, copy=False)
+
 
 class SpeechToText:
     def __init__(self):
         self.recognizer = sr.Recognizer()
+        # Sample rate assumed for headerless PCM uploads
+        self.pcm_sample_rate = int(os.getenv('SAMPLE_RATE', 16000))
         self.microphone = sr.Microphone()
         self.logger = logging.getLogger(__name__)
         
-        # Initialize Whisper model
-        try:
-            self.whisper_model = whisper.load_model("base")
-            self.logger.info("Whisper model loaded successfully")
-        except Exception as e:
-            self.logger.warning(f"Could not load Whisper model: {e}")
-            self.whisper_model = None
+        # Whisper is loaded on first use (or warmed up in the background), not at startup
+        self.whisper = WhisperModel(
+            model_name=os.getenv('WHISPER_MODEL', 'base'),
+            idle_timeout=float(os.getenv('WHISPER_IDLE_UNLOAD', 0)),
+            precision=os.getenv('WHISPER_PRECISION', 'fp32').lower(),
+            threads=int(os.getenv('WHISPER_THREADS', 0))
+        )
+        # Clips up to this long take the single-pass command-mode decode (0 disables it)
+        self.command_max_seconds = float(os.getenv('WHISPER_COMMAND_MAX_SECONDS', 8))
+        self.whisper_language = os.getenv('WHISPER_LANGUAGE') or None
+        
+        # With WHISPER_WORKERS set, Whisper runs in its own processes instead of request threads
+        self.whisper_pool = None
+        workers = int(os.getenv('WHISPER_WORKERS', 0))
+        if workers > 0:
+            self.whisper_pool = WhisperPool(
+                model_name=self.whisper.model_name,
+                workers=workers,
+                max_batch=int(os.getenv('WHISPER_MAX_BATCH', 8)),
+                batch_window_ms=float(os.getenv('WHISPER_BATCH_WINDOW_MS', 10)),
+                deadline=float(os.getenv('WHISPER_DEADLINE', 15)),
+                language=self.whisper_language,
+                command_max_seconds=self.command_max_seconds,
+                precision=self.whisper.precision,
+                threads=self.whisper.threads
+            ).start()
+        elif os.getenv('WHISPER_WARMUP', 'True').lower() == 'true':
+            self.whisper.warm_up(command_max_seconds=self.command_max_seconds)
+        
+        # Audio is resampled, trimmed and level-normalized once before any engine sees it
+        self.preprocess_enabled = os.getenv('STT_PREPROCESS', 'True').lower() == 'true'
+        self.target_dbfs = float(os.getenv('STT_TARGET_DBFS', -20))
+        
+        # Raw WAV/PCM uploads are decoded as they arrive; memory per upload is bounded by these limits
+        self.upload_max_bytes = int(os.getenv('STT_UPLOAD_MAX_BYTES', 10 * 1024 * 1024))
+        self.upload_max_seconds = float(os.getenv('STT_UPLOAD_MAX_SECONDS', 60))
+        
+        # Engines are ordered per request by their recent latency and success rate
+        self.engines = EngineScheduler(
+            window=int(os.getenv('STT_ENGINE_WINDOW', 20)),
+            min_success_rate=float(os.getenv('STT_ENGINE_MIN_SUCCESS', 0.5)),
+            probe_interval=float(os.getenv('STT_ENGINE_PROBE_INTERVAL', 30)),
+            race_max_seconds=float(os.getenv('STT_RACE_MAX_SECONDS', 0))
+        )
+        self.engines.add_engine('google', self._google_speech_recognition, prior_latency=1.0)
+        self.engines.add_engine('whisper', self._whisper_recognition,
+                                available=lambda: self.whisper_available, prior_latency=2.0)
+        
+        # Streaming (audio_chunk) endpointing and partial transcript cadence
+        self.stream_options = {
+            'partial_interval_ms': int(os.getenv('STREAM_PARTIAL_INTERVAL_MS', 800)),
+            'speculative_ms': int(os.getenv('STREAM_SPECULATIVE_MS', 200)),
+            'end_silence_ms': int(os.getenv('STREAM_END_SILENCE_MS', 500)),
+            'max_seconds': float(os.getenv('STREAM_MAX_SECONDS', 30)),
+        }
         
         # Adjust for ambient noise
         with self.microphone as source:
@@ -26,50 +109,128 @@ class SpeechToText:
         
         self.logger.info("Speech-to-text module initialized")
     
+    @traced('stt.convert')
     def convert_audio_to_text(self, audio_file):
         """
-        Convert audio file to text using multiple engines
+        Convert audio file (path or file-like object) to text using multiple engines
         """
         try:
-            # Try Google Speech Recognition first
-            text = self._google_speech_recognition(audio_file)
-            if text:
-                return text
-            
-            # Fallback to Whisper
-            if self.whisper_model:
-                text = self._whisper_recognition(audio_file)
-                if text:
-                    return text
-            
-            return ""
+            # Multipart uploads can label headerless PCM by content type
+            pcm = getattr(audio_file, 'mimetype', None) in PCM_MIMETYPES
+            return self.convert_clip_to_text(self.decode(audio_file, pcm=pcm))
         
         except Exception as e:
             self.logger.error(f"Error converting audio to text: {e}")
             return ""
     
+    @traced('stt.convert_data')
     def convert_audio_data_to_text(self, audio_data):
         """
         Convert audio data (bytes) to text
         """
         try:
-            # Create a temporary file from audio data
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
-            
-            # Convert to text
-            text = self.convert_audio_to_text(temp_file_path)
-            
-            # Clean up temporary file
-            os.unlink(temp_file_path)
-            
-            return text
+            return self.convert_clip_to_text(self.decode(audio_data))
         
         except Exception as e:
             self.logger.error(f"Error converting audio data to text: {e}")
             return ""
     
+    def decode(self, audio, pcm=False):
+        """
+        Decode a whole clip held in memory into an AudioClip; raises ValueError if it cannot be.
+
+        Used for multipart uploads and Socket.IO audio, which take WAV, AIFF, FLAC, compressed
+        containers such as WebM, Ogg or MP3 (through ffmpeg) and, with pcm, raw 16-bit PCM. Raw
+        /api/speech-to-text bodies go through open_upload instead, which takes only WAV and PCM;
+        the route answers 415 for any other audio type, compressed ones included.
+        """
+        with span('stt.decode'):
+            return decode_audio(audio, self.pcm_sample_rate, pcm=pcm)
+    
+    def open_upload(self, sample_rate=None, channels=1, pcm=False, big_endian=False):
+        """
+        Start decoding a WAV or raw 16-bit PCM upload that arrives in pieces; raises ValueError for a bad rate or channel count
+        """
+        try:
+            sample_rate = int(sample_rate or self.pcm_sample_rate)
+            channels = int(channels or 1)
+        except (TypeError, ValueError):
+            raise ValueError("PCM rate and channels must be integers")
+        if sample_rate <= 0 or channels <= 0:
+            raise ValueError("PCM rate and channels must be positive")
+        
+        return IncrementalDecoder(
+            sample_rate,
+            channels,
+            max_bytes=self.upload_max_bytes,
+            max_seconds=self.upload_max_seconds,
+            pcm=pcm,
+            pcm_big_endian=big_endian
+        )
+    
+    @traced('stt.convert_upload')
+    def convert_upload_to_text(self, stream, sample_rate=None, channels=1, pcm=False, big_endian=False,
+                               chunk_size=32768):
+        """
+        Convert an upload read from a file-like stream to text, decoding each chunk as it is received.
+        Raises AudioLimitError past the upload limits and ValueError for malformed audio
+        """
+        decoder = self.open_upload(sample_rate, channels, pcm, big_endian)
+        with span('stt.ingest'):
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                decoder.feed(chunk)
+            clip = decoder.finish()
+        return self.convert_clip_to_text(clip)
+    
+    def preprocess(self, clip):
+        """
+        Get the clip as trimmed, level-normalized 16 kHz mono, ready for every engine
+        """
+        if not self.preprocess_enabled:
+            return clip
+        with span('stt.preprocess'):
+            return AudioClip(
+                preprocess_samples(clip.samples, clip.sample_rate, target_dbfs=self.target_dbfs),
+                WHISPER_SAMPLE_RATE
+            )
+    
+    def convert_clip_to_text(self, clip):
+        """
+        Convert a decoded clip to text with the engine scheduler; all engines share the preprocessed samples
+        """
+        clip = self.preprocess(clip)
+        if not clip.duration:
+            return ""
+        return self.engines.transcribe(clip, duration=clip.duration)
+    
+    @property
+    def whisper_available(self):
+        return (self.whisper_pool or self.whisper).available
+    
+    def get_whisper_stats(self):
+        """
+        Get Whisper pool or in-process model stats, whichever is in use
+        """
+        return (self.whisper_pool or self.whisper).get_stats()
+    
+    def open_stream(self, sample_rate=None):
+        """
+        Start a streaming session for one utterance sent as 16-bit mono PCM chunks
+        """
+        return StreamingSession(self, int(sample_rate or self.pcm_sample_rate), **self.stream_options)
+    
+    @traced('stt.convert_stream')
+    def convert_stream_to_text(self, stream):
+        """
+        Get the final transcript of a streamed utterance
+        """
+        try:
+            return stream.finish()
+        
+        except Exception as e:
+            self.logger.error(f"Error converting audio stream to text: {e}")
+            return ""
+    
     def listen_and_convert(self, timeout=5, phrase_time_limit=10):
         """
         Listen to microphone and convert to text
@@ -79,12 +240,8 @@ class SpeechToText:
                 self.logger.info("Listening for speech...")
                 audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
                 
-                # Convert to text
-                text = self._google_speech_recognition(audio)
-                if not text and self.whisper_model:
-                    text = self._whisper_recognition(audio)
-                
-                return text
+            # Convert to text
+            return self.convert_clip_to_text(AudioClip.from_audio_data(audio))
         
         except sr.WaitTimeoutError:
             self.logger.info("No speech detected within timeout")
@@ -93,15 +250,15 @@ class SpeechToText:
             self.logger.error(f"Error in listen_and_convert: {e}")
             return ""
     
+    @traced('stt.google')
+    @ENGINE_LATENCY.timed(stage='stt', engine='google')
     def _google_speech_recognition(self, audio_input):
         """
-        Use Google Speech Recognition
+        Use Google Speech Recognition; returns "" when no speech was recognized and raises on errors
         """
         try:
-            if isinstance(audio_input, str):
-                # Audio file path
-                with sr.AudioFile(audio_input) as source:
-                    audio = self.recognizer.record(source)
+            if isinstance(audio_input, AudioClip):
+                audio = audio_input.to_audio_data()
             else:
                 # Audio data object
                 audio = audio_input
@@ -115,44 +272,53 @@ class SpeechToText:
             return ""
         except sr.RequestError as e:
             self.logger.error(f"Could not request results from Google Speech Recognition service: {e}")
-            return ""
+            ERRORS.inc(stage='stt', engine='google')
+            raise
         except Exception as e:
             self.logger.error(f"Error in Google Speech Recognition: {e}")
-            return ""
+            ERRORS.inc(stage='stt', engine='google')
+            raise
     
+    @traced('stt.whisper')
+    @ENGINE_LATENCY.timed(stage='stt', engine='whisper')
     def _whisper_recognition(self, audio_input):
         """
-        Use Whisper for speech recognition
+        Use Whisper for speech recognition; returns "" when no speech was recognized and raises on errors
         """
         try:
-            if self.whisper_model is None:
-                return ""
+            # Whisper takes the 16 kHz float32 samples directly, no file round trip
+            clip = audio_input if isinstance(audio_input, AudioClip) else AudioClip.from_audio_data(audio_input)
             
-            if isinstance(audio_input, str):
-                # Audio file path
-                result = self.whisper_model.transcribe(audio_input)
+            if self.whisper_pool:
+                text = self.whisper_pool.transcribe(clip.to_whisper_input())
             else:
-                # Audio data object - save to temp file first
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                    temp_file.write(audio_input.get_wav_data())
-                    temp_file_path = temp_file.name
-                
-                result = self.whisper_model.transcribe(temp_file_path)
-                os.unlink(temp_file_path)
+                with self.whisper.use() as whisper_model:
+                    if whisper_model is None:
+                        raise RuntimeError("Whisper model is not loaded")
+                    
+                    text = transcribe_audio(
+                        whisper_model,
+                        clip.to_whisper_input(),
+                        language=self.whisper_language,
+                        command_max_seconds=self.command_max_seconds
+                    )
             
-            text = result["text"].strip()
             self.logger.info(f"Whisper recognition result: {text}")
             return text
         
         except Exception as e:
             self.logger.error(f"Error in Whisper recognition: {e}")
-            return ""
+            ERRORS.inc(stage='stt', engine='whisper')
+            raise
     
     def get_available_engines(self):
         """
-        Get list of available speech recognition engines
+        Get list of available speech recognition engines, in the order they would be tried now
+        """
+        return [ENGINE_NAMES[name] for name in self.engines.get_stats()["ranking"]]
+    
+    def get_engine_stats(self):
+        """
+        Get the engine ranking and rolling latency/success per engine
         """
-        engines = ["Google Speech Recognition"]
-        if self.whisper_model:
-            engines.append("Whisper")
-        return engines 
\ No newline at end of file
+        return self.engines.get_stats() 
\ No newline at end of file
@@ -0,0 +1,263 @@
+import logging
+import threading
+
+import numpy as np
+
+from speech.audio_decoder import AudioClip, pcm16_to_float32
+
+
+class EnergyEndpointer:
+    """
+    Frame-energy voice activity detector for a live audio stream.
+
+    Audio is split into fixed frames whose log energy is computed with NumPy
+    in one pass per chunk. A frame is voiced when it is margin_db above an
+    adaptive noise floor (and above an absolute floor); speech starts after
+    min_speech_ms of voiced frames and ends after end_silence_ms of
+    unvoiced ones. Positions are absolute sample offsets into the stream.
+    """
+
+    def __init__(self, sample_rate, frame_ms=20, margin_db=10.0, floor_db=-50.0,
+                 min_speech_ms=100, end_silence_ms=500):
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.margin_db = margin_db
+        self.floor_db = floor_db
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.end_silence_frames = max(1, int(end_silence_ms / frame_ms))
+
+        self.noise_db = None
+        self.speech_start = None
+        self.speech_end = None
+        self.ended = False
+
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._position = 0
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    @property
+    def in_speech(self):
+        return self.speech_start is not None and not self.ended
+
+    @property
+    def trailing_silence_ms(self):
+        return self._silent_run * self.frame_length * 1000.0 / self.sample_rate
+
+    def process(self, samples):
+        """
+        Feed float32 samples; returns True once the end of speech is detected
+        """
+        if self.ended:
+            return True
+
+        samples = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+        count = len(samples) // self.frame_length
+        self._pending = samples[count * self.frame_length:]
+        if not count:
+            return False
+
+        frames = samples[:count * self.frame_length].reshape(count, self.frame_length)
+        energies = 10.0 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-10)
+
+        for energy in energies:
+            self._frame(float(energy))
+            self._position += self.frame_length
+            if self.ended:
+                break
+        return self.ended
+
+    def _frame(self, energy):
+        if self.noise_db is None:
+            self.noise_db = energy
+
+        voiced = energy > max(self.noise_db + self.margin_db, self.floor_db)
+        if not voiced:
+            # Track the noise floor quickly downwards and slowly upwards
+            self.noise_db = energy if energy < self.noise_db else 0.95 * self.noise_db + 0.05 * energy
+
+        frame_end = self._position + self.frame_length
+        if voiced:
+            self._voiced_run += 1
+            self._silent_run = 0
+            if self.speech_start is None and self._voiced_run >= self.min_speech_frames:
+                self.speech_start = frame_end - self._voiced_run * self.frame_length
+            if self.speech_start is not None:
+                self.speech_end = frame_end
+        else:
+            self._voiced_run = 0
+            if self.speech_start is not None:
+                self._silent_run += 1
+                if self._silent_run >= self.end_silence_frames:
+                    self.ended = True
+
+
+class StreamingSession:
+    """
+    One utterance streamed in as 16-bit mono PCM chunks.
+
+    Chunks are appended to a growing float32 buffer and run through the
+    endpointer as they arrive. While the user is talking, partial
+    transcripts are produced every partial_interval_ms of new speech, and
+    one more is started as soon as speculative_ms of silence follows the
+    speech. If the endpoint then confirms that silence, the final
+    transcript reuses that result instead of starting recognition only
+    after the endpoint. Socket.IO may run event handlers concurrently, so
+    chunks carrying a seq number are re-ordered before use; a missing chunk
+    is given up on once reorder_window later chunks are waiting, and
+    waiting chunks count towards max_seconds.
+    """
+
+    def __init__(self, speech_to_text, sample_rate, partial_interval_ms=800, speculative_ms=200,
+                 end_silence_ms=500, pre_roll_ms=200, max_seconds=30, reorder_window=16):
+        self.logger = logging.getLogger(__name__)
+        self.speech_to_text = speech_to_text
+        self.sample_rate = sample_rate
+        self.endpointer = EnergyEndpointer(sample_rate, end_silence_ms=end_silence_ms)
+        self.partial_interval = int(sample_rate * partial_interval_ms / 1000)
+        self.speculative_ms = speculative_ms
+        self.pre_roll = int(sample_rate * pre_roll_ms / 1000)
+        self.max_samples = int(sample_rate * max_seconds)
+        self.closed = False
+
+        self._buffer = np.zeros(sample_rate * 2, dtype=np.float32)
+        self._length = 0
+        self.reorder_window = reorder_window
+        self._next_seq = 0
+        self._out_of_order = {}
+        self._pending_samples = 0
+        self._lock = threading.Lock()
+
+        # (segment end, text) of the newest partial, and the one in flight
+        self._partial = None
+        self._partial_end = None
+        self._partial_done = threading.Event()
+        self._partial_done.set()
+
+    @property
+    def duration(self):
+        return self._length / self.sample_rate
+
+    def feed(self, pcm, seq=None):
+        """
+        Add a chunk of PCM bytes; returns True (once) when the utterance is complete.
+        Raises ValueError for a seq that is not a non-negative integer
+        """
+        if seq is not None and (isinstance(seq, bool) or not isinstance(seq, int) or seq < 0):
+            raise ValueError("Audio chunk seq must be a non-negative integer")
+
+        with self._lock:
+            if self.closed:
+                return False
+
+            if seq is None:
+                self._append(pcm16_to_float32(pcm))
+            else:
+                # Late duplicates and chunks from before a skipped gap are dropped
+                if seq >= self._next_seq and seq not in self._out_of_order:
+                    self._out_of_order[seq] = pcm
+                    self._pending_samples += len(pcm) // 2
+
+                # Stop waiting for a chunk that may never come
+                if self._out_of_order and (
+                        max(self._out_of_order) - self._next_seq >= self.reorder_window
+                        or self._length + self._pending_samples >= self.max_samples):
+                    self._next_seq = min(self._out_of_order)
+
+                while self._next_seq in self._out_of_order:
+                    chunk = self._out_of_order.pop(self._next_seq)
+                    self._pending_samples -= len(chunk) // 2
+                    self._append(pcm16_to_float32(chunk))
+                    self._next_seq += 1
+
+            if self.endpointer.ended or self._length >= self.max_samples:
+                self.closed = True
+            return self.closed
+
+    def close(self):
+        """
+        Stop accepting audio; returns False if the stream was already closed
+        """
+        with self._lock:
+            if self.closed:
+                return False
+            self.closed = True
+            return True
+
+    def _append(self, samples):
+        needed = self._length + len(samples)
+        if needed > len(self._buffer):
+            grown = np.zeros(max(needed, len(self._buffer) * 2), dtype=np.float32)
+            grown[:self._length] = self._buffer[:self._length]
+            self._buffer = grown
+        self._buffer[self._length:needed] = samples
+        self._length = needed
+        self.endpointer.process(samples)
+
+    def _segment(self):
+        """
+        Get (start, end) samples of the speech heard so far, with padding
+        """
+        endpointer = self.endpointer
+        if endpointer.speech_start is None:
+            return None
+        start = max(0, endpointer.speech_start - self.pre_roll)
+        end = min(self._length, endpointer.speech_end + self.pre_roll)
+        return start, end
+
+    def next_partial(self):
+        """
+        Claim the next partial transcription if one is due; returns its (start, end) segment or None
+        """
+        with self._lock:
+            if self.closed or not self.partial_interval or not self._partial_done.is_set():
+                return None
+
+            segment = self._segment()
+            if segment is None:
+                return None
+
+            covered = self._partial[0] if self._partial else 0
+            speech_end = self.endpointer.speech_end
+            # Speculate on the final transcript once the speaker pauses
+            pausing = self.endpointer.trailing_silence_ms >= self.speculative_ms and covered < speech_end
+            if not pausing and speech_end - covered < self.partial_interval:
+                return None
+
+            self._partial_done.clear()
+            self._partial_end = speech_end
+            return segment
+
+    def transcribe_partial(self, segment):
+        """
+        Run a claimed partial transcription; returns its text
+        """
+        try:
+            text = self._transcribe(segment)
+            with self._lock:
+                self._partial = (self._partial_end, text)
+            return text
+        finally:
+            self._partial_done.set()
+
+    def finish(self):
+        """
+        Get the final transcript once the stream is closed
+        """
+        with self._lock:
+            self.closed = True
+            segment = self._segment()
+        if segment is None:
+            return ""
+
+        # A partial covering all of the speech is the final transcript
+        self._partial_done.wait()
+        if self._partial and self._partial[0] >= self.endpointer.speech_end:
+            self.logger.debug("Final transcript reused from the speculative partial")
+            return self._partial[1]
+        return self._transcribe(segment)
+
+    def _transcribe(self, segment):
+        start, end = segment
+        clip = AudioClip(self._buffer[start:end], self.sample_rate)
+        return self.speech_to_text.convert_clip_to_text(clip)
\ No newline at end of file
@@ -5,7 +5,9 @@ import logging
 import tempfile
 import base64
 from io import BytesIO
-import requests
+from utils.http_client import get_http_client
+from utils.metrics import ENGINE_LATENCY, FALLBACKS, ERRORS
+from utils.tracing import span, traced
 
 class TextToSpeech:
     def __init__(self):
@@ -13,6 +15,11 @@ class TextToSpeech:
         self.engine = os.getenv('TTS_ENGINE', 'pyttsx3')
         self.voice_rate = int(os.getenv('VOICE_RATE', 150))
         self.voice_volume = float(os.getenv('VOICE_VOLUME', 0.9))
+        self.elevenlabs_api_base = os.getenv('ELEVENLABS_API_BASE', 'https://api.elevenlabs.io')
+        self.elevenlabs_voice_id = os.getenv('ELEVENLABS_VOICE_ID', '21m00Tcm4TlvDq8ikWAM')
+        
+        # Pooled keep-alive client for outbound HTTP calls
+        self.http = get_http_client()
         
         # Initialize pyttsx3 engine
         try:
@@ -33,6 +40,7 @@ class TextToSpeech:
         
         self.logger.info("Text-to-speech module initialized")
     
+    @traced('tts.convert')
     def convert_text_to_speech(self, text, engine=None):
         """
         Convert text to speech using specified engine
@@ -77,6 +85,8 @@ class TextToSpeech:
             self.logger.error(f"Error speaking text: {e}")
             return False
     
+    @traced('tts.pyttsx3')
+    @ENGINE_LATENCY.timed(stage='tts', engine='pyttsx3')
     def _pyttsx3_synthesis(self, text):
         """
         Use pyttsx3 for text-to-speech
@@ -101,15 +111,19 @@ class TextToSpeech:
             os.unlink(temp_file_path)
             
             # Convert to base64 for web transmission
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+            with span('tts.base64', bytes=len(audio_data)):
+                audio_base64 = base64.b64encode(audio_data).decode('utf-8')
             
             self.logger.info(f"pyttsx3 synthesis completed for text: {text[:50]}...")
             return audio_base64
         
         except Exception as e:
             self.logger.error(f"Error in pyttsx3 synthesis: {e}")
+            ERRORS.inc(stage='tts', engine='pyttsx3')
             return None
     
+    @traced('tts.gtts')
+    @ENGINE_LATENCY.timed(stage='tts', engine='gtts')
     def _gtts_synthesis(self, text):
         """
         Use Google Text-to-Speech (gTTS)
@@ -132,13 +146,15 @@ class TextToSpeech:
             os.unlink(temp_file_path)
             
             # Convert to base64 for web transmission
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+            with span('tts.base64', bytes=len(audio_data)):
+                audio_base64 = base64.b64encode(audio_data).decode('utf-8')
             
             self.logger.info(f"gTTS synthesis completed for text: {text[:50]}...")
             return audio_base64
         
         except Exception as e:
             self.logger.error(f"Error in gTTS synthesis: {e}")
+            ERRORS.inc(stage='tts', engine='gtts')
             return None
     
     def _gtts_speak(self, text):
@@ -177,6 +193,8 @@ class TextToSpeech:
             self.logger.error(f"Error in gTTS speak: {e}")
             return False
     
+    @traced('tts.elevenlabs')
+    @ENGINE_LATENCY.timed(stage='tts', engine='elevenlabs')
     def _elevenlabs_synthesis(self, text):
         """
         Use ElevenLabs for high-quality text-to-speech
@@ -186,10 +204,11 @@ class TextToSpeech:
             api_key = os.getenv('ELEVENLABS_API_KEY')
             if not api_key:
                 self.logger.warning("ElevenLabs API key not found, falling back to gTTS")
+                FALLBACKS.inc(stage='tts', engine='gtts')
                 return self._gtts_synthesis(text)
             
             # ElevenLabs API endpoint
-            url = "https://api.elevenlabs.io/v1/text-to-speech/21m00Tcm4TlvDq8ikWAM"
+            url = f"{self.elevenlabs_api_base}/v1/text-to-speech/{self.elevenlabs_voice_id}"
             
             headers = {
                 "Accept": "audio/mpeg",
@@ -206,19 +225,25 @@ class TextToSpeech:
                 }
             }
             
-            response = requests.post(url, json=data, headers=headers)
+            # Synthesis is billed per request: only retried when the connection was never made
+            response = self.http.post(url, json=data, headers=headers, retry=True)
             
             if response.status_code == 200:
                 # Convert to base64
-                audio_base64 = base64.b64encode(response.content).decode('utf-8')
+                with span('tts.base64', bytes=len(response.content)):
+                    audio_base64 = base64.b64encode(response.content).decode('utf-8')
                 self.logger.info(f"ElevenLabs synthesis completed for text: {text[:50]}...")
                 return audio_base64
             else:
                 self.logger.error(f"ElevenLabs API error: {response.status_code}")
+                ERRORS.inc(stage='tts', engine='elevenlabs')
+                FALLBACKS.inc(stage='tts', engine='gtts')
                 return self._gtts_synthesis(text)
         
         except Exception as e:
             self.logger.error(f"Error in ElevenLabs synthesis: {e}")
+            ERRORS.inc(stage='tts', engine='elevenlabs')
+            FALLBACKS.inc(stage='tts', engine='gtts')
             return self._gtts_synthesis(text)
     
     def get_available_engines(self):
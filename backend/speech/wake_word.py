@@ -1,10 +1,19 @@
 import speech_recognition as sr
 import numpy as np
 import os
+import re
 import logging
 from threading import Thread, Event
 import time
 
+from speech.audio_decoder import AudioClip
+from speech.keyword_spotter import KeywordSpotter
+from utils.metrics import counter
+
+WAKE_CHECKS = counter(
+    'jarvis_wake_word_checks_total', 'Wake word checks by how they were decided', ('result',)
+)
+
 class WakeWordDetector:
     def __init__(self):
         self.recognizer = sr.Recognizer()
@@ -14,6 +23,19 @@ class WakeWordDetector:
         self.stop_listening = Event()
         self.logger = logging.getLogger(__name__)
         
+        # Clips are matched locally against enrolled recordings of the wake word; only candidate
+        # hits are confirmed with cloud recognition. Until something is enrolled every clip goes to
+        # the cloud; clips where it heard just the wake word are enrolled automatically, whichever
+        # path they came through, until max_templates are enrolled.
+        self.spotter = KeywordSpotter(
+            sensitivity=float(os.getenv('WAKE_WORD_SENSITIVITY', 0.5)),
+            max_templates=int(os.getenv('WAKE_WORD_MAX_TEMPLATES', 10))
+        )
+        self.templates_root = os.getenv('WAKE_WORD_TEMPLATES', 'wake_word_templates')
+        self.confirm_hits = os.getenv('WAKE_WORD_CONFIRM', 'True').lower() == 'true'
+        self.auto_enroll = os.getenv('WAKE_WORD_AUTO_ENROLL', 'True').lower() == 'true'
+        self._load_templates()
+        
         # Adjust for ambient noise
         with self.microphone as source:
             self.recognizer.adjust_for_ambient_noise(source, duration=1)
@@ -25,26 +47,96 @@ class WakeWordDetector:
         Detect wake word in audio data
         """
         try:
-            # Convert audio data to text
-            text = self.recognizer.recognize_google(audio_data).lower()
+            if not self.spotter.templates:
+                return self._detect_with_cloud(audio_data)
             
-            # Check if wake word is in the text
+            clip = AudioClip.from_audio_data(audio_data)
+            hit, distance = self.spotter.detect(clip.samples, clip.sample_rate)
+            if not hit:
+                WAKE_CHECKS.inc(result='rejected_local')
+                return False
+            
+            self.logger.debug(f"Wake word candidate (distance {distance:.3f})")
+            if not self.confirm_hits:
+                WAKE_CHECKS.inc(result='accepted_local')
+                self.logger.info(f"Wake word detected locally (distance {distance:.3f})")
+                return True
+            
+            text = self._recognize(audio_data)
             if self.wake_word in text:
+                WAKE_CHECKS.inc(result='accepted')
                 self.logger.info(f"Wake word detected: '{text}'")
+                self._auto_enroll(audio_data, text)
                 return True
             
+            WAKE_CHECKS.inc(result='rejected_confirm')
+            return False
+        
+        except Exception as e:
+            self.logger.error(f"Error in wake word detection: {e}")
+            return False
+    
+    def _detect_with_cloud(self, audio_data):
+        """
+        Check a clip with cloud recognition alone, enrolling it if it held nothing but the wake word
+        """
+        text = self._recognize(audio_data)
+        if self.wake_word not in text:
+            WAKE_CHECKS.inc(result='rejected_cloud')
             return False
         
+        WAKE_CHECKS.inc(result='accepted_cloud')
+        self.logger.info(f"Wake word detected: '{text}'")
+        self._auto_enroll(audio_data, text)
+        return True
+    
+    def _auto_enroll(self, audio_data, text):
+        """
+        Enroll a confirmed clip that held nothing but the wake word, while there is room for templates
+        """
+        if (self.auto_enroll and text.split() == self.wake_word.split()
+                and len(self.spotter.templates) < self.spotter.max_templates):
+            self.enroll(audio_data)
+    
+    def _recognize(self, audio_data):
+        """
+        Get the cloud transcript of a clip, lowercase without punctuation, or "" if there is none
+        """
+        try:
+            return re.sub(r"[^\w' ]+", '', self.recognizer.recognize_google(audio_data).lower())
+        
         except sr.UnknownValueError:
             # Speech was unintelligible
-            return False
+            return ""
         except sr.RequestError as e:
             self.logger.error(f"Could not request results from speech recognition service: {e}")
-            return False
+            return ""
+    
+    def enroll(self, audio):
+        """
+        Add a recording of the wake word (AudioData or AudioClip) as a local template; returns success
+        """
+        try:
+            clip = audio if isinstance(audio, AudioClip) else AudioClip.from_audio_data(audio)
+            path = self.spotter.save_template(self._templates_dir(), clip.samples, clip.sample_rate)
+            self.logger.info(f"Enrolled wake word template {path} ({len(self.spotter.templates)} total)")
+            return True
+        
         except Exception as e:
-            self.logger.error(f"Error in wake word detection: {e}")
+            self.logger.error(f"Error enrolling wake word template: {e}")
             return False
     
+    def _templates_dir(self):
+        # Templates are kept per wake word
+        return os.path.join(self.templates_root, re.sub(r'[^a-z0-9]+', '_', self.wake_word).strip('_'))
+    
+    def _load_templates(self):
+        self.spotter.clear_templates()
+        directory = self._templates_dir()
+        if os.path.isdir(directory):
+            loaded = self.spotter.load_templates(directory)
+            self.logger.info(f"Loaded {loaded} wake word templates from {directory}")
+    
     def listen_for_wake_word(self, callback=None):
         """
         Continuously listen for wake word
@@ -96,4 +188,15 @@ class WakeWordDetector:
         Change the wake word
         """
         self.wake_word = new_wake_word.lower()
-        self.logger.info(f"Wake word changed to: '{self.wake_word}'") 
\ No newline at end of file
+        self._load_templates()
+        self.logger.info(f"Wake word changed to: '{self.wake_word}'")
+    
+    def get_stats(self):
+        """
+        Get local keyword spotter state
+        """
+        return {
+            "wake_word": self.wake_word,
+            "confirm_hits": self.confirm_hits,
+            **self.spotter.get_stats()
+        } 
\ No newline at end of file
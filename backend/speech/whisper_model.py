@@ -0,0 +1,279 @@
+import gc
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from speech.audio_decoder import WHISPER_SAMPLE_RATE, trim_silence
+
+WHISPER_MODEL_SIZES = ('tiny', 'base', 'small')
+# fp32 runs wherever torch puts it; int8 is dynamically quantized for CPU
+WHISPER_PRECISIONS = ('fp32', 'int8')
+
+# Whisper's own thresholds for treating a window as silence
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+# Decode length cap for command mode; fast speech is ~3 words (~5 tokens) a second
+COMMAND_TOKENS_PER_SECOND = 8
+COMMAND_MIN_TOKENS = 16
+
+
+def load_whisper(model_name, precision='fp32', threads=0):
+    """
+    Load a Whisper model at the given precision, setting torch's intra-op
+    thread count first when threads is non-zero. whisper and torch are only
+    imported here and in decode_commands, so startup does not pay for them.
+
+    int8 loads on the CPU and swaps every linear layer (attention
+    projections and MLPs, most of the compute) for a dynamically quantized
+    one: int8 weights, activations quantized per batch. Whisper's Linear
+    subclass is turned back into a plain nn.Linear first, since
+    quantize_dynamic only matches exact types.
+    """
+    import torch
+    import whisper
+
+    if threads:
+        torch.set_num_threads(threads)
+    if precision != 'int8':
+        return whisper.load_model(model_name)
+
+    model = whisper.load_model(model_name, device='cpu')
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def warm_up_samples(seconds=0.5):
+    """
+    Get low-level noise for a dummy inference; pure silence would be cut by
+    trim_silence and never reach the model in command mode
+    """
+    rng = np.random.default_rng(0)
+    return rng.normal(0.0, 0.01, int(seconds * WHISPER_SAMPLE_RATE)).astype(np.float32)
+
+
+def transcribe_audio(model, samples, language=None, command_max_seconds=8.0):
+    """
+    Transcribe 16 kHz samples, in command mode when they are short enough
+    """
+    if len(samples) <= command_max_seconds * WHISPER_SAMPLE_RATE:
+        return decode_commands(model, [samples], language)[0]
+    return model.transcribe(samples, language=language, fp16=model.device.type != 'cpu')["text"].strip()
+
+
+def decode_commands(model, clips, language=None):
+    """
+    Transcribe short 16 kHz clips in command mode, batched in one pass.
+
+    transcribe() slides a 30 s window over the audio, conditions each window
+    on the previous text and retries at higher temperatures when a decode
+    looks wrong. A 1-4 s command fits in one window, so this trims silence
+    with an energy gate, decodes once greedily with no prompt and caps the
+    output length by the speech duration, which also stops runaway
+    repetition. Language detection is skipped when language is given.
+    """
+    import torch
+    import whisper
+
+    trimmed = [trim_silence(clip) for clip in clips]
+    texts = [""] * len(clips)
+    live = [index for index, clip in enumerate(trimmed) if len(clip)]
+    if not live:
+        return texts
+
+    longest = max(len(trimmed[index]) for index in live) / WHISPER_SAMPLE_RATE
+    mel = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(trimmed[index])) for index in live
+    ]).to(model.device)
+    options = whisper.DecodingOptions(
+        language=language,
+        temperature=0.0,
+        sample_len=max(COMMAND_MIN_TOKENS, math.ceil(longest * COMMAND_TOKENS_PER_SECOND)),
+        without_timestamps=True,
+        fp16=model.device.type != 'cpu'
+    )
+
+    for index, result in zip(live, model.decode(mel, options)):
+        silent = result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+        texts[index] = "" if silent else result.text.strip()
+    return texts
+
+
+class WhisperModel:
+    """
+    Lazily loaded, shareable Whisper model.
+
+    Nothing is loaded at construction, so startup does not pay for the
+    weights. The first use (or warm_up() in the background) loads them once
+    under a lock and runs a short dummy inference so the first real request
+    does not also pay for kernel initialisation. With an idle timeout, a
+    watchdog drops the model after that long without use; it is reloaded on
+    demand. Models in use are never unloaded.
+    """
+
+    def __init__(self, model_name='base', idle_timeout=0, retry_interval=60.0, precision='fp32', threads=0):
+        self.logger = logging.getLogger(__name__)
+        if model_name not in WHISPER_MODEL_SIZES:
+            self.logger.warning(f"Unknown Whisper model '{model_name}', using 'base'")
+            model_name = 'base'
+        if precision not in WHISPER_PRECISIONS:
+            self.logger.warning(f"Unknown Whisper precision '{precision}', using 'fp32'")
+            precision = 'fp32'
+        self.model_name = model_name
+        self.precision = precision
+        self.threads = threads
+        self.idle_timeout = idle_timeout
+        self.retry_interval = retry_interval
+
+        self._model = None
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._last_used = time.monotonic()
+        self._failed_at = None
+        self._watchdog = None
+
+        self.loads = 0
+        self.unloads = 0
+        self.load_seconds = 0.0
+
+    @property
+    def is_loaded(self):
+        return self._model is not None
+
+    @property
+    def available(self):
+        """
+        False only while a recent load attempt has failed
+        """
+        return self._failed_at is None or time.monotonic() - self._failed_at >= self.retry_interval
+
+    def get(self):
+        """
+        Get the model, loading it on first use; None if it cannot be loaded
+        """
+        model = self._model
+        if model is not None:
+            self._last_used = time.monotonic()
+            return model
+
+        with self._lock:
+            if self._model is None and self.available:
+                self._load()
+            self._last_used = time.monotonic()
+            return self._model
+
+    @contextmanager
+    def use(self):
+        """
+        Borrow the model for an inference; it is not unloaded while borrowed
+        """
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield self.get()
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self._last_used = time.monotonic()
+
+    def warm_up(self, background=True, command_max_seconds=8.0):
+        """
+        Load the model and run a dummy inference through the same path
+        (command mode or transcribe()) as requests, by default on a background thread
+        """
+        if not background:
+            self._warm_up(command_max_seconds)
+            return None
+
+        thread = threading.Thread(target=self._warm_up, args=(command_max_seconds,), name='whisper-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up(self, command_max_seconds):
+        start = time.perf_counter()
+        try:
+            with self.use() as model:
+                if model is None:
+                    return
+                # Half a second of noise primes the encoder and decoder kernels
+                transcribe_audio(model, warm_up_samples(), language='en', command_max_seconds=command_max_seconds)
+            self.logger.info(f"Whisper '{self.model_name}' warmed up in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            self.logger.warning(f"Whisper warm-up failed: {e}")
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            self._model = load_whisper(self.model_name, self.precision, self.threads)
+        except Exception as e:
+            self._failed_at = time.monotonic()
+            self.logger.warning(f"Could not load Whisper model '{self.model_name}': {e}")
+            return
+
+        self._failed_at = None
+        self.loads += 1
+        self.load_seconds = time.perf_counter() - start
+        self.logger.info(f"Whisper model '{self.model_name}' ({self.precision}) loaded in {self.load_seconds:.2f}s")
+        self._start_watchdog()
+
+    def _start_watchdog(self):
+        if not self.idle_timeout or (self._watchdog and self._watchdog.is_alive()):
+            return
+        self._watchdog = threading.Thread(target=self._watch_idle, name='whisper-idle', daemon=True)
+        self._watchdog.start()
+
+    def _watch_idle(self):
+        interval = max(1.0, min(self.idle_timeout / 4.0, 60.0))
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                if self._model is None:
+                    return
+                if self._in_use or time.monotonic() - self._last_used < self.idle_timeout:
+                    continue
+                self._unload()
+                return
+
+    def unload(self):
+        """
+        Drop the model now (unless it is in use)
+        """
+        with self._lock:
+            if self._model is not None and not self._in_use:
+                self._unload()
+
+    def _unload(self):
+        self._model = None
+        self.unloads += 1
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        self.logger.info(f"Whisper model '{self.model_name}' unloaded")
+
+    def get_stats(self):
+        """
+        Get model load state and counters
+        """
+        return {
+            "model": self.model_name,
+            "precision": self.precision,
+            "threads": self.threads,
+            "loaded": self.is_loaded,
+            "available": self.available,
+            "in_use": self._in_use,
+            "loads": self.loads,
+            "unloads": self.unloads,
+            "last_load_seconds": self.load_seconds,
+            "idle_seconds": time.monotonic() - self._last_used,
+            "idle_timeout": self.idle_timeout,
+        }
\ No newline at end of file
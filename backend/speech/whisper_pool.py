@@ -0,0 +1,420 @@
+import atexit
+import collections
+import itertools
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Listener
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from speech.audio_decoder import WHISPER_SAMPLE_RATE
+from utils.metrics import counter, gauge, histogram
+
+MAX_RESTARTS = 5
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUEUE_DEPTH = gauge('jarvis_whisper_queue_depth', 'Transcriptions waiting for a Whisper worker')
+BUSY_WORKERS = gauge('jarvis_whisper_busy_workers', 'Whisper workers currently transcribing')
+QUEUE_WAIT = histogram('jarvis_whisper_queue_wait_seconds', 'Time a transcription waited for a Whisper worker')
+BATCH_SIZE = histogram(
+    'jarvis_whisper_batch_size', 'Utterances decoded together per Whisper batch', buckets=(1, 2, 4, 8, 16, 32)
+)
+EXPIRED = counter(
+    'jarvis_whisper_expired_total', 'Transcriptions dropped after their deadline passed', ('where',)
+)
+
+_Request = collections.namedtuple('_Request', 'future samples deadline wall_deadline enqueued')
+
+
+class _Worker:
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.state = 'stopped'
+        self.batch = None
+        self.restarts = 0
+
+
+class WhisperPool:
+    """
+    Whisper transcription service running one model per worker process.
+
+    Callers on any Flask/Socket.IO thread submit 16 kHz float32 audio and
+    block on a future; a dispatcher thread hands queued requests to idle
+    workers, so transcription runs on as many cores as there are workers
+    instead of contending for the GIL. Requests that queue up while every
+    worker is busy are batched (short clips are decoded together in one
+    command-mode pass), and their audio reaches the worker through one shared
+    memory segment per batch rather than being pickled. Every request has
+    a deadline; ones that expire in the queue are never sent to a worker.
+    """
+
+    def __init__(self, model_name='base', workers=2, max_batch=8, batch_window_ms=10, deadline=15.0,
+                 language=None, command_max_seconds=8.0, precision='fp32', threads=0):
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name
+        self.max_batch = max(1, max_batch)
+        self.batch_window = batch_window_ms / 1000.0
+        self.deadline = deadline
+        self.language = language
+        # Only clips short enough for the command-mode decode are batched
+        self.command_max_seconds = command_max_seconds
+        self.batch_max_samples = int(command_max_seconds * WHISPER_SAMPLE_RATE)
+        self.precision = precision
+        # Split the cores between workers so their BLAS threads do not oversubscribe
+        self.threads_per_worker = threads or max(1, (os.cpu_count() or 1) // max(1, workers))
+
+        self._workers = [_Worker(index) for index in range(max(1, workers))]
+        self._pending = collections.deque()
+        self._idle = collections.deque()
+        self._cond = threading.Condition()
+        self._batch_ids = itertools.count()
+        self._listener = None
+        self._running = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.expired = 0
+        self.failed = 0
+        self.batches = 0
+        self.batched = 0
+
+    @property
+    def available(self):
+        """
+        True while at least one worker is starting or ready
+        """
+        return self._running and any(worker.state in ('starting', 'ready', 'busy') for worker in self._workers)
+
+    def start(self):
+        """
+        Launch the worker processes; they load their models in the background
+        """
+        self._authkey = os.urandom(16)
+        self._listener = Listener(('127.0.0.1', 0), authkey=self._authkey)
+        self._running = True
+
+        threading.Thread(target=self._accept_loop, name='whisper-pool-accept', daemon=True).start()
+        threading.Thread(target=self._dispatch_loop, name='whisper-pool-dispatch', daemon=True).start()
+        for worker in self._workers:
+            self._launch(worker)
+
+        atexit.register(self.stop)
+        self.logger.info(f"Whisper pool starting {len(self._workers)} '{self.model_name}' ({self.precision}) workers "
+                         f"({self.threads_per_worker} threads each)")
+        return self
+
+    def submit(self, samples, deadline=None):
+        """
+        Queue 16 kHz float32 samples for transcription; returns a Future of the text
+        """
+        if not self.available:
+            raise RuntimeError("Whisper pool has no running workers")
+
+        timeout = self.deadline if deadline is None else deadline
+        now = time.monotonic()
+        request = _Request(Future(), np.ascontiguousarray(samples, dtype=np.float32),
+                           now + timeout, time.time() + timeout, now)
+        with self._cond:
+            self._pending.append(request)
+            self.submitted += 1
+            QUEUE_DEPTH.set(len(self._pending))
+            self._cond.notify_all()
+        return request.future
+
+    def transcribe(self, samples, deadline=None):
+        """
+        Transcribe samples on a worker, raising TimeoutError past the deadline
+        """
+        timeout = self.deadline if deadline is None else deadline
+        future = self.submit(samples, timeout)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Still queued: make sure no worker picks it up
+            future.cancel()
+            raise
+
+    def _launch(self, worker):
+        host, port = self._listener.address
+        env = dict(
+            os.environ,
+            WHISPER_POOL_HOST=host,
+            WHISPER_POOL_PORT=str(port),
+            WHISPER_POOL_AUTHKEY=self._authkey.hex(),
+            WHISPER_WORKER_INDEX=str(worker.index),
+            WHISPER_WORKER_THREADS=str(self.threads_per_worker),
+            WHISPER_MODEL=self.model_name,
+            WHISPER_PRECISION=self.precision,
+            WHISPER_COMMAND_MAX_SECONDS=str(self.command_max_seconds),
+        )
+        worker.process = subprocess.Popen([sys.executable, '-m', 'speech.whisper_worker'], cwd=BACKEND_DIR, env=env)
+        worker.state = 'starting'
+        threading.Thread(target=self._watch_startup, args=(worker, worker.process),
+                         name=f'whisper-pool-start-{worker.index}', daemon=True).start()
+
+    def _watch_startup(self, worker, process):
+        """
+        Mark a worker failed if its process exits before ever connecting
+        """
+        returncode = process.wait()
+        if worker.process is process and worker.conn is None and worker.state == 'starting':
+            worker.state = 'failed'
+            self.logger.warning(f"Whisper worker {worker.index} exited during startup (code {returncode})")
+            self._fail_pending_if_unavailable()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn = self._listener.accept()
+                kind, index, pid = conn.recv()
+            except Exception as e:
+                if self._running:
+                    self.logger.warning(f"Rejected Whisper worker connection: {e}")
+                continue
+
+            worker = self._workers[index]
+            worker.conn = conn
+            threading.Thread(target=self._read_loop, args=(worker, conn),
+                             name=f'whisper-pool-worker-{index}', daemon=True).start()
+
+    def _read_loop(self, worker, conn):
+        while True:
+            try:
+                kind, index, payload = conn.recv()
+            except (EOFError, OSError):
+                self._worker_lost(worker)
+                return
+
+            if kind == 'ready':
+                with self._cond:
+                    worker.state = 'ready'
+                    self._idle.append(worker)
+                    self._cond.notify_all()
+                self.logger.info(f"Whisper worker {index} ready (pid {worker.process.pid})")
+            elif kind == 'failed':
+                worker.state = 'failed'
+                self.logger.warning(f"Whisper worker {index} could not load its model: {payload}")
+                self._fail_pending_if_unavailable()
+            else:
+                self._complete(worker, kind, payload)
+
+    def _worker_lost(self, worker):
+        with self._cond:
+            batch = worker.batch
+            worker.batch = None
+            worker.conn = None
+            if worker in self._idle:
+                self._idle.remove(worker)
+            BUSY_WORKERS.set(self._busy_count())
+
+        if batch:
+            self._release(batch[2])
+            self._fail(batch[1], RuntimeError("Whisper worker exited mid-batch"))
+
+        if not self._running:
+            worker.state = 'stopped'
+        elif worker.state != 'failed' and worker.restarts < MAX_RESTARTS:
+            worker.restarts += 1
+            self.logger.warning(f"Whisper worker {worker.index} exited; restarting ({worker.restarts}/{MAX_RESTARTS})")
+            self._launch(worker)
+        else:
+            worker.state = 'failed'
+            self._fail_pending_if_unavailable()
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while self._running and not (self._idle and self._pending):
+                    self._cond.wait()
+                if not self._running:
+                    return
+
+                worker = self._idle.popleft()
+                batch = self._take(self.max_batch)
+                # Give concurrent short utterances a moment to join the batch
+                window_end = time.monotonic() + self.batch_window
+                while batch and len(batch) < self.max_batch and len(batch[0].samples) <= self.batch_max_samples:
+                    remaining = window_end - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                    batch.extend(self._take(self.max_batch - len(batch)))
+
+                QUEUE_DEPTH.set(len(self._pending))
+                if not batch:
+                    self._idle.appendleft(worker)
+                    continue
+                worker.state = 'busy'
+                BUSY_WORKERS.set(self._busy_count())
+
+            self._send(worker, batch)
+
+    def _take(self, limit):
+        """
+        Pop up to limit live requests; a clip too long to batch is only taken alone
+        """
+        batch = []
+        now = time.monotonic()
+        while self._pending and len(batch) < limit:
+            request = self._pending[0]
+            if batch and len(request.samples) > self.batch_max_samples:
+                break
+            self._pending.popleft()
+
+            if not request.future.set_running_or_notify_cancel():
+                continue
+            if request.deadline <= now:
+                self.expired += 1
+                EXPIRED.inc(where='queue')
+                request.future.set_exception(TimeoutError("Transcription deadline passed while queued"))
+                continue
+
+            QUEUE_WAIT.observe(now - request.enqueued)
+            batch.append(request)
+            if len(request.samples) > self.batch_max_samples:
+                break
+        return batch
+
+    def _send(self, worker, batch):
+        layout = []
+        offset = 0
+        for request in batch:
+            layout.append((offset, offset + len(request.samples)))
+            offset += len(request.samples)
+
+        shm = SharedMemory(create=True, size=max(offset, 1) * 4)
+        audio = np.ndarray((offset,), dtype=np.float32, buffer=shm.buf)
+        for request, (start, end) in zip(batch, layout):
+            audio[start:end] = request.samples
+        del audio
+
+        batch_id = next(self._batch_ids)
+        worker.batch = (batch_id, batch, shm)
+        self.batches += 1
+        self.batched += len(batch)
+        BATCH_SIZE.observe(len(batch))
+        try:
+            worker.conn.send((batch_id, shm.name, layout, [request.wall_deadline for request in batch], self.language))
+        except Exception as e:
+            # The read loop sees the broken connection and restarts the worker
+            self.logger.warning(f"Could not send a batch to Whisper worker {worker.index}: {e}")
+            with self._cond:
+                worker.batch = None
+                BUSY_WORKERS.set(self._busy_count())
+            self._release(shm)
+            self._fail(batch, RuntimeError("Whisper worker connection lost"))
+
+    def _complete(self, worker, kind, payload):
+        batch_id, result = payload
+        with self._cond:
+            batch = worker.batch
+            worker.batch = None
+            worker.state = 'ready'
+            self._idle.append(worker)
+            BUSY_WORKERS.set(self._busy_count())
+            self._cond.notify_all()
+
+        if batch is None or batch[0] != batch_id:
+            return
+        self._release(batch[2])
+
+        if kind == 'error':
+            self.logger.error(f"Whisper worker {worker.index} failed a batch: {result}")
+            self._fail(batch[1], RuntimeError(result))
+            return
+
+        for request, text in zip(batch[1], result):
+            if text is None:
+                self.expired += 1
+                EXPIRED.inc(where='worker')
+                request.future.set_exception(TimeoutError("Transcription deadline passed before decoding"))
+            else:
+                self.completed += 1
+                request.future.set_result(text)
+
+    def _fail(self, requests, error):
+        for request in requests:
+            if not request.future.done():
+                self.failed += 1
+                request.future.set_exception(error)
+
+    def _fail_pending_if_unavailable(self):
+        if self.available:
+            return
+        with self._cond:
+            pending = list(self._pending)
+            self._pending.clear()
+            QUEUE_DEPTH.set(0)
+        self._fail([request for request in pending if request.future.set_running_or_notify_cancel()],
+                   RuntimeError("Whisper pool has no running workers"))
+
+    def _busy_count(self):
+        return sum(1 for worker in self._workers if worker.batch is not None)
+
+    @staticmethod
+    def _release(shm):
+        try:
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def stop(self):
+        """
+        Stop the workers and fail anything still queued
+        """
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+        for worker in self._workers:
+            try:
+                if worker.conn:
+                    worker.conn.send(None)
+            except Exception:
+                pass
+        for worker in self._workers:
+            if worker.process and worker.process.poll() is None:
+                try:
+                    worker.process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+        self._listener.close()
+        self._fail_pending_if_unavailable()
+
+    def get_stats(self):
+        """
+        Get queue, worker and batching counters
+        """
+        with self._cond:
+            queued = len(self._pending)
+        return {
+            "model": self.model_name,
+            "precision": self.precision,
+            "available": self.available,
+            "workers": [
+                {"state": worker.state, "pid": worker.process.pid if worker.process else None,
+                 "restarts": worker.restarts}
+                for worker in self._workers
+            ],
+            "threads_per_worker": self.threads_per_worker,
+            "queued": queued,
+            "busy": self._busy_count(),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "expired": self.expired,
+            "failed": self.failed,
+            "batches": self.batches,
+            "mean_batch_size": self.batched / self.batches if self.batches else 0.0,
+        }
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+Whisper transcription worker, one process per model copy.
+
+Started by WhisperPool as `python -m speech.whisper_worker` so that it
+imports only Whisper, not app.py. It connects back to the pool over
+multiprocessing.connection, loads its model once and then transcribes
+batches whose audio the pool has written into shared memory.
+"""
+import os
+import sys
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+def attach_shared_memory(name):
+    """
+    Attach to a segment owned by the pool without this process's resource
+    tracker unlinking it on exit (Python < 3.13 has no track=False)
+    """
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def read_clips(shm_name, layout):
+    """
+    Copy each (start, end) clip out of the batch's shared memory segment
+    """
+    shm = attach_shared_memory(shm_name)
+    try:
+        samples = np.ndarray((layout[-1][1],), dtype=np.float32, buffer=shm.buf)
+        clips = [samples[start:end].copy() for start, end in layout]
+        del samples
+        return clips
+    finally:
+        shm.close()
+
+
+def transcribe_batch(model, clips, deadlines, language=None, command_max_seconds=8.0):
+    """
+    Transcribe clips up to command_max_seconds in one batched command-mode
+    decode; longer clips fall back to transcribe(). Clips already past their
+    deadline get None.
+    """
+    from speech.audio_decoder import WHISPER_SAMPLE_RATE
+    from speech.whisper_model import decode_commands
+
+    texts = [None] * len(clips)
+    now = time.time()
+    live = [index for index, deadline in enumerate(deadlines) if deadline is None or deadline > now]
+    short = [index for index in live if len(clips[index]) <= command_max_seconds * WHISPER_SAMPLE_RATE]
+
+    if short:
+        for index, text in zip(short, decode_commands(model, [clips[index] for index in short], language)):
+            texts[index] = text
+
+    for index in live:
+        if texts[index] is None:
+            texts[index] = model.transcribe(
+                clips[index], language=language, fp16=model.device.type != 'cpu'
+            )["text"].strip()
+
+    return texts
+
+
+def main():
+    address = (os.environ['WHISPER_POOL_HOST'], int(os.environ['WHISPER_POOL_PORT']))
+    conn = Client(address, authkey=bytes.fromhex(os.environ['WHISPER_POOL_AUTHKEY']))
+    index = int(os.environ['WHISPER_WORKER_INDEX'])
+    conn.send(('hello', index, os.getpid()))
+
+    command_max_seconds = float(os.environ.get('WHISPER_COMMAND_MAX_SECONDS', 8))
+    try:
+        from speech.whisper_model import load_whisper, warm_up_samples
+
+        # Each worker gets its share of the cores instead of all of them
+        model = load_whisper(
+            os.environ.get('WHISPER_MODEL', 'base'),
+            precision=os.environ.get('WHISPER_PRECISION', 'fp32'),
+            threads=int(os.environ.get('WHISPER_WORKER_THREADS', 1))
+        )
+        transcribe_batch(model, [warm_up_samples()], [None], language='en', command_max_seconds=command_max_seconds)
+    except Exception as e:
+        conn.send(('failed', index, str(e)))
+        return 1
+
+    conn.send(('ready', index, None))
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            # The pool went away
+            return 0
+        if task is None:
+            return 0
+
+        batch_id, shm_name, layout, deadlines, language = task
+        try:
+            texts = transcribe_batch(model, read_clips(shm_name, layout), deadlines, language, command_max_seconds)
+            conn.send(('result', index, (batch_id, texts)))
+        except Exception as e:
+            conn.send(('error', index, (batch_id, str(e))))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
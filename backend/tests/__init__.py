@@ -0,0 +1 @@
+# Tests for Jarvis AI Assistant backend components
\ No newline at end of file
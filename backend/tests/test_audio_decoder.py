@@ -0,0 +1,110 @@
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from speech.audio_decoder import AudioLimitError, IncrementalDecoder, decode_audio
+
+
+def make_wav(frames, sample_rate=16000, channels=1, width=2):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+def riff(*chunks):
+    body = b'WAVE' + b''.join(chunk_id + struct.pack('<I', len(data)) + data for chunk_id, data in chunks)
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def fmt_chunk(audio_format=1, channels=1, sample_rate=16000, bits=16):
+    block = channels * bits // 8
+    return struct.pack('<HHIIHH', audio_format, channels, sample_rate, sample_rate * block, block, bits)
+
+
+PCM = np.array([0, 16384, -16384, 32767, -32768], dtype='<i2')
+
+
+def test_decodes_16_bit_pcm():
+    clip = decode_audio(make_wav(PCM.tobytes(), sample_rate=8000))
+    assert clip.sample_rate == 8000
+    np.testing.assert_allclose(clip.samples, PCM / 32768.0)
+
+
+def test_decodes_8_bit_pcm():
+    clip = decode_audio(make_wav(bytes([128, 192, 64]), width=1))
+    np.testing.assert_allclose(clip.samples, [0.0, 0.5, -0.5])
+
+
+def test_downmixes_stereo():
+    stereo = np.array([16384, 0, -16384, -16384], dtype='<i2')
+    clip = decode_audio(make_wav(stereo.tobytes(), channels=2))
+    np.testing.assert_allclose(clip.samples, [0.25, -0.5])
+
+
+def test_decodes_float_and_skips_unknown_chunks():
+    samples = np.array([0.25, -0.75], dtype='<f4')
+    data = riff((b'fmt ', fmt_chunk(audio_format=3, bits=32)), (b'LIST', b'info'), (b'data', samples.tobytes()))
+    np.testing.assert_allclose(decode_audio(data).samples, samples)
+
+
+def test_streaming_size_reads_to_the_end():
+    # Writers that cannot seek back leave the data size as 0
+    data = riff((b'fmt ', fmt_chunk()), (b'data', b'')) + PCM.tobytes()
+    np.testing.assert_allclose(decode_audio(data).samples, PCM / 32768.0)
+
+
+@pytest.mark.parametrize('data, message', [
+    (riff((b'fmt ', b'\x01\x00\x01\x00'), (b'data', b'')), 'fmt chunk'),
+    (riff((b'data', b''), (b'fmt ', fmt_chunk())), 'before fmt'),
+    (riff((b'fmt ', fmt_chunk())), 'no data chunk'),
+    (riff((b'fmt ', fmt_chunk(audio_format=2)), (b'data', b'\x00\x00')), 'Unsupported WAV encoding'),
+])
+def test_malformed_wav_raises_value_error(data, message):
+    with pytest.raises(ValueError, match=message):
+        decode_audio(data)
+
+
+def test_truncated_fmt_chunk_raises_value_error():
+    data = riff((b'fmt ', fmt_chunk()))[:30]
+    with pytest.raises(ValueError):
+        decode_audio(data)
+
+    decoder = IncrementalDecoder()
+    decoder.feed(data)
+    with pytest.raises(ValueError):
+        decoder.finish()
+
+
+def test_incremental_decoder_matches_decode_audio():
+    data = make_wav(np.arange(-2000, 2000, 7, dtype='<i2').tobytes(), sample_rate=22050)
+    decoder = IncrementalDecoder()
+    for start in range(0, len(data), 5):
+        decoder.feed(data[start:start + 5])
+
+    clip = decoder.finish()
+    expected = decode_audio(data)
+    assert clip.sample_rate == expected.sample_rate == 22050
+    np.testing.assert_array_equal(clip.samples, expected.samples)
+
+
+def test_incremental_decoder_enforces_limits():
+    decoder = IncrementalDecoder(max_bytes=10)
+    with pytest.raises(AudioLimitError):
+        decoder.feed(b'\x00' * 11)
+
+    decoder = IncrementalDecoder(max_seconds=1)
+    with pytest.raises(AudioLimitError):
+        decoder.feed(make_wav(b'\x00\x00' * 32000))
+
+
+def test_raw_pcm_only_when_asked():
+    clip = decode_audio(PCM.tobytes(), pcm_sample_rate=8000, pcm=True)
+    assert clip.sample_rate == 8000
+    np.testing.assert_allclose(clip.samples, PCM / 32768.0)
\ No newline at end of file
@@ -0,0 +1,26 @@
+import logging
+import sys
+
+import pytest
+
+for module in ('httpx', 'openai', 'google.generativeai', 'speech_recognition', 'pyttsx3', 'gtts', 'pyowm', 'bs4'):
+    pytest.importorskip(module)
+
+from benchmarks import bench_components
+
+
+def test_runs_with_stubs_and_logs_no_errors(monkeypatch, tmp_path, caplog, capsys):
+    monkeypatch.setattr(sys, 'argv', [
+        'bench_components', '--iterations', '3', '--warmup', '1', '--baseline', str(tmp_path / 'baseline.json'),
+    ])
+    try:
+        with caplog.at_level(logging.ERROR):
+            bench_components.main()
+    finally:
+        # main() turns INFO logging off for the whole process
+        logging.disable(logging.NOTSET)
+
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+    report = capsys.readouterr().out
+    for name in ('special_commands', 'get_response_cached', 'stt_convert_audio_data', 'tts_elevenlabs'):
+        assert name in report
\ No newline at end of file
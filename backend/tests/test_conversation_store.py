@@ -0,0 +1,84 @@
+from ai.conversation_store import ConversationStore
+
+
+def make_store(**kwargs):
+    # One token per character keeps the budgets easy to reason about
+    return ConversationStore(token_counter=len, **kwargs)
+
+
+def test_history_is_kept_per_session():
+    store = make_store()
+    store.append('a', "hello", "hi there")
+    store.append('a', "how are you", "fine")
+    store.append('b', "ping", "pong")
+
+    assert [turn["user"] for turn in store.get_history('a')] == ["hello", "how are you"]
+    assert [turn["user"] for turn in store.get_history('a', limit=1)] == ["how are you"]
+    assert store.get_history('a', limit=0) == []
+    assert store.get_history('missing') == []
+    assert store.has_history('b') and not store.has_history('missing')
+
+
+def test_turn_limit_drops_oldest_turns():
+    store = make_store(max_turns=2)
+    for index in range(3):
+        store.append('a', f"q{index}", f"a{index}")
+
+    assert [turn["user"] for turn in store.get_history('a')] == ["q1", "q2"]
+    assert store.get_stats()["total_tokens"] == 8
+
+
+def test_token_budget_trims_but_keeps_latest_turn():
+    store = make_store(token_budget=10)
+    store.append('a', "aaaa", "bbbb")
+    store.append('a', "cc", "dd")
+    assert [turn["user"] for turn in store.get_history('a')] == ["cc"]
+
+    store.append('a', "x" * 20, "y" * 20)
+    assert [turn["user"] for turn in store.get_history('a')] == ["x" * 20]
+    assert store.get_stats()["total_tokens"] == 40
+
+
+def test_idle_sessions_are_evicted():
+    store = make_store(idle_timeout=0)
+    store.append('a', "hello", "hi")
+    store.append('b', "hello", "hi")
+
+    assert store.evict_idle() == 2
+    stats = store.get_stats()
+    assert (stats["sessions"], stats["total_tokens"], stats["evicted_idle"]) == (0, 0, 2)
+
+
+def test_least_recent_session_goes_over_capacity():
+    store = make_store(max_sessions=2)
+    store.append('a', "hello", "hi")
+    store.append('b', "hello", "hi")
+    store.get_history('a')
+    store.append('c', "hello", "hi")
+
+    assert store.get_history('b') == []
+    assert store.has_history('a') and store.has_history('c')
+    assert store.get_stats()["evicted_capacity"] == 1
+
+
+def test_token_cap_never_drops_the_active_session():
+    store = make_store(max_total_tokens=10)
+    store.append('a', "aaaa", "aaaa")
+    store.append('b', "bbbb", "bbbb")
+
+    assert not store.has_history('a')
+    assert store.has_history('b')
+
+
+def test_clear_and_end_session():
+    store = make_store()
+    store.append('a', "hello", "hi")
+    store.append('b', "hello", "hi")
+
+    store.clear('a')
+    assert store.get_history('a') == []
+    assert store.get_stats()["sessions"] == 2
+
+    store.end_session('b')
+    stats = store.get_stats()
+    assert (stats["sessions"], stats["total_tokens"]) == (1, 0)
\ No newline at end of file
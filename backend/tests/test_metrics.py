@@ -0,0 +1,66 @@
+from utils.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def render(*metrics, collectors=()):
+    registry = MetricsRegistry()
+    for metric in metrics:
+        registry.register(metric)
+    for collector in collectors:
+        registry.add_collector(collector)
+    return registry.render().splitlines()
+
+
+def test_counter_renders_help_type_and_labels():
+    errors = Counter('jarvis_errors_total', 'Errors', ('stage', 'engine'))
+    errors.inc(stage='stt', engine='whisper')
+    errors.inc(2, stage='stt', engine='whisper')
+
+    assert render(errors) == [
+        '# HELP jarvis_errors_total Errors',
+        '# TYPE jarvis_errors_total counter',
+        'jarvis_errors_total{stage="stt",engine="whisper"} 3',
+    ]
+
+
+def test_label_values_are_escaped():
+    errors = Counter('errors_total', 'Errors', ('engine',))
+    errors.inc(engine='say "hi"\\\n')
+    assert render(errors)[-1] == 'errors_total{engine="say \\"hi\\"\\\\\\n"} 1'
+
+
+def test_gauge_track_counts_in_flight():
+    in_flight = Gauge('in_flight', 'In flight', ('kind',))
+    with in_flight.track(kind='voice'):
+        assert render(in_flight)[-1] == 'in_flight{kind="voice"} 1'
+    assert render(in_flight)[-1] == 'in_flight{kind="voice"} 0'
+
+
+def test_histogram_buckets_are_cumulative():
+    latency = Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value)
+
+    assert render(latency)[2:] == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        'latency_seconds_sum 6.05',
+        'latency_seconds_count 4',
+    ]
+
+
+def test_collectors_render_at_scrape_time_and_skip_missing_values():
+    def collector():
+        return [('breaker_open', 'gauge', 'Open breakers', [({'provider': 'openai'}, 1), ({'provider': 'gemini'}, None)])]
+
+    assert render(collectors=[collector]) == [
+        '# HELP breaker_open Open breakers',
+        '# TYPE breaker_open gauge',
+        'breaker_open{provider="openai"} 1',
+    ]
+
+
+def test_registering_a_name_twice_returns_the_first_metric():
+    registry = MetricsRegistry()
+    first = registry.register(Counter('requests_total', 'Requests'))
+    assert registry.register(Counter('requests_total', 'Requests')) is first
\ No newline at end of file
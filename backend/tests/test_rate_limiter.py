@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from ai.rate_limiter import PRIORITY_BATCH, PRIORITY_VOICE, RateLimitScheduler, TokenBucket, parse_duration
+
+
+@pytest.mark.parametrize('value, seconds', [
+    ('20ms', 0.02), ('1.5s', 1.5), ('6m0s', 360.0), ('1h', 3600.0), ('30', 30.0), (7, 7.0),
+    (None, None), ('soon', None),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == (None if seconds is None else pytest.approx(seconds))
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(rate=10, capacity=5)
+    now = bucket.updated_at
+    assert bucket.wait_time(5, now) == 0.0
+
+    bucket.consume(5)
+    assert bucket.wait_time(1, now) == pytest.approx(0.1)
+    # Asking for more than the capacity waits for a full bucket, not forever
+    assert bucket.wait_time(50, now) == pytest.approx(0.5)
+
+
+def test_unknown_provider_is_not_limited():
+    assert RateLimitScheduler().acquire('nobody')
+
+
+def test_acquire_times_out_without_quota():
+    scheduler = RateLimitScheduler().add_provider('openai', requests_per_minute=1)
+    assert scheduler.acquire('openai', timeout=0.05)
+    assert not scheduler.acquire('openai', timeout=0.05)
+
+    stats = scheduler.get_stats()['openai']
+    assert (stats["granted"], stats["timed_out"], stats["queued"]) == (1, 1, 0)
+
+
+def test_voice_is_admitted_before_queued_batch():
+    # Two requests a second; the bucket starts empty
+    scheduler = RateLimitScheduler().add_provider('openai', requests_per_minute=120)
+    scheduler.record_rate_limited('openai', {'retry-after': '0', 'x-ratelimit-remaining-requests': '0'})
+    results = {}
+
+    def acquire(name, priority, timeout):
+        results[name] = scheduler.acquire('openai', priority=priority, timeout=timeout)
+
+    batch = threading.Thread(target=acquire, args=('batch', PRIORITY_BATCH, 0.8))
+    voice = threading.Thread(target=acquire, args=('voice', PRIORITY_VOICE, 2.0))
+    batch.start()
+    time.sleep(0.05)
+    voice.start()
+    batch.join()
+    voice.join()
+
+    # The first request slot (after ~0.5s) goes to voice although batch queued first
+    assert results == {'voice': True, 'batch': False}
+
+
+def test_usage_and_headers_feed_back_into_the_buckets():
+    scheduler = RateLimitScheduler().add_provider('openai', requests_per_minute=60, tokens_per_minute=1000)
+    assert scheduler.acquire('openai', estimated_tokens=100)
+
+    scheduler.record_usage('openai', estimated_tokens=100, actual_tokens=300)
+    assert scheduler.get_stats()['openai']["tokens_available"] == pytest.approx(700, abs=1)
+
+    scheduler.record_headers('openai', {'X-RateLimit-Remaining-Requests': '3'})
+    assert scheduler.get_stats()['openai']["requests_available"] == pytest.approx(3, abs=0.1)
+
+
+def test_rate_limited_pauses_the_provider():
+    scheduler = RateLimitScheduler().add_provider('openai', requests_per_minute=60)
+    scheduler.record_rate_limited('openai', {'Retry-After': '5'})
+
+    stats = scheduler.get_stats()['openai']
+    assert stats["throttled"] == 1
+    assert 4 < stats["paused_for"] <= 5
+    assert not scheduler.acquire('openai', timeout=0.05)
\ No newline at end of file
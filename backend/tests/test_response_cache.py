@@ -0,0 +1,71 @@
+from ai.response_cache import ResponseCache, is_history_dependent, normalize_text
+
+
+def test_normalize_text_ignores_case_and_punctuation():
+    assert normalize_text("What's the  WEATHER?") == normalize_text("what's the weather")
+
+
+def test_make_key_depends_on_history():
+    history = [{"user": "hi", "assistant": "hello"}]
+    key = ResponseCache.make_key("tell me a joke", 'openai', 'gpt')
+    assert ResponseCache.make_key("Tell me a joke!", 'openai', 'gpt') == key
+    assert ResponseCache.make_key("tell me a joke", 'openai', 'gpt', history) != key
+
+
+def test_is_history_dependent():
+    assert is_history_dependent("tell me more about it")
+    assert not is_history_dependent("what is the weather in london")
+
+
+def test_get_and_set_count_hits_and_misses():
+    cache = ResponseCache()
+    assert cache.get('key') is None
+    cache.set('key', 'value')
+    assert cache.get('key') == 'value'
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_expired_entries_are_dropped():
+    cache = ResponseCache(ttl=0)
+    cache.set('key', 'value')
+    assert cache.get('key') is None
+
+    stats = cache.get_stats()
+    assert (stats["expirations"], stats["entries"], stats["bytes"]) == (1, 0, 0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    cache.get('a')
+    cache.set('c', '3')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == '1' and cache.get('c') == '3'
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_byte_budget_bounds_the_cache():
+    cache = ResponseCache(max_bytes=ResponseCache._entry_size('a', 'x' * 100) * 2)
+    for key in 'abc':
+        cache.set(key, 'x' * 100)
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= cache.max_bytes
+
+    # An entry bigger than the whole budget is never stored
+    cache.set('huge', 'x' * cache.max_bytes)
+    assert cache.get('huge') is None
+
+
+def test_clear_drops_everything():
+    cache = ResponseCache()
+    cache.set('key', 'value')
+    cache.clear()
+    assert cache.get('key') is None
+    assert cache.get_stats()["bytes"] == 0
\ No newline at end of file
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from speech.streaming import EnergyEndpointer, StreamingSession
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.full(int(seconds * SAMPLE_RATE), 1e-4, dtype=np.float32)
+
+
+def to_pcm(samples):
+    return (samples * 32767).astype('<i2').tobytes()
+
+
+class RecordingSpeechToText:
+    def __init__(self):
+        self.clips = []
+
+    def convert_clip_to_text(self, clip):
+        self.clips.append(clip)
+        return f"clip {len(self.clips)}"
+
+
+def test_endpointer_finds_speech_and_its_end():
+    endpointer = EnergyEndpointer(SAMPLE_RATE, end_silence_ms=300)
+    assert not endpointer.process(silence(0.5))
+    assert not endpointer.process(tone(1.0))
+    assert endpointer.in_speech
+
+    assert endpointer.process(silence(0.5))
+    assert endpointer.speech_start == pytest.approx(0.5 * SAMPLE_RATE, abs=0.02 * SAMPLE_RATE)
+    assert endpointer.speech_end == pytest.approx(1.5 * SAMPLE_RATE, abs=0.02 * SAMPLE_RATE)
+
+
+def test_endpointer_ignores_short_blips_and_odd_chunk_sizes():
+    endpointer = EnergyEndpointer(SAMPLE_RATE, min_speech_ms=100)
+    samples = np.concatenate((silence(0.5), tone(0.04), silence(0.5)))
+    for start in range(0, len(samples), 333):
+        endpointer.process(samples[start:start + 333])
+    assert endpointer.speech_start is None
+
+
+def test_session_ends_after_trailing_silence():
+    stt = RecordingSpeechToText()
+    session = StreamingSession(stt, SAMPLE_RATE, partial_interval_ms=0, end_silence_ms=300)
+    assert not session.feed(to_pcm(np.concatenate((silence(0.3), tone(0.8)))))
+    assert session.feed(to_pcm(silence(0.5)))
+
+    assert session.finish() == "clip 1"
+    # The transcribed segment is the speech plus pre-roll, not the leading silence
+    assert stt.clips[0].duration == pytest.approx(1.2, abs=0.05)
+
+
+def test_session_reorders_chunks_by_seq():
+    chunks = [np.full(160, index / 10, dtype=np.float32) for index in range(5)]
+    session = StreamingSession(RecordingSpeechToText(), SAMPLE_RATE)
+    for seq in (1, 0, 3, 4, 2):
+        session.feed(to_pcm(chunks[seq]), seq=seq)
+
+    np.testing.assert_allclose(session._buffer[:session._length], np.concatenate(chunks), atol=1e-4)
+
+
+def test_session_gives_up_on_a_missing_chunk():
+    chunks = [np.full(160, index / 10, dtype=np.float32) for index in range(4)]
+    session = StreamingSession(RecordingSpeechToText(), SAMPLE_RATE, reorder_window=2)
+    session.feed(to_pcm(chunks[1]), seq=1)
+    session.feed(to_pcm(chunks[2]), seq=2)
+    # Arriving after the gap was skipped, chunk 0 is dropped like a duplicate
+    session.feed(to_pcm(chunks[0]), seq=0)
+    session.feed(to_pcm(chunks[3]), seq=3)
+
+    np.testing.assert_allclose(session._buffer[:session._length], np.concatenate(chunks[1:]), atol=1e-4)
+
+
+@pytest.mark.parametrize('seq', [-1, 1.5, '2', True])
+def test_session_rejects_bad_seq(seq):
+    session = StreamingSession(RecordingSpeechToText(), SAMPLE_RATE)
+    with pytest.raises(ValueError):
+        session.feed(b'\x00\x00', seq=seq)
+
+
+def test_closed_session_takes_no_more_audio():
+    session = StreamingSession(RecordingSpeechToText(), SAMPLE_RATE, max_seconds=0.1)
+    assert session.feed(to_pcm(silence(0.2)))
+    assert not session.feed(to_pcm(silence(0.2)))
+    assert not session.close()
+    assert session.finish() == ""
\ No newline at end of file
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """
+        Run func once for all concurrent callers of key and return its result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def in_flight(self, key):
+        """
+        Check whether a call for key is currently running
+        """
+        return key in self._calls
+
+
+class RefreshingCache:
+    """
+    LRU cache with a freshness window and stale-while-revalidate.
+
+    Entries younger than ttl are served directly. Entries older than ttl but
+    younger than ttl + stale_ttl are served immediately while one background
+    refresh runs. Anything older is loaded synchronously. Loads for the same
+    key are coalesced, so a burst of identical lookups costs one upstream call.
+    """
+
+    def __init__(self, ttl=600, stale_ttl=0, max_entries=1000, name='cache'):
+        self.logger = logging.getLogger(__name__)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.name = name
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_errors = 0
+
+    def get(self, key, loader):
+        """
+        Get the value for key, calling loader() to fetch it when needed
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                age = now - loaded_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    stale = True
+                else:
+                    del self._entries[key]
+                    self.misses += 1
+                    stale = False
+            else:
+                self.misses += 1
+                stale = False
+
+        if stale:
+            self._refresh_in_background(key, loader, now)
+            return value
+
+        return self._flight.do(key, lambda: self._load(key, loader, since=now))
+
+    def _load(self, key, loader, since=None):
+        # A caller that just missed the previous flight reuses its result
+        if since is not None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] >= since:
+                    return entry[0]
+
+        try:
+            value = loader()
+        except Exception:
+            with self._lock:
+                self.load_errors += 1
+            raise
+
+        with self._lock:
+            self.loads += 1
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def _refresh_in_background(self, key, loader, since):
+        if self._flight.in_flight(key):
+            return
+
+        def refresh():
+            try:
+                self._flight.do(key, lambda: self._load(key, loader, since))
+            except Exception as e:
+                # Keep serving the stale value; the next lookup retries
+                self.logger.warning(f"Background refresh of {self.name} entry {key!r} failed: {e}")
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def invalidate(self, key=None):
+        """
+        Drop one entry, or every entry when key is None
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self):
+        """
+        Get cache counters and current size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                "coalesced": self._flight.coalesced,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+            }
\ No newline at end of file
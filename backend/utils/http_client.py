@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+import httpx
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRY_STATUS_CODES = frozenset([429, 502, 503, 504])
+# Methods that are safe to send again whatever happened to the first attempt
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD'])
+# Failures raised before any of the request reached the server
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class HTTPClient:
+    """
+    Shared outbound HTTP client with pooled keep-alive connections.
+
+    Wraps one httpx.Client (sync) and one httpx.AsyncClient per event loop
+    (async); both keep connections alive per host, negotiate HTTP/2 when h2
+    is installed, apply default timeouts and retry transient failures with
+    exponential backoff and full jitter. Only GET and HEAD are retried by
+    default; other methods (e.g. a billable POST) opt in with retry=True and
+    are then retried only when the connection could not be made.
+    """
+
+    def __init__(self, timeout=10.0, connect_timeout=3.0, max_connections=100,
+                 max_keepalive_connections=20, keepalive_expiry=30.0, retries=2,
+                 backoff=0.25, max_backoff=4.0, http2=None):
+        self.logger = logging.getLogger(__name__)
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = HTTP2_AVAILABLE if http2 is None else (http2 and HTTP2_AVAILABLE)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """
+        Lazily created sync client
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(timeout=self.timeout, limits=self.limits, http2=self.http2)
+        return self._client
+
+    def _get_async_client(self):
+        # AsyncClient connections belong to the loop that opened them
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+            self._async_clients[loop] = client
+        return client
+
+    def _retry_delay(self, attempt, response=None):
+        # Honour a numeric Retry-After header, otherwise full-jitter exponential backoff
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _retry_policy(self, method, retries, retry):
+        """
+        Get (retries, idempotent) for a request
+        """
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        if not idempotent and not retry:
+            return 0, idempotent
+        return (self.retries if retries is None else retries), idempotent
+
+    def request(self, method, url, retries=None, retry=False, **kwargs):
+        """
+        Send a request. GET and HEAD retry transport errors and 429/502/503/504
+        responses; other methods are sent once, or with retry=True retried on
+        connect errors only, since a later failure may come after the server acted
+        """
+        retries, idempotent = self._retry_policy(method, retries, retry)
+
+        for attempt in range(retries + 1):
+            try:
+                response = self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= retries or not (idempotent or isinstance(e, CONNECT_ERRORS)):
+                    raise
+                delay = self._retry_delay(attempt)
+                self.logger.warning(f"{method} {url} failed ({e!r}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries or not idempotent:
+                return response
+
+            delay = self._retry_delay(attempt, response)
+            self.logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+            response.close()
+            time.sleep(delay)
+
+    async def arequest(self, method, url, retries=None, retry=False, **kwargs):
+        """
+        Async variant of request()
+        """
+        retries, idempotent = self._retry_policy(method, retries, retry)
+        client = self._get_async_client()
+
+        for attempt in range(retries + 1):
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= retries or not (idempotent or isinstance(e, CONNECT_ERRORS)):
+                    raise
+                delay = self._retry_delay(attempt)
+                self.logger.warning(f"{method} {url} failed ({e!r}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries or not idempotent:
+                return response
+
+            delay = self._retry_delay(attempt, response)
+            self.logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+            await response.aclose()
+            await asyncio.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    async def aget(self, url, **kwargs):
+        return await self.arequest('GET', url, **kwargs)
+
+    async def apost(self, url, **kwargs):
+        return await self.arequest('POST', url, **kwargs)
+
+    def close(self):
+        """
+        Close the sync client's pooled connections
+        """
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        """
+        Close the async client of the running event loop
+        """
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Get the process-wide HTTP client, configured from the environment
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                http2 = os.getenv('HTTP_CLIENT_HTTP2')
+                _shared_client = HTTPClient(
+                    timeout=float(os.getenv('HTTP_CLIENT_TIMEOUT', 10)),
+                    connect_timeout=float(os.getenv('HTTP_CLIENT_CONNECT_TIMEOUT', 3)),
+                    max_connections=int(os.getenv('HTTP_CLIENT_MAX_CONNECTIONS', 100)),
+                    max_keepalive_connections=int(os.getenv('HTTP_CLIENT_MAX_KEEPALIVE', 20)),
+                    retries=int(os.getenv('HTTP_CLIENT_RETRIES', 2)),
+                    http2=None if http2 is None else http2.lower() == 'true'
+                )
+    return _shared_client
\ No newline at end of file
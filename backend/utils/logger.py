@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 from datetime import datetime
@@ -49,6 +50,45 @@ def setup_logger(name='jarvis', level=None):
     
     return logger
 
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line, including structured extras
+    """
+    def __init__(self, fields=('trace',)):
+        super().__init__()
+        self.fields = fields
+    
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.fields:
+            if hasattr(record, field):
+                data[field] = getattr(record, field)
+        return json.dumps(data, default=str)
+
+def setup_trace_logger(name='jarvis.trace'):
+    """
+    Setup logger for structured trace records (JSON lines in logs/traces_*.log)
+    """
+    if not os.path.exists('logs'):
+        os.makedirs('logs')
+    
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    
+    if not logger.handlers:
+        # Full span trees go to the JSON file; the one-line summary still
+        # propagates to the main jarvis log
+        trace_handler = logging.FileHandler(f'logs/traces_{datetime.now().strftime("%Y%m%d")}.log')
+        trace_handler.setFormatter(JSONFormatter())
+        logger.addHandler(trace_handler)
+    
+    return logger
+
 def get_logger(name='jarvis'):
     """
     Get existing logger or create new one
@@ -0,0 +1,305 @@
+import contextvars
+import cProfile
+import functools
+import inspect
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils.logger import setup_trace_logger
+
+_current_trace = contextvars.ContextVar('jarvis_trace', default=None)
+_current_span = contextvars.ContextVar('jarvis_span', default=None)
+
+# Client-supplied ids end up in file names, logs and response headers
+_TRACE_ID_PATTERN = re.compile(r'[0-9A-Za-z-]{1,64}')
+
+
+class Span:
+    """
+    Timed section of a trace
+    """
+    __slots__ = ('name', 'parent', 'depth', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, name, parent, start, attributes):
+        self.name = name
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.start = start
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+
+class Trace:
+    """
+    Tree of spans recorded for one HTTP request or Socket.IO event
+    """
+
+    def __init__(self, name, trace_id=None, **attributes):
+        if not (isinstance(trace_id, str) and _TRACE_ID_PATTERN.fullmatch(trace_id)):
+            trace_id = uuid.uuid4().hex[:16]
+        self.trace_id = trace_id
+        self.root = Span(name, None, time.perf_counter(), attributes)
+        self.spans = [self.root]
+        self.started_at = time.time()
+        self.profile_path = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.root.name
+
+    @property
+    def duration(self):
+        return self.root.duration
+
+    def add_span(self, span):
+        # Spans may be opened from worker threads that inherited the trace context
+        with self._lock:
+            self.spans.append(span)
+
+    def to_record(self):
+        """
+        Structured form of the trace for logging
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        record = {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "duration_ms": round(self.duration * 1000, 2),
+            "spans": [
+                dict(
+                    span.attributes,
+                    name=span.name,
+                    depth=span.depth,
+                    start_ms=round((span.start - self.root.start) * 1000, 2),
+                    duration_ms=round(span.duration * 1000, 2),
+                    **({"error": span.error} if span.error else {})
+                ) for span in sorted(spans, key=lambda span: span.start)
+            ],
+        }
+        if self.profile_path:
+            record["profile"] = self.profile_path
+        return record
+
+
+class Tracer:
+    """
+    Request tracing with slow-trace logging and sampled profiling.
+
+    A trace is bound to the current context, so spans opened anywhere below
+    a request handler (speech, AI, TTS) nest under it without passing ids
+    around; worker pools propagate it with contextvars.copy_context(). When a
+    trace ends above the slow threshold its span tree is written as a
+    structured record to the trace log. With profiling enabled, every Nth
+    trace also runs under cProfile and dumps a .prof file (load it with
+    pstats or snakeviz).
+    """
+
+    def __init__(self, enabled=True, slow_threshold=2.0, profile_sample_rate=0, profile_dir='logs/profiles'):
+        self.logger = logging.getLogger(__name__)
+        self.trace_logger = setup_trace_logger()
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_dir = profile_dir
+
+        # Only one cProfile profiler can be active per process
+        self._profile_lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+        self.traces = 0
+        self.slow_traces = 0
+        self.profiles = 0
+
+    def start_trace(self, name, trace_id=None, **attributes):
+        """
+        Begin a trace in the current context; pass the result to end_trace()
+        """
+        if not self.enabled:
+            return None
+
+        trace = Trace(name, trace_id, **attributes)
+        previous = (_current_trace.get(), _current_span.get())
+        _current_trace.set(trace)
+        _current_span.set(trace.root)
+
+        profiler = None
+        if self.profile_sample_rate and next(self._sequence) % self.profile_sample_rate == 0:
+            if self._profile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Another profiler (e.g. a debugger) already owns the hook
+                    self._profile_lock.release()
+                    profiler = None
+
+        return trace, previous, profiler
+
+    def end_trace(self, handle, error=None):
+        """
+        Finish a trace started with start_trace() and log it if it was slow
+        """
+        if handle is None:
+            return None
+
+        trace, (previous_trace, previous_span), profiler = handle
+        trace.root.end = time.perf_counter()
+        if error is not None:
+            trace.root.error = repr(error)
+        _current_trace.set(previous_trace)
+        _current_span.set(previous_span)
+
+        if profiler is not None:
+            profiler.disable()
+            self._profile_lock.release()
+            trace.profile_path = self._dump_profile(profiler, trace)
+
+        self.traces += 1
+        slow = trace.duration >= self.slow_threshold
+        if slow or trace.profile_path:
+            if slow:
+                self.slow_traces += 1
+            kind = "Slow" if slow else "Profiled"
+            self.trace_logger.warning(
+                f"{kind} trace {trace.name} took {trace.duration * 1000:.0f}ms (trace_id={trace.trace_id})",
+                extra={"trace": trace.to_record()}
+            )
+        return trace
+
+    @contextmanager
+    def trace(self, name, trace_id=None, **attributes):
+        """
+        Record the enclosed block as a new trace
+        """
+        handle = self.start_trace(name, trace_id, **attributes)
+        try:
+            yield handle[0] if handle else None
+        except BaseException as e:
+            self.end_trace(handle, error=e)
+            handle = None
+            raise
+        finally:
+            self.end_trace(handle)
+
+    def _dump_profile(self, profiler, trace):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            safe_name = ''.join(c if c.isalnum() else '_' for c in trace.name).strip('_')
+            path = os.path.join(
+                self.profile_dir,
+                f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{safe_name}_{trace.trace_id}.prof"
+            )
+            profiler.dump_stats(path)
+            self.profiles += 1
+            return path
+        except Exception as e:
+            self.logger.error(f"Could not write profile for trace {trace.trace_id}: {e}")
+            return None
+
+    def get_stats(self):
+        """
+        Get tracing and profiling counters
+        """
+        return {
+            "enabled": self.enabled,
+            "traces": self.traces,
+            "slow_traces": self.slow_traces,
+            "profiles": self.profiles,
+            "slow_threshold": self.slow_threshold,
+            "profile_sample_rate": self.profile_sample_rate,
+        }
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Record the enclosed block as a span of the current trace (no-op without one)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    current = Span(name, _current_span.get(), time.perf_counter(), attributes)
+    trace.add_span(current)
+    _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.end = time.perf_counter()
+        # Restore rather than reset: generator spans may be closed from another context
+        _current_span.set(current.parent)
+
+
+def traced(name):
+    """
+    Decorator recording each call as a span (generators: until exhausted)
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                with span(name):
+                    yield from func(*args, **kwargs)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace_id():
+    """
+    Get the id of the trace bound to the current context, if any
+    """
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def bind_context(func):
+    """
+    Wrap func so it runs with the caller's trace context in another thread
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """
+    Get the process-wide tracer, configured from the environment
+    """
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(
+                enabled=os.getenv('TRACE_ENABLED', 'True').lower() == 'true',
+                slow_threshold=float(os.getenv('TRACE_SLOW_THRESHOLD_MS', 2000)) / 1000.0,
+                profile_sample_rate=int(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+                profile_dir=os.getenv('PROFILE_DIR', 'logs/profiles')
+            )
+        return _tracer
\ No newline at end of file